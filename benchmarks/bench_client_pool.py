@@ -0,0 +1,59 @@
+"""Count new TCP connections per research request with and without pooling.
+
+Runs `run_research_async` against the stub Tavily/OpenAI server in
+`benchmarks.stubs`, so no quota is spent. Usage:
+
+    python -m benchmarks.bench_client_pool --requests 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.stubs import Behaviour, StubConfig, StubServer
+from research_agent.app.deps import settings
+from research_agent.core.clients import registry
+from research_agent.core.research import run_research_async
+
+
+async def _drive(server: StubServer, requests: int, pooled: bool) -> dict:
+    settings.pool_clients = pooled
+    await registry.aclose()
+    server.reset_counters()
+    start = time.perf_counter()
+    for i in range(requests):
+        await run_research_async(f"query {i}", model_name="x-ai/grok-4-fast")
+    elapsed = time.perf_counter() - start
+    return {
+        "pooled": pooled,
+        "requests": requests,
+        "connections": server.connections,
+        "connections_per_request": round(server.connections / requests, 3),
+        "mean_latency_ms": round(elapsed / requests * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    # Zero-latency stub: the numbers isolate connection setup cost
+    fast = Behaviour(median_ms=0.0, sigma=0.0)
+    with StubServer(StubConfig(search=fast, chat=fast)) as server:
+        server.configure_settings()
+
+        async def run() -> list:
+            return [
+                await _drive(server, args.requests, pooled=False),
+                await _drive(server, args.requests, pooled=True),
+            ]
+
+        print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
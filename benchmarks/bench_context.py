@@ -0,0 +1,105 @@
+"""Prompt tokens with and without the token-budgeted context builder.
+
+The corpus is synthetic: Tavily-shaped results with long page extracts,
+shared boilerplate and one mirrored article, roughly what `content` looks
+like for news and documentation queries. Usage:
+
+    python -m benchmarks.bench_context --results 5 --sentences 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from research_agent.app.deps import ALLOWED_FREE_MODELS, context_budget, settings
+from research_agent.core.components import SearchResult, Summarizer
+from research_agent.core.context import count_tokens
+
+QUERY = "how do vector databases choose between HNSW and IVF indexes"
+TOPICAL = [
+    "HNSW builds a layered proximity graph and answers queries in logarithmic hops.",
+    "IVF clusters vectors with k-means and searches only the nearest lists.",
+    "Vector databases trade recall for latency through index parameters.",
+    "HNSW uses more memory than IVF because it stores graph edges per vector.",
+    "Product quantization compresses IVF lists so large collections fit in RAM.",
+    "Choosing an index depends on collection size, update rate and recall targets.",
+]
+FILLER = [
+    "The author previously covered cloud pricing and team processes.",
+    "Some readers asked about unrelated frameworks in the comments.",
+    "Our conference schedule for next year is now available.",
+    "The benchmark machine had plenty of cores and fast disks.",
+]
+BOILERPLATE = [
+    "Sign up for our newsletter to get the latest articles in your inbox.",
+    "This site uses cookies to improve your experience.",
+    "Related posts: ten tips for faster databases.",
+    "Share this article on social media.",
+    "All rights reserved.",
+]
+
+
+def corpus(n_results: int, sentences: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    results = []
+    for i in range(n_results):
+        body = []
+        for j in range(sentences):
+            if rng.random() < 0.35:
+                body.append(
+                    f"{rng.choice(TOPICAL)[:-1]}, measured at {rng.randint(1, 99)}% "
+                    f"recall in test {i}-{j}."
+                )
+            else:
+                body.append(f"{rng.choice(FILLER)} ({i}-{j})")
+        # Site chrome repeated verbatim across pages
+        body.extend(BOILERPLATE)
+        results.append(
+            SearchResult(
+                title=f"Article {i}",
+                url=f"https://example.com/{i}",
+                snippet=" ".join(body),
+            )
+        )
+    # Syndicated copy of the first article under another URL
+    results.append(
+        SearchResult(
+            title="Mirror", url="https://mirror.example/0", snippet=results[0].snippet
+        )
+    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--results", type=int, default=5)
+    parser.add_argument("--sentences", type=int, default=60)
+    args = parser.parse_args()
+    results = corpus(args.results, args.sentences)
+    settings.context_budget_enabled = False
+    verbatim = count_tokens(str(Summarizer.build_prompt(QUERY, results)))
+    settings.context_budget_enabled = True
+    rows = []
+    for key, model in ALLOWED_FREE_MODELS.items():
+        start = time.perf_counter()
+        prompt = Summarizer.build_prompt(QUERY, results, model)
+        build_ms = (time.perf_counter() - start) * 1000
+        rows.append(
+            {
+                "model": key,
+                "budget": context_budget(model),
+                "prompt_tokens": count_tokens(str(prompt)),
+                "verbatim_prompt_tokens": verbatim,
+                "sources_cited": sum(r.url in prompt.user for r in results),
+                "sources_total": len(results),
+                "build_ms": round(build_ms, 2),
+            }
+        )
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
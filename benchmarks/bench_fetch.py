@@ -0,0 +1,128 @@
+"""Wall-clock time of the page fetch stage: sequential vs concurrent.
+
+Serves article pages from local stub servers, one per simulated host, each
+with its own fixed latency (`--delays`, in ms), and fetches one page per host:
+
+- sequential: one page after another, as a loop over `fetch_page` would
+- concurrent: `fetch_pages`, the stage the pipeline runs
+- cached: `fetch_pages` again with the page cache warm
+- revalidated: with the cache TTL at 0, so every page is a 304
+
+Also reports the extraction time for one stub page. The stub pages are
+small and local, so this measures the scheduling, not real-world
+bandwidth. Usage:
+
+    python -m benchmarks.bench_fetch --delays 100,200,400,800 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.harness import emit, percentiles, report
+from benchmarks.stubs import PAGE, StubServer
+from research_agent.app.deps import logger, settings
+from research_agent.core import fetch
+from research_agent.core.clients import registry
+
+
+async def _sequential(urls: List[str]) -> None:
+    for url in urls:
+        await fetch.fetch_page(url, None)
+
+
+def _timed(coro_fn, urls: List[str], repeat: int) -> List[float]:
+    async def run() -> List[float]:
+        samples = []
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                await coro_fn(urls)
+                samples.append((time.perf_counter() - start) * 1000)
+        finally:
+            await registry.aclose()
+        return samples
+
+    return asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delays", default="100,200,400,800")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    delays = [float(d) for d in args.delays.split(",")]
+    servers = [StubServer().start() for _ in delays]
+    urls = [
+        f"{s.base_url}/pages/{i}?ms={ms:g}"
+        for i, (s, ms) in enumerate(zip(servers, delays))
+    ]
+    settings.fetch_deadline_s = sum(delays) / 1000 + 5
+    results: List[Dict] = []
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            settings.data_dir = data_dir
+            fetch.reset_page_cache()
+            settings.fetch_cache_enabled = False
+            cases = [("sequential", _sequential), ("concurrent", fetch.fetch_pages)]
+            for name, fn in cases:
+                results.append(
+                    {
+                        "scenario": name,
+                        "wall_ms": percentiles(_timed(fn, urls, args.repeat)),
+                    }
+                )
+            settings.fetch_cache_enabled = True
+            _timed(fetch.fetch_pages, urls, 1)  # fill the cache
+            results.append(
+                {
+                    "scenario": "cached",
+                    "wall_ms": percentiles(
+                        _timed(fetch.fetch_pages, urls, args.repeat)
+                    ),
+                }
+            )
+            settings.fetch_cache_ttl_s = 0.0
+            results.append(
+                {
+                    "scenario": "revalidated",
+                    "wall_ms": percentiles(
+                        _timed(fetch.fetch_pages, urls, args.repeat)
+                    ),
+                }
+            )
+            fetch.reset_page_cache()
+    finally:
+        for server in servers:
+            server.stop()
+
+    page = PAGE.format(name="bench") * 20
+    start = time.perf_counter()
+    for _ in range(100):
+        fetch.extract_text(page, settings.fetch_max_chars)
+    extract_us = round((time.perf_counter() - start) / 100 * 1e6, 1)
+    results.append(
+        {"scenario": "extract", "page_bytes": len(page), "per_page_us": extract_us}
+    )
+    emit(
+        report(
+            results,
+            delays_ms=delays,
+            slowest_ms=max(delays),
+            sum_ms=sum(delays),
+            corpus="local stub pages",
+        ),
+        args.out,
+    )
+
+
+if __name__ == "__main__":
+    main()
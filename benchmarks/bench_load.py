@@ -0,0 +1,277 @@
+"""Load scenarios against the FastAPI app backed by stub providers.
+
+Starts the stub Tavily/OpenAI server and the app (uvicorn, in-process) and
+drives one or more scenarios, printing a JSON report. Usage:
+
+    python -m benchmarks.bench_load --scenario all --out bench.json
+    python -m benchmarks.bench_load --scenario rps --rps 50 --duration 20
+
+Scenarios:
+- single: sequential `POST /agents/research`, one request at a time.
+- rps: open-loop load at a fixed arrival rate (requests are not delayed by
+  slow responses, so queueing shows up in the tail).
+- fallback: the primary model answers 429 to every call, so each request
+  runs the fallback chain until its circuit breaker opens.
+- stream: `POST /agents/research/stream`, time to first SSE event and to end.
+- history: paged and full-text `GET /agents/research/history` reads.
+- trending: `--concurrency` identical requests at once, repeated for
+  `--requests` distinct queries; upstream call counts show coalescing.
+
+Pass `--url` to target an app started elsewhere (point its
+`TAVILY_BASE_URL`/`OPENROUTER_BASE_URL` at `python -m benchmarks.stubs`).
+The load generator shares this process, so RSS and tail latency include it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from benchmarks.harness import AppServer, emit, percentiles, report
+from benchmarks.stubs import Behaviour, StubConfig, StubServer
+from research_agent.app.deps import settings
+
+SCENARIOS = ("single", "rps", "fallback", "stream", "history", "trending")
+HISTORY_SUMMARY = "Vector databases index embeddings for similarity search. " * 6
+
+
+async def _timed(client: httpx.AsyncClient, method: str, path: str, **kw) -> tuple:
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kw)
+        status = response.status_code
+        body = response.json() if status == 200 else None
+    except httpx.HTTPError as e:
+        status, body = type(e).__name__, None
+    return (time.perf_counter() - start) * 1000, status, body
+
+
+def _payload(args, query: str) -> Dict[str, Any]:
+    return {"query": query, "deep": True} if args.deep else {"query": query}
+
+
+def _status_counts(statuses: List[Any]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for status in statuses:
+        counts[str(status)] = counts.get(str(status), 0) + 1
+    return counts
+
+
+async def single(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    samples, statuses = [], []
+    for i in range(args.requests):
+        ms, status, _ = await _timed(
+            client, "POST", "/agents/research", json=_payload(args, f"single {i}")
+        )
+        samples.append(ms)
+        statuses.append(status)
+    return {"latency": percentiles(samples), "status": _status_counts(statuses)}
+
+
+async def rps(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    total = int(args.rps * args.duration)
+    start = time.perf_counter()
+
+    async def fire(i: int) -> tuple:
+        await asyncio.sleep(max(0.0, start + i / args.rps - time.perf_counter()))
+        return await _timed(
+            client, "POST", "/agents/research", json=_payload(args, f"load {i}")
+        )
+
+    results = await asyncio.gather(*(fire(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    ok = [ms for ms, status, _ in results if status == 200]
+    return {
+        "target_rps": args.rps,
+        "duration_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2),
+        "latency": percentiles(ok),
+        "status": _status_counts([status for _, status, _ in results]),
+    }
+
+
+async def fallback(client: httpx.AsyncClient, args, stub: StubServer):
+    stub.set_model(settings.model_name, stub.with_chat(rate_limit_rate=1.0))
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> tuple:
+        async with sem:
+            return await _timed(
+                client, "POST", "/agents/research", json=_payload(args, f"storm {i}")
+            )
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    stub.config.models.pop(settings.model_name, None)
+    attempts = [
+        len((body.get("metadata") or {}).get("attempts") or [])
+        for _, _, body in results
+        if body
+    ]
+    return {
+        "throughput_rps": round(len(results) / elapsed, 2),
+        "latency": percentiles([ms for ms, _, _ in results]),
+        "status": _status_counts([status for _, status, _ in results]),
+        "mean_attempts": round(sum(attempts) / len(attempts), 2) if attempts else 0,
+        "upstream": stub.counts,
+    }
+
+
+async def stream(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    first, total = [], []
+    for i in range(args.requests):
+        start = time.perf_counter()
+        seen_first = False
+        async with client.stream(
+            "POST", "/agents/research/stream", json=_payload(args, f"stream {i}")
+        ) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("event:") and not seen_first:
+                    first.append((time.perf_counter() - start) * 1000)
+                    seen_first = True
+        total.append((time.perf_counter() - start) * 1000)
+    return {"first_event": percentiles(first), "complete": percentiles(total)}
+
+
+async def history_reads(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    from research_agent.services import history
+
+    backend = history.get_history_backend()
+    existing, _ = backend.page(limit=1)
+    if not existing:
+        for i in range(args.history_rows):
+            backend.append(
+                {
+                    "query": f"history query {i} topic{i % 50}",
+                    "final_summary": HISTORY_SUMMARY,
+                    "sources": [{"title": "S", "url": f"https://example.com/{i}"}],
+                }
+            )
+    page_ms: List[float] = []
+    cursor = None
+    for _ in range(args.requests):
+        params: Dict[str, Any] = {"limit": 20}
+        if cursor:
+            params["before"] = cursor
+        ms, _, body = await _timed(
+            client, "GET", "/agents/research/history", params=params
+        )
+        page_ms.append(ms)
+        cursor = (body or {}).get("next_cursor")
+    search_ms = []
+    for i in range(args.requests):
+        ms, _, _ = await _timed(
+            client, "GET", "/agents/research/history", params={"q": f"topic{i % 50}"}
+        )
+        search_ms.append(ms)
+    return {
+        "rows": args.history_rows,
+        "page": percentiles(page_ms),
+        "search": percentiles(search_ms),
+    }
+
+
+async def trending(client: httpx.AsyncClient, args, stub: StubServer):
+    samples, statuses = [], []
+    for i in range(args.requests):
+        payload = _payload(args, f"trending topic {i}")
+        results = await asyncio.gather(
+            *(
+                _timed(client, "POST", "/agents/research", json=payload)
+                for _ in range(args.concurrency)
+            )
+        )
+        samples += [ms for ms, _, _ in results]
+        statuses += [status for _, status, _ in results]
+    requests = args.requests * args.concurrency
+    counts = stub.counts
+    return {
+        "requests": requests,
+        "latency": percentiles(samples),
+        "status": _status_counts(statuses),
+        "upstream": counts,
+        "upstream_per_request": round(sum(counts.values()) / requests, 3),
+    }
+
+
+async def run(args, stub: StubServer, base_url: str) -> List[Dict[str, Any]]:
+    from research_agent.core.health import health
+
+    drivers: Dict[str, Callable] = {
+        "single": single,
+        "rps": rps,
+        "fallback": lambda c, a: fallback(c, a, stub),
+        "stream": stream,
+        "history": history_reads,
+        "trending": lambda c, a: trending(c, a, stub),
+    }
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    results = []
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        for name in args.scenarios:
+            health.reset()
+            stub.reset_counters()
+            start = time.perf_counter()
+            data = await drivers[name](client, args)
+            data["wall_s"] = round(time.perf_counter() - start, 2)
+            results.append({"scenario": name, **data})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", default="all", help=f"all or {SCENARIOS}")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--history-rows", type=int, default=10_000)
+    parser.add_argument("--chat-ms", type=float, default=400.0)
+    parser.add_argument("--search-ms", type=float, default=80.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--stub-port", type=int, default=0)
+    parser.add_argument("--deep", action="store_true", help="use deep search")
+    parser.add_argument("--url", help="benchmark an already running app")
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+    args.scenarios = (
+        list(SCENARIOS) if args.scenario == "all" else args.scenario.split(",")
+    )
+
+    config = StubConfig(
+        search=Behaviour(median_ms=args.search_ms),
+        chat=Behaviour(median_ms=args.chat_ms, error_rate=args.error_rate),
+    )
+    with tempfile.TemporaryDirectory() as data_dir, StubServer(
+        config, port=args.stub_port
+    ) as stub:
+        stub.configure_settings()
+        settings.data_dir = os.environ.get("DATA_DIR", data_dir)
+        settings.persist_results = True
+        settings.history_mirror_sheets = False
+        if args.url:
+            results = asyncio.run(run(args, stub, args.url))
+        else:
+            from research_agent.app.main import app
+
+            with AppServer(app) as server:
+                results = asyncio.run(run(args, stub, server.url))
+    meta = {
+        "stub": {"chat_ms": args.chat_ms, "search_ms": args.search_ms},
+        "deep": args.deep,
+    }
+    emit(report(results, **meta), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Request-path cost of logging, written inline vs from a background queue.
+
+Modes (`deps.configure_logging` with these settings):
+
+- `sync_text`: console and rotating-file handlers on the logger, so every
+  record is formatted and written by the task that logs it (LOG_ASYNC=false)
+- `queue_text` / `queue_json`: the request path only enqueues; a listener
+  thread formats and writes (LOG_ASYNC=true, LOG_FORMAT=text|json)
+
+Scenarios, per mode:
+
+- `calls`: `--threads` threads each write `--records` access-log lines;
+  reports the time spent inside `logger.info` per call
+- `requests`: `--requests` `GET /health` through the app (in-process ASGI)
+  with `--concurrency` in flight; reports request latency and throughput
+
+Console output goes to a file in a temporary directory, next to `app.log`.
+`--sink-delay-ms` adds a sleep to every handler write, standing in for a
+slow disk or a blocked stdout pipe. Usage:
+
+    python -m benchmarks.bench_logging --records 20000 --sink-delay-ms 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.harness import emit, percentiles, report
+from research_agent.app import logs
+from research_agent.app.deps import configure_logging, logger, settings
+
+MODES = {
+    "sync_text": (False, "text"),
+    "queue_text": (True, "text"),
+    "queue_json": (True, "json"),
+}
+
+
+def _configure(mode: str, log_dir: str, sink_delay_ms: float) -> List:
+    settings.log_async, settings.log_format = MODES[mode]
+    settings.log_dir = log_dir
+    settings.log_level = "INFO"
+    stderr = sys.stderr
+    # StreamHandler binds sys.stderr when created
+    sys.stderr = open(os.path.join(log_dir, "console.log"), "a", encoding="utf-8")
+    try:
+        configure_logging()
+    finally:
+        console, sys.stderr = sys.stderr, stderr
+    sinks = logs._active[1].handlers if logs._active else logger.handlers
+    if sink_delay_ms:
+        for handler in sinks:
+            write = handler.emit
+
+            def slow(record, write=write):
+                time.sleep(sink_delay_ms / 1000)
+                write(record)
+
+            handler.emit = slow
+    return [console]
+
+
+def _lines(log_dir: str) -> int:
+    with open(os.path.join(log_dir, "app.log"), encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def _calls(threads: int, records: int) -> Dict:
+    samples: List[List[float]] = [[] for _ in range(threads)]
+
+    def worker(out: List[float]) -> None:
+        for i in range(records):
+            start = time.perf_counter()
+            logger.info(
+                "request_id=%s method=%s path=%s status=%s time_ms=%s",
+                f"bench-{i}",
+                "GET",
+                "/health",
+                200,
+                3,
+                extra={"status": 200, "latency_ms": 3},
+            )
+            out.append((time.perf_counter() - start) * 1000)
+
+    pool = [threading.Thread(target=worker, args=(s,)) for s in samples]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "calls_per_s": round(threads * records / elapsed, 1),
+        "per_call": percentiles([ms for s in samples for ms in s]),
+    }
+
+
+def _requests(total: int, concurrency: int) -> Dict:
+    import httpx
+
+    from research_agent.app.main import app
+
+    async def run() -> List[float]:
+        latencies: List[float] = []
+        transport = httpx.ASGITransport(app=app)
+        queue = iter(range(total))
+        async with httpx.AsyncClient(transport=transport, base_url="http://x") as c:
+
+            async def client() -> None:
+                for _ in queue:
+                    start = time.perf_counter()
+                    response = await c.get("/health")
+                    response.raise_for_status()
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+        return latencies
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run())
+    return {
+        "requests_per_s": round(total / (time.perf_counter() - start), 1),
+        "latency": percentiles(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--queue-size", type=int, default=settings.log_queue_size)
+    parser.add_argument("--sink-delay-ms", type=float, default=0.0)
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    settings.prewarm_clients = False
+    settings.log_queue_size = args.queue_size
+    results = []
+    for mode in MODES:
+        for scenario in ("calls", "requests"):
+            with tempfile.TemporaryDirectory() as log_dir:
+                opened = _configure(mode, log_dir, args.sink_delay_ms)
+                handler = logger.handlers[0]
+                if scenario == "calls":
+                    result = _calls(args.threads, args.records)
+                else:
+                    result = _requests(args.requests, args.concurrency)
+                # Time until everything queued is on disk
+                start = time.perf_counter()
+                logs.stop_queue_logging()
+                drain_ms = (time.perf_counter() - start) * 1000
+                for f in opened:
+                    f.close()
+                results.append(
+                    {
+                        "scenario": f"{scenario}_{mode}",
+                        **result,
+                        "drain_ms": round(drain_ms, 1),
+                        "lines_written": _lines(log_dir),
+                        "dropped": getattr(handler, "dropped", 0),
+                    }
+                )
+    logger.handlers.clear()
+    logger.setLevel(logging.WARNING)
+    emit(
+        report(
+            results,
+            queue_size=args.queue_size,
+            sink_delay_ms=args.sink_delay_ms,
+            cpus=os.cpu_count(),
+        ),
+        args.out,
+    )
+
+
+if __name__ == "__main__":
+    main()
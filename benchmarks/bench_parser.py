@@ -0,0 +1,164 @@
+"""Parse time and recovered sources: previous `parse_content` vs the current one.
+
+The corpus is synthetic, shaped after answers free OpenRouter models give to
+the research prompt: the requested `# Summary`/`# Sources` layout, `##`
+headings, numbered and reference-style source lists, bold "Sources:" labels,
+titles with brackets and Wikipedia-style URLs with parentheses. The
+`*_standard` scenarios use only the layout the prompt asks for
+(`# Summary`, `# Sources`, `- [Title](URL)`), which has a fast path. Usage:
+
+    python -m benchmarks.bench_parser --docs 500 --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.harness import emit, report
+from research_agent.core.parsing import parse_content
+
+PARAGRAPH = (
+    "Vector databases index embeddings so that nearest-neighbour queries stay "
+    "fast as collections grow. HNSW trades memory for recall, while IVF "
+    "partitions the space and probes only a few lists. "
+)
+TITLES = [
+    "Faiss: A library for efficient similarity search",
+    "pgvector [GitHub] README",
+    "Hierarchical Navigable Small World (HNSW) graphs",
+    "Milvus documentation",
+    "ANN benchmarks",
+]
+URLS = [
+    "https://github.com/facebookresearch/faiss",
+    "https://github.com/pgvector/pgvector",
+    "https://en.wikipedia.org/wiki/Small-world_network_(graph)",
+    "https://milvus.io/docs/index.md?utm_source=chat",
+    "https://ann-benchmarks.com/",
+]
+
+
+def _summary(rng: random.Random) -> str:
+    sections = []
+    for i in range(rng.randint(2, 6)):
+        body = PARAGRAPH * rng.randint(1, 4)
+        bullets = "\n".join(f"- Point {j}: {PARAGRAPH[:80]}" for j in range(3))
+        sections.append(f"### Part {i + 1}\n{body}\n\n{bullets}")
+    return "\n\n".join(sections)
+
+
+def _sources(rng: random.Random, layout: str) -> str:
+    picks = rng.sample(range(len(TITLES)), 3)
+    if layout == "bullets":
+        return "\n".join(f"- [{TITLES[i]}]({URLS[i]})" for i in picks)
+    if layout == "numbered":
+        return "\n".join(
+            f"{n}. [{TITLES[i]}]({URLS[i]})" for n, i in enumerate(picks, 1)
+        )
+    if layout == "reference":
+        refs = "\n".join(f"- [{TITLES[i]}][{n}]" for n, i in enumerate(picks, 1))
+        defs = "\n".join(f"[{n}]: {URLS[i]}" for n, i in enumerate(picks, 1))
+        return f"{refs}\n\n{defs}"
+    return "\n".join(f"{n}. {TITLES[i]} - {URLS[i]}" for n, i in enumerate(picks, 1))
+
+
+def corpus(n: int, seed: int = 7, standard: bool = False) -> List[str]:
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(n):
+        layout = rng.choice(["bullets", "numbered", "reference", "plain"])
+        summary_heading, sources_heading = rng.choice(
+            [
+                ("# Summary", "# Sources"),
+                ("## Summary", "## Sources"),
+                ("# Summary", "**Sources:**"),
+                ("## Summary", "### References"),
+            ]
+        )
+        if standard:
+            layout, summary_heading, sources_heading = (
+                "bullets",
+                "# Summary",
+                "# Sources",
+            )
+        docs.append(
+            f"{summary_heading}\n{_summary(rng)}\n\n"
+            f"{sources_heading}\n{_sources(rng, layout)}\n"
+        )
+    return docs
+
+
+def legacy_parse_content(content: str) -> Dict[str, Any]:
+    """The string-splitting parser this benchmark replaced, kept as a baseline."""
+
+    def parse_line(line: str):
+        s = line.strip()
+        if s.startswith("- ") or s.startswith("* "):
+            s = s[2:].strip()
+        if s.startswith("[") and "](" in s and s.endswith(")"):
+            try:
+                text = s[s.index("[") + 1 : s.index("]")]
+                url = s[s.index("(") + 1 : s.index(")")]
+                return {"title": text, "url": url}
+            except Exception:
+                return None
+        elif s.startswith("http"):
+            return {"title": s, "url": s}
+        return None
+
+    sources = []
+    if "# Sources" in content:
+        for line in content.split("# Sources", 1)[1].splitlines():
+            source = parse_line(line)
+            if source is not None:
+                sources.append(source)
+    if "# Summary" in content:
+        summary = content.split("# Summary", 1)[1].split("# Sources", 1)[0].strip()
+    else:
+        summary = content.strip()
+    return {"summary_md": summary, "sources": sources}
+
+
+def measure(name: str, parse: Callable, docs: List[str], repeat: int) -> Dict:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for doc in docs:
+            parse(doc)
+    per_doc_us = (time.perf_counter() - start) / (repeat * len(docs)) * 1e6
+    parsed = [parse(doc) for doc in docs]
+    exact = sum(
+        all(s["url"] in URLS for s in p["sources"]) and len(p["sources"]) == 3
+        for p in parsed
+    )
+    return {
+        "scenario": name,
+        "per_doc_us": round(per_doc_us, 2),
+        "docs_with_3_correct_sources": exact,
+        "docs": len(docs),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    docs = corpus(args.docs)
+    standard = corpus(args.docs, standard=True)
+    results = [
+        measure("legacy", legacy_parse_content, docs, args.repeat),
+        measure("current", parse_content, docs, args.repeat),
+        measure("legacy_standard", legacy_parse_content, standard, args.repeat),
+        measure("current_standard", parse_content, standard, args.repeat),
+    ]
+    mean_chars = sum(map(len, docs)) // len(docs)
+    emit(report(results, corpus="synthetic", mean_chars=mean_chars), args.out)
+
+
+if __name__ == "__main__":
+    main()
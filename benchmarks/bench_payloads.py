@@ -0,0 +1,146 @@
+"""Response size and serialization cost of the large JSON endpoints.
+
+Seeds the SQLite history with synthetic Markdown summaries (Zipf-distributed
+pseudo-words, with sources from the `bench_parser` corpus) and measures:
+
+- serialization: rendering a `limit=100` history page and a research
+  response with the stdlib encoder (FastAPI's `JSONResponse`) vs orjson
+- wire: bytes and time per `GET /agents/research/history?limit=100` through
+  the app with no compression, gzip and (if installed) brotli, and with a
+  matching `If-None-Match` (304). Request times include the test client
+  decoding the body.
+
+Usage:
+
+    python -m benchmarks.bench_payloads --repeat 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from benchmarks.bench_parser import corpus
+from benchmarks.harness import emit, report
+from research_agent.app.deps import logger, settings
+from research_agent.app.schemas import ResearchHistoryResponse, ResearchResponse
+from research_agent.core.parsing import parse_content
+
+WEIGHTS = [1.0 / rank for rank in range(1, 2001)]
+
+
+def _prose(rng: random.Random, vocabulary: List[str], words: int) -> str:
+    # Zipf-like word frequencies compress about as well as English prose;
+    # the repeated paragraphs of the parser corpus would flatter gzip
+    picks = rng.choices(vocabulary, weights=WEIGHTS[: len(vocabulary)], k=words)
+    return " ".join(picks).capitalize() + "."
+
+
+def _records(n: int, seed: int = 11) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    letters = "etaoinshrdlcumwfgypbvkjxqz"
+    vocabulary = [
+        "".join(rng.choices(letters, weights=range(26, 0, -1), k=rng.randint(2, 9)))
+        for _ in range(len(WEIGHTS))
+    ]
+    records = []
+    for i, doc in enumerate(corpus(n, seed)):
+        sections = [
+            f"### Part {j + 1}\n{_prose(rng, vocabulary, 120)}\n\n"
+            + "\n".join(f"- {_prose(rng, vocabulary, 14)}" for _ in range(3))
+            for j in range(rng.randint(2, 5))
+        ]
+        records.append(
+            {
+                "query": f"benchmark query {i}",
+                "final_summary": "\n\n".join(sections),
+                "sources": parse_content(doc)["sources"],
+                "created_at": "2025-01-01T00:00:00+00:00",
+            }
+        )
+    return records
+
+
+def _per_call_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - start) / repeat * 1e6, 1)
+
+
+def serialization(records: List[Dict[str, Any]], repeat: int) -> List[Dict]:
+    page = ResearchHistoryResponse(items=records[:100]).model_dump(mode="json")
+    answer = ResearchResponse(**{**records[0]}).model_dump(mode="json")
+    results = []
+    for name, content in (("history_page", page), ("research", answer)):
+        stdlib = JSONResponse(content).body
+        results.append(
+            {
+                "scenario": f"serialize_{name}",
+                "bytes": len(stdlib),
+                "stdlib_us": _per_call_us(lambda: JSONResponse(content), repeat),
+                "orjson_us": _per_call_us(lambda: ORJSONResponse(content), repeat),
+                "same_json": ORJSONResponse(content).body == stdlib,
+            }
+        )
+    return results
+
+
+def wire(records: List[Dict[str, Any]], repeat: int) -> List[Dict]:
+    from fastapi.testclient import TestClient
+
+    from research_agent.app.compression import _brotli
+    from research_agent.app.main import app
+    from research_agent.services import history
+
+    for record in records:
+        history.record_result(record)
+    encodings = ["identity", "gzip"] + (["br"] if _brotli() else [])
+    results = []
+    with TestClient(app) as client:
+        path, params = "/agents/research/history", {"limit": 100}
+        etag = client.get(path, params=params).headers["etag"]
+        cases = [(e, {"Accept-Encoding": e}) for e in encodings]
+        cases.append(("304", {"Accept-Encoding": "gzip", "If-None-Match": etag}))
+        for name, headers in cases:
+            response = client.get(path, params=params, headers=headers)
+            results.append(
+                {
+                    "scenario": f"history_{name}",
+                    "status": response.status_code,
+                    "wire_bytes": response.num_bytes_downloaded,
+                    "per_request_us": _per_call_us(
+                        lambda: client.get(path, params=params, headers=headers),
+                        repeat,
+                    ),
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)  # one access log line per request
+    records = _records(args.records)
+    with tempfile.TemporaryDirectory() as data_dir:
+        settings.data_dir = os.environ.get("DATA_DIR", data_dir)
+        settings.history_mirror_sheets = False
+        settings.prewarm_clients = False
+        results = serialization(records, args.repeat) + wire(records, args.repeat)
+    emit(report(results, corpus="synthetic"), args.out)
+
+
+if __name__ == "__main__":
+    main()
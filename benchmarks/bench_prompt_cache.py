@@ -0,0 +1,112 @@
+"""Prompt-cache hits and token cost by prompt layout.
+
+Runs `--queries` distinct research queries through the pipeline against the
+local stub, which reports cached prompt tokens the way providers with prefix
+caching do (leading messages repeated from an earlier request). Layouts:
+
+- `system_user`: fixed instructions in a system message, then the query and
+  search context in the user message (the current layout)
+- `single_message`: one user message with the query and context before the
+  instructions (the previous layout)
+
+Reports input, cached and output tokens per request, the cache hit rate and
+the estimated cost at the `grok` prices in `MODEL_PRICES`. The stub counts
+four characters per token and caches whole messages; real providers cache
+token prefixes above a minimum length (1024 tokens at OpenAI). Usage:
+
+    python -m benchmarks.bench_prompt_cache --queries 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from typing import Dict, List
+from unittest.mock import patch
+
+from benchmarks.harness import emit, report
+from benchmarks.stubs import Behaviour, StubConfig, StubServer
+from research_agent.app.deps import ALLOWED_FREE_MODELS, logger, settings
+from research_agent.core.clients import registry
+from research_agent.core.components import Summarizer
+from research_agent.core.research import run_research_async
+
+TOPICS = ["vector", "graph", "columnar", "time-series", "document", "key-value"]
+ASPECTS = ["indexing", "replication", "query planning", "compression", "backups"]
+
+
+def _queries(n: int) -> List[str]:
+    return [
+        f"{ASPECTS[i % len(ASPECTS)]} in {TOPICS[i // len(ASPECTS) % len(TOPICS)]} "
+        f"databases ({i})"
+        for i in range(n)
+    ]
+
+
+_build_prompt = Summarizer.build_prompt
+
+
+def _single_message(query, results, model=None, structured=None) -> str:
+    prompt = _build_prompt(query, results, model, structured)
+    return f"{prompt.user}\n{prompt.system}"
+
+
+async def _run(queries: List[str], model: str) -> List[Dict]:
+    try:
+        return [
+            (await run_research_async(q, model_name=model))["usage"] for q in queries
+        ]
+    finally:
+        await registry.aclose()
+
+
+def _scenario(name: str, usages: List[Dict]) -> Dict:
+    n = len(usages)
+    input_tokens = sum(u["input_tokens"] for u in usages)
+    cached = sum(u["cached_tokens"] for u in usages)
+    return {
+        "scenario": name,
+        "requests": n,
+        "input_tokens_per_request": round(input_tokens / n, 1),
+        "cached_tokens_per_request": round(cached / n, 1),
+        "output_tokens_per_request": round(
+            sum(u["output_tokens"] for u in usages) / n, 1
+        ),
+        "cache_hit_rate": round(cached / input_tokens, 4) if input_tokens else 0.0,
+        "cost_usd_per_1k_requests": round(
+            sum(u["cost_usd"] for u in usages) / n * 1000, 4
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    settings.cache_enabled = False
+    settings.coalesce_requests = False
+    model = ALLOWED_FREE_MODELS["grok"]
+    fast = Behaviour(median_ms=0.0, sigma=0.0)
+    queries = _queries(args.queries)
+    results = []
+    for name in ("single_message", "system_user"):
+        # A fresh stub per layout, so neither sees the other's prefixes
+        with StubServer(StubConfig(search=fast, chat=fast)) as stub:
+            stub.configure_settings()
+            if name == "single_message":
+                with patch.object(Summarizer, "build_prompt", _single_message):
+                    usages = asyncio.run(_run(queries, model))
+            else:
+                usages = asyncio.run(_run(queries, model))
+        results.append(_scenario(name, usages))
+    emit(
+        report(results, model=model, corpus="synthetic queries, stub search"), args.out
+    )
+
+
+if __name__ == "__main__":
+    main()
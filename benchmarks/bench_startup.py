@@ -0,0 +1,130 @@
+"""Cold-start cost of the app: import time, startup (lifespan) and first request.
+
+Each run is a fresh interpreter, so nothing is cached in `sys.modules`. The
+first request is a `POST /agents/research` answered by the stub providers
+(5ms latency), so it shows what the lifespan pre-warm moves out of it.
+Usage:
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --eager   # also import the provider stack
+
+`--eager` imports LangChain and gspread up front, as the app did before
+provider modules were loaded lazily, to show what lazy imports save.
+The heaviest modules come from `python -X importtime`; times are cumulative
+(a module includes everything it imports).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.harness import emit, report
+from benchmarks.stubs import Behaviour, StubConfig, StubServer
+
+EAGER = "import langchain_openai, langchain_tavily, gspread\n"
+PROBE = """
+import json, time
+start = time.perf_counter()
+{eager}import research_agent.app.main as main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    started = time.perf_counter()
+    client.post("/agents/research", json={{"query": "cold start"}})
+    done = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+    "first_request_ms": (done - started) * 1000,
+}}))
+"""
+
+
+def _probe(args, stub: StubServer, data_dir: str) -> Dict[str, float]:
+    code = PROBE.format(eager=EAGER if args.eager else "")
+    env = {
+        **_base_env(),
+        "PREWARM_CLIENTS": "true" if args.prewarm else "false",
+        "TAVILY_API_KEY": "stub",
+        "OPENROUTER_API_KEY": "stub",
+        "TAVILY_BASE_URL": stub.base_url,
+        "OPENROUTER_BASE_URL": f"{stub.base_url}/v1",
+        "DATA_DIR": data_dir,
+        "PERSIST_RESULTS": "false",
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _importtime(args, top: int) -> List[Dict[str, Any]]:
+    code = (EAGER if args.eager else "") + "import research_agent.app.main"
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_base_env(),
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[12:].split("|"))
+        if cumulative.isdigit() and name.split(".")[0] != "research_agent":
+            rows.append({"module": name, "cumulative_ms": int(cumulative) / 1000})
+    # Keep top-level packages only; submodules repeat their parent's cost
+    top_level = [r for r in rows if "." not in r["module"]]
+    top_level.sort(key=lambda r: -r["cumulative_ms"])
+    return top_level[:top]
+
+
+def _base_env() -> Dict[str, str]:
+    import os
+
+    # Keep runs offline and quiet: no provider keys, no tracing
+    env = {k: v for k, v in os.environ.items() if not k.endswith("_API_KEY")}
+    env["OTEL_ENABLED"] = "false"
+    return env
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--eager", action="store_true")
+    parser.add_argument("--no-prewarm", dest="prewarm", action="store_false")
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    fast = Behaviour(median_ms=5.0, sigma=0.0)
+    config = StubConfig(search=fast, chat=fast)
+    with tempfile.TemporaryDirectory() as data_dir, StubServer(config) as stub:
+        samples = [_probe(args, stub, data_dir) for _ in range(args.runs)]
+    summary = {
+        key: round(statistics.median(s[key] for s in samples), 1)
+        for key in ("import_ms", "startup_ms", "first_request_ms")
+    }
+    scenario = {
+        "scenario": "eager" if args.eager else "lazy",
+        "prewarm": args.prewarm,
+        "runs": args.runs,
+        "median": summary,
+        "heaviest_imports": _importtime(args, args.top),
+    }
+    emit(report([scenario]), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Throughput of `python -m research_agent.serve` by worker count.
+
+Starts the serving entry point as a subprocess for each worker count and
+drives a CPU-bound endpoint with closed-loop load: `GET
+/agents/research/history` pages of `--limit` rows from a seeded SQLite
+history, which is mostly query decoding and JSON serialization. Usage:
+
+    python -m benchmarks.bench_workers --workers 1,2,4 --duration 10
+
+Scaling is bounded by the cores on the host. The load generator runs here
+too and takes a share of them, so compare runs on the same machine and
+leave a core free for the driver where possible.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.harness import emit, free_port, percentiles, report
+from research_agent.serve import available_cpus
+
+SUMMARY = "Vector databases index embeddings for similarity search. " * 20
+
+
+def _seed(data_dir: str, rows: int) -> None:
+    from research_agent.services.history import SQLiteHistoryStore
+
+    store = SQLiteHistoryStore(os.path.join(data_dir, "history.sqlite3"))
+    for i in range(rows):
+        store.append(
+            {
+                "query": f"history query {i}",
+                "final_summary": SUMMARY,
+                "sources": [{"title": "S", "url": f"https://example.com/{i}"}],
+            }
+        )
+
+
+def _start(workers: int, port: int, data_dir: str) -> subprocess.Popen:
+    env = {
+        **{k: v for k, v in os.environ.items() if not k.endswith("_API_KEY")},
+        "DATA_DIR": data_dir,
+        "LOG_LEVEL": "WARNING",
+        "PREWARM_CLIENTS": "false",
+        "OTEL_ENABLED": "false",
+    }
+    cmd = [sys.executable, "-m", "research_agent.serve"]
+    cmd += ["--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+    return subprocess.Popen(cmd, env=env)
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+async def _drive(url: str, args) -> Dict[str, Any]:
+    samples: List[float] = []
+    errors = 0
+    stop_at = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async def loop(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                response = await client.get(
+                    "/agents/research/history", params={"limit": args.limit}
+                )
+                response.raise_for_status()
+                samples.append((time.perf_counter() - start) * 1000)
+            except httpx.HTTPError:
+                errors += 1
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(loop(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "latency": percentiles(samples),
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        _seed(data_dir, args.rows)
+        for workers in (int(w) for w in args.workers.split(",")):
+            port = free_port()
+            server = _start(workers, port, data_dir)
+            try:
+                url = f"http://127.0.0.1:{port}"
+                _wait_ready(url)
+                data = asyncio.run(_drive(url, args))
+            finally:
+                # SIGTERM, as a container stop would send
+                server.terminate()
+                server.wait(timeout=60)
+            results.append({"scenario": f"workers={workers}", **data})
+    base = results[0]["throughput_rps"] or 1.0
+    for result in results:
+        result["speedup"] = round(result["throughput_rps"] / base, 2)
+    emit(report(results, cpus=available_cpus(), limit=args.limit), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""Local stand-ins for the Tavily search API and OpenAI-compatible chat API.
+
+The stub speaks just enough of both protocols for `TavilySearch` and
+`ChatOpenAI` (including `stream=True` SSE responses). Latency, error rate and
+429 rate are configurable globally and per model, so scenarios can simulate
+slow providers or a primary model that is being rate limited. Chat answers
+report token usage, with leading messages repeated from earlier requests
+counted as cached the way providers' prompt caches do.
+
+It also serves HTML article pages at `GET /pages/<name>?ms=<delay>` (with an
+ETag, answering 304 to a matching `If-None-Match`) for the page fetch stage.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from pydantic import SecretStr
+
+from research_agent.app.deps import settings
+
+SUMMARY = (
+    "# Summary\n"
+    "Vector databases index embeddings for approximate nearest neighbour "
+    "search. HNSW graphs trade memory for recall; IVF partitions trade recall "
+    "for speed.\n\n"
+    "# Sources\n"
+    "- [Result 0](https://example.com/0)\n"
+    "- [Result 1](https://example.com/1)\n"
+)
+
+
+@dataclass
+class Behaviour:
+    """How one endpoint (or one model) responds.
+
+    Latency is log-normal around `median_ms` (`sigma=0` makes it fixed).
+    `error_rate` answers 500 and `rate_limit_rate` answers 429 with a
+    `Retry-After` header; streamed responses send `stream_chunks` SSE events
+    `chunk_delay_ms` apart after the initial latency.
+    """
+
+    median_ms: float = 50.0
+    sigma: float = 0.3
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_s: float = 1.0
+    stream_chunks: int = 20
+    chunk_delay_ms: float = 5.0
+
+
+@dataclass
+class StubConfig:
+    search: Behaviour = field(default_factory=lambda: Behaviour(median_ms=80.0))
+    chat: Behaviour = field(default_factory=lambda: Behaviour(median_ms=400.0))
+    # model id -> overrides for the chat endpoint
+    models: Dict[str, Behaviour] = field(default_factory=dict)
+    results: int = 5
+    seed: Optional[int] = 0
+    # Point search results at this stub's /pages/<i> instead of example.com
+    result_pages: bool = False
+    pages: Behaviour = field(
+        default_factory=lambda: Behaviour(median_ms=150.0, sigma=0.0)
+    )
+    # Simulated provider prompt caching: leading messages identical to an
+    # earlier request's count as cached once they reach this many tokens
+    prompt_cache_min_tokens: int = 0
+
+
+PAGE = """<!doctype html><html><head><title>{name}</title>
+<script>window.analytics = {{track: function () {{}}}};</script>
+<style>body {{ font-family: sans-serif; }}</style></head><body>
+<header><nav><a href="/">Home</a> <a href="/docs">Docs</a> <a href="/blog">Blog</a>
+</nav></header>
+<article><h1>Page {name}</h1>
+<p>Page {name} explains how vector indexes answer nearest-neighbour queries.
+HNSW builds a layered proximity graph and searches it greedily from the top.</p>
+<p>IVF clusters the vectors and probes only the closest lists, which trades a
+little recall for much lower latency on large collections.</p>
+</article>
+<footer><p>Copyright 2025. <a href="/privacy">Privacy</a> <a href="/terms">Terms</a>
+</p></footer></body></html>"""
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Connections can burst well past the default listen backlog under load
+    request_queue_size = 1024
+
+    def __init__(self, address, handler, config: StubConfig) -> None:
+        super().__init__(address, handler)
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.rng_lock = threading.Lock()
+        self.counts_lock = threading.Lock()
+        self.connections = 0
+        self.counts: Dict[str, int] = {}
+        # JSON of every leading run of messages seen, for prompt caching
+        self.prefixes: set = set()
+
+    def process_request(self, request, client_address):
+        with self.counts_lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def count(self, key: str) -> None:
+        with self.counts_lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def draw(self) -> tuple:
+        with self.rng_lock:
+            return self.rng.random(), self.rng.gauss(0.0, 1.0)
+
+    def prompt_usage(self, messages: list) -> dict:
+        """OpenAI-style `usage` for a chat request, with simulated prefix caching.
+
+        Tokens are estimated at four characters each. The cached part is the
+        longest run of leading messages that an earlier request also began
+        with, as providers cache stable prompt prefixes.
+        """
+        tokens = [4 + len(str(m.get("content", ""))) // 4 for m in messages]
+        prefixes = [
+            json.dumps(messages[: i + 1], sort_keys=True) for i in range(len(messages))
+        ]
+        with self.counts_lock:
+            hits = 0
+            while hits < len(prefixes) and prefixes[hits] in self.prefixes:
+                hits += 1
+            # The final message is the one being answered; never all cached
+            hits = min(hits, len(messages) - 1)
+            self.prefixes.update(prefixes)
+        cached = sum(tokens[:hits])
+        if cached < self.config.prompt_cache_min_tokens:
+            cached = 0
+        return {
+            "prompt_tokens": sum(tokens),
+            "completion_tokens": 60,
+            "total_tokens": sum(tokens) + 60,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _Server
+
+    def do_GET(self):  # noqa: N802
+        path, _, query = self.path.partition("?")
+        if not path.startswith("/pages/"):
+            self._json(404, {"error": "not found"})
+            return
+        name = path[len("/pages/") :]
+        params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+        behaviour = self.server.config.pages
+        if "ms" in params:
+            behaviour = replace(behaviour, median_ms=float(params["ms"]), sigma=0.0)
+        self._respond(behaviour, f"page:{name}", None, page=name)
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            body = {}
+        config = self.server.config
+        if self.path.endswith("/search"):
+            self._respond(config.search, "search", lambda: self._search(body))
+        elif self.path.endswith("/chat/completions"):
+            model = body.get("model", "")
+            behaviour = config.models.get(model, config.chat)
+            usage = self.server.prompt_usage(body.get("messages", []))
+            if body.get("stream"):
+                with_usage = (body.get("stream_options") or {}).get("include_usage")
+                self._respond(
+                    behaviour, model, lambda: usage if with_usage else None, True
+                )
+            else:
+                self._respond(behaviour, model, lambda: self._completion(model, usage))
+        else:
+            self._json(404, {"error": "not found"})
+
+    def _respond(
+        self, behaviour: Behaviour, key, payload, stream=False, page=None
+    ) -> None:
+        roll, gauss = self.server.draw()
+        time.sleep(behaviour.median_ms / 1000 * math.exp(behaviour.sigma * gauss))
+        if roll < behaviour.rate_limit_rate:
+            self.server.count(f"{key}:429")
+            self._json(
+                429,
+                {"error": {"message": "Rate limit exceeded", "code": 429}},
+                {"Retry-After": str(behaviour.retry_after_s)},
+            )
+        elif roll < behaviour.rate_limit_rate + behaviour.error_rate:
+            self.server.count(f"{key}:500")
+            self._json(500, {"error": {"message": "Upstream error", "code": 500}})
+        elif page is not None:
+            self._page(key, page)
+        elif stream:
+            self.server.count(f"{key}:200")
+            self._stream(key, behaviour, payload())
+        else:
+            self.server.count(f"{key}:200")
+            self._json(200, payload())
+
+    def _page(self, key: str, name: str) -> None:
+        etag = f'"page-{name}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count(f"{key}:304")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.server.count(f"{key}:200")
+        data = PAGE.format(name=name).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _search(self, body: dict) -> dict:
+        query = body.get("query", "")
+        host, port = self.server.server_address[:2]
+        base = (
+            f"http://{host}:{port}/pages/"
+            if self.server.config.result_pages
+            else "https://example.com/"
+        )
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {i}",
+                    "url": f"{base}{i}",
+                    "content": f"Snippet {i} about {query}. " * 8,
+                    "score": 1.0 - i / 10,
+                }
+                for i in range(self.server.config.results)
+            ],
+            "response_time": 0.1,
+        }
+
+    @staticmethod
+    def _completion(model: str, usage: dict) -> dict:
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": SUMMARY},
+                }
+            ],
+            "usage": usage,
+        }
+
+    def _stream(
+        self, model: str, behaviour: Behaviour, usage: Optional[dict] = None
+    ) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        n = max(1, behaviour.stream_chunks)
+        step = -(-len(SUMMARY) // n)
+        pieces = [SUMMARY[i : i + step] for i in range(0, len(SUMMARY), step)]
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(behaviour.chunk_delay_ms / 1000)
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+                ],
+            }
+            self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        if usage is not None:
+            # stream_options.include_usage: a last chunk with no choices
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": usage,
+            }
+            self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _json(self, status: int, body: dict, headers: Optional[dict] = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer:
+    """Threaded stub server; use as a context manager or call start/stop."""
+
+    def __init__(
+        self, config: Optional[StubConfig] = None, host="127.0.0.1", port=0
+    ) -> None:
+        self.config = config or StubConfig()
+        self._server = _Server((host, port), _Handler, self.config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def connections(self) -> int:
+        return self._server.connections
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        return dict(self._server.counts)
+
+    def reset_counters(self) -> None:
+        with self._server.counts_lock:
+            self._server.connections = 0
+            self._server.counts.clear()
+
+    def set_model(self, model: str, behaviour: Behaviour) -> None:
+        self.config.models[model] = behaviour
+
+    def with_chat(self, **overrides) -> Behaviour:
+        """Copy of the default chat behaviour with `overrides` applied."""
+        return replace(self.config.chat, **overrides)
+
+    def configure_settings(self) -> None:
+        """Point this process's provider clients at the stub."""
+        settings.tavily_api_key = SecretStr("stub")
+        settings.openrouter_api_key = SecretStr("stub")
+        settings.tavily_base_url = self.base_url
+        settings.openrouter_base_url = f"{self.base_url}/v1"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="stub-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    """Run the stub standalone, e.g. behind an app started in another shell."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve stub Tavily/OpenAI APIs")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--chat-ms", type=float, default=400.0)
+    parser.add_argument("--search-ms", type=float, default=80.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = StubConfig(
+        search=Behaviour(median_ms=args.search_ms),
+        chat=Behaviour(
+            median_ms=args.chat_ms,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+        ),
+    )
+    server = StubServer(config, port=args.port)
+    print(f"TAVILY_BASE_URL={server.base_url}")
+    print(f"OPENROUTER_BASE_URL={server.base_url}/v1")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+from functools import lru_cache
+from typing import Any, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Bodies above this are compressed off the event loop
+_THREAD_THRESHOLD = 64 * 1024
+_COMPRESSIBLE = ("application/json", "text/", "application/problem+json")
+
+
+@lru_cache(maxsize=1)
+def _brotli() -> Any:
+    """The brotli module if installed (`pip install brotli`), else None."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def negotiate(accept_encoding: str, brotli_available: bool = True) -> Optional[str]:
+    """Pick `br` or `gzip` from an `Accept-Encoding` header, or None.
+
+    Honours q-values and `*`; on a tie brotli wins because it is smaller.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = q
+    star = weights.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli_available else ["gzip"]
+    best = max(candidates, key=lambda c: weights.get(c, star))
+    return best if weights.get(best, star) > 0 else None
+
+
+class CompressionMiddleware:
+    """Compresses complete responses with brotli or gzip as the client accepts.
+
+    Only bodies sent in one message are compressed: streamed responses (SSE,
+    NDJSON batches) pass through untouched so events are not held back.
+    Bodies under `minimum_size`, non-text types and responses that already
+    carry a `Content-Encoding` are left alone.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 1,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding", ""),
+            brotli_available=_brotli() is not None,
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # held until we see whether the body streams
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            held, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body") or not self._compressible(held, body):
+                await send(held)
+                await send(message)
+                return
+            if len(body) > _THREAD_THRESHOLD:
+                body = await asyncio.to_thread(self._compress, encoding, body)
+            else:
+                body = self._compress(encoding, body)
+            headers = MutableHeaders(raw=list(held["headers"]))
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send({**held, "headers": headers.raw})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, start: Message, body: bytes) -> bool:
+        if len(body) < self.minimum_size or start["status"] in (204, 304):
+            return False
+        headers = Headers(raw=start["headers"])
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(_COMPRESSIBLE) and not content_type.startswith(
+            "text/event-stream"
+        )
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return _brotli().compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
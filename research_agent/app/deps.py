@@ -1,8 +1,17 @@
 import logging
+import logging.handlers
 import os
+from typing import Literal
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from research_agent.app.logs import (
+    ContextFilter,
+    JsonFormatter,
+    start_queue_logging,
+    stop_queue_logging,
+)
+
 
 class Settings(BaseSettings):
     tavily_api_key: SecretStr | None = None
@@ -16,15 +25,202 @@ class Settings(BaseSettings):
     google_service_account_json: str | None = None
     gspread_sheet_id: str | None = None
     gspread_worksheet: str = "history"
+    # Buffer rows locally and send them with batched append_rows calls
+    sheets_write_behind: bool = True
+    sheets_batch_size: int = 50
+    sheets_flush_interval_s: float = 5.0
+
+    # Import provider clients, the tokenizer and the worksheet during startup
+    # (FastAPI lifespan) rather than on the first request
+    prewarm_clients: bool = True
+    prewarm_timeout_s: float = 20.0
+
+    # Production serving profile (`python -m research_agent.serve`)
+    serve_host: str = "0.0.0.0"
+    serve_port: int = 8000
+    # 0 = one worker per CPU available to the container, up to the cap
+    serve_workers: int = 0
+    serve_max_workers: int = 8
+    # On SIGTERM, time allowed for in-flight requests and jobs to finish
+    serve_graceful_timeout_s: float = 30.0
+
+    # Response compression (brotli needs `pip install brotli`, else gzip only)
+    compression_enabled: bool = True
+    compression_min_bytes: int = 1024
+    compression_gzip_level: int = 1
+    compression_brotli_quality: int = 4
+
+    # Fetch the top results' pages and use their main text instead of the
+    # search snippet; pages are cached under $DATA_DIR/pages
+    fetch_enabled: bool = False
+    fetch_top_n: int = 3
+    # Whole stage, all pages: slower pages keep their snippet
+    fetch_deadline_s: float = 3.0
+    fetch_per_host: int = 2
+    fetch_max_bytes: int = 2_000_000
+    fetch_max_chars: int = 6000
+    fetch_cache_enabled: bool = True
+    # Older entries are revalidated with If-None-Match
+    fetch_cache_ttl_s: float = 86400.0
+    fetch_user_agent: str = "ai-agents-research/1.0"
+
+    # Token usage: add a `usage` block (tokens, prompt-cache hits, estimated
+    # cost) to research responses. Prices: MODEL_PRICES, e.g.
+    # {"openai/gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.6}}
+    usage_in_response: bool = True
+    model_prices: dict[str, dict[str, float]] = {}
 
     # Logging
     log_dir: str = "/var/log/ai-agents"
     log_level: str = "INFO"
     log_rotation_when: str = "midnight"
     log_rotation_backup_count: int = 7
+    # "json": one object per line with request_id, stage and latency fields
+    log_format: Literal["text", "json"] = "text"
+    # Write logs from a background thread; the request path only enqueues.
+    # Records beyond `log_queue_size` waiting are dropped (and counted).
+    log_async: bool = True
+    log_queue_size: int = 10000
+
+    # OpenTelemetry trace export (needs the opentelemetry SDK + OTLP exporter)
+    otel_enabled: bool = False
+    otel_service_name: str = "ai-agents"
+
+    # Token-budgeted prompt context (see MODEL_TOKEN_BUDGETS)
+    context_budget_enabled: bool = True
+    context_token_budget: int = 2000  # models without an entry
+    # Room kept for instructions and the answer inside small context windows
+    context_reserved_tokens: int = 2048
+    tokenizer_encoding: str = "o200k_base"
 
     # Persistence toggle
     persist_results: bool = True
+    # Where history is read from; Sheets becomes a write-only mirror with sqlite
+    history_backend: Literal["sqlite", "sheets"] = "sqlite"
+    history_mirror_sheets: bool = True
+
+    # Provider endpoints (override to point at local stand-ins)
+    openrouter_base_url: str = "https://openrouter.ai/api/v1"
+    tavily_base_url: str | None = None
+
+    # Shared HTTP connection pools for provider clients
+    pool_clients: bool = True
+    http2_enabled: bool = True
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_s: float = 30.0
+    http_timeout_s: float = 120.0
+
+    # Fallback execution: sequential | hedged | race
+    fallback_policy: Literal["sequential", "hedged", "race"] = "sequential"
+    llm_attempt_timeout_s: float = 60.0
+    # Retries inside one attempt by the OpenAI SDK. 0 leaves retries to the
+    # fallback policy and circuit breakers, which react to a 429 at once
+    llm_max_retries: int = 0
+    research_deadline_s: float = 120.0
+    # End-to-end deadline for POST /agents/research when the client sends no
+    # `x-request-timeout` header (0 = none); header values are capped
+    request_timeout_s: float = 0.0
+    request_timeout_max_s: float = 300.0
+    # Cancel the work of clients that disconnect, checking this often
+    cancel_on_disconnect: bool = True
+    disconnect_poll_s: float = 0.25
+    # Hedged mode starts the next model after this latency percentile (seconds
+    # fallback until enough samples are observed)
+    hedge_percentile: float = 0.9
+    hedge_delay_s: float = 8.0
+
+    # Per-model circuit breakers (open after N consecutive failures, 404 or 429)
+    circuit_failure_threshold: int = 3
+    circuit_cooldown_s: float = 30.0
+
+    # Batch research: unique queries in flight and per-provider call limits
+    batch_max_items: int = 100
+    batch_concurrency: int = 16
+    batch_provider_limits: dict[str, int] = {
+        "tavily": 8,
+        "openrouter": 8,
+        "openai": 8,
+    }
+
+    # Ask models for JSON (`with_structured_output`) instead of Markdown that
+    # is parsed afterwards; streaming always uses Markdown
+    structured_output: bool = False
+    structured_output_method: Literal[
+        "function_calling", "json_schema", "json_mode"
+    ] = "function_calling"
+
+    # Token buckets keyed by provider (tavily/openrouter/openai) or model id, in
+    # requests per minute. Calls queue up to rate_limit_max_wait_s for a token,
+    # then fail over to the next model instead of risking a 429.
+    rate_limits_rpm: dict[str, float] = {}
+    rate_limit_burst: int = 5
+    rate_limit_max_wait_s: float = 5.0
+    # "sqlite" shares buckets between worker processes on one host
+    rate_limit_backend: Literal["memory", "sqlite"] = "memory"
+    # Concurrent identical research requests share one pipeline run
+    coalesce_requests: bool = True
+
+    # Deep search: run several expansions of the query and fuse the results
+    deep_search_default: bool = False
+    deep_search_max_queries: int = 4
+    deep_search_per_query: int = 5
+    deep_search_max_results: int = 8
+    # "rules" (no extra call) or "llm" (one short call to the model below)
+    deep_search_expansion: Literal["rules", "llm"] = "rules"
+    deep_search_expansion_model: str | None = None
+    deep_search_expansion_timeout_s: float = 5.0
+
+    # Local knowledge (RAG) over past results: numpy (in-process) or pgvector
+    rag_enabled: bool = False
+    rag_backend: Literal["numpy", "pgvector"] = "numpy"
+    rag_database_url: str | None = None
+    rag_index: Literal["hnsw", "ivfflat"] = "hnsw"
+    rag_top_k: int = 5
+    # Reuse a past summary outright above this similarity (if young enough)
+    rag_answer_threshold: float = 0.95
+    rag_max_age_s: float = 7 * 86400.0
+    # Cap on documents in the in-process (numpy) index; oldest are dropped
+    rag_max_entries: int = 20_000
+    # Add past snippets above this similarity to the search context
+    rag_augment_threshold: float = 0.75
+    rag_ingest_batch_size: int = 64
+    rag_ingest_interval_s: float = 2.0
+    rag_hnsw_ef_search: int = 40
+    rag_ivfflat_lists: int = 100
+    rag_ivfflat_probes: int = 10
+
+    # Async research jobs
+    jobs_backend: Literal["memory", "sqlite"] = "memory"
+    jobs_concurrency: int = 200
+    # A running job whose worker disappears is retried after this long
+    jobs_visibility_timeout_s: float = 300.0
+    jobs_max_attempts: int = 3
+    jobs_poll_interval_s: float = 1.0
+    jobs_retention_s: float = 86400.0
+    # Comma-separated callback hosts allowed to resolve to private addresses
+    jobs_callback_allowed_hosts: str = ""
+
+    # Local state (SQLite caches, queues, spool files)
+    data_dir: str = "data"
+
+    # Research result cache (exact + optional semantic tier)
+    cache_enabled: bool = False
+    cache_backend: Literal["memory", "sqlite"] = "memory"
+    cache_ttl_s: float = 3600.0
+    cache_max_bytes: int = 64 * 1024 * 1024
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.92
+    # "hashing" (local, no network) or an OpenAI embedding model name
+    embedding_model: str = "hashing"
+
+    # Tavily payload cache (separate freshness from the result cache)
+    search_cache_enabled: bool = False
+    search_cache_backend: Literal["memory", "sqlite"] = "memory"
+    search_cache_ttl_s: float = 900.0
+    # After the TTL, serve stale for this long while refreshing in the background
+    search_cache_stale_ttl_s: float = 3600.0
+    search_cache_max_bytes: int = 32 * 1024 * 1024
 
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
@@ -42,6 +238,53 @@ ALLOWED_FREE_MODELS: dict[str, str] = {
 }
 
 
+# Context window and search-context token budget per model, keyed like
+# ALLOWED_FREE_MODELS. Budgets bound prompt cost and latency; the window
+# caps them for small models.
+MODEL_TOKEN_BUDGETS: dict[str, dict[str, int]] = {
+    "grok": {"context_window": 2_000_000, "context_budget": 3000},
+    "llama": {"context_window": 131_072, "context_budget": 2000},
+    "deepseek": {"context_window": 65_536, "context_budget": 2500},
+    "google": {"context_window": 8_192, "context_budget": 1500},
+}
+
+
+def context_budget(model: str) -> int:
+    """Token budget for search-result context when prompting `model`.
+
+    `model` may be an ALLOWED_FREE_MODELS key or provider id; unknown models
+    use `settings.context_token_budget`. Returns 0 when budgeting is off.
+    """
+    if not settings.context_budget_enabled:
+        return 0
+    key = next((k for k, v in ALLOWED_FREE_MODELS.items() if v == model), model)
+    limits = MODEL_TOKEN_BUDGETS.get(key)
+    if limits is None:
+        return settings.context_token_budget
+    ceiling = limits["context_window"] - settings.context_reserved_tokens
+    return max(0, min(limits["context_budget"], ceiling))
+
+
+# USD per million tokens, keyed like ALLOWED_FREE_MODELS (OpenRouter list
+# prices; `cached_input` applies to prompt tokens served from the provider's
+# prompt cache). MODEL_PRICES in the environment adds or overrides entries.
+MODEL_PRICES: dict[str, dict[str, float]] = {
+    "grok": {"input": 0.20, "cached_input": 0.05, "output": 0.50},
+    "llama": {"input": 0.0, "output": 0.0},
+    "deepseek": {"input": 0.0, "output": 0.0},
+    "google": {"input": 0.0, "output": 0.0},
+}
+
+
+def model_price(model: str) -> dict[str, float] | None:
+    """Per-million-token prices for `model` (key or provider id), if known."""
+    key = next((k for k, v in ALLOWED_FREE_MODELS.items() if v == model), model)
+    for name in (model, key):
+        if name in settings.model_prices:
+            return settings.model_prices[name]
+    return MODEL_PRICES.get(key)
+
+
 def resolve_model_name(request_model: str | None) -> str:
     """Resolve a request `model_name` to an allowed provider model string.
 
@@ -75,47 +318,74 @@ def fallback_models(exclude_provider_id: str | None) -> list[str]:
     return [m for m in ordered if m != exclude_provider_id]
 
 
-def configure_logging() -> logging.Logger:
-    from logging.handlers import TimedRotatingFileHandler
+class _DeferredFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """Rotating file handler that creates its directory and file on first write.
 
-    level = getattr(logging, settings.log_level.upper(), logging.INFO)
+    Importing the app therefore touches no files. If `LOG_DIR` is not
+    writable it falls back to `./logs`, and on read-only filesystems (Lambda)
+    to console-only logging.
+    """
+
+    def __init__(self, path: str, **kwargs) -> None:
+        super().__init__(path, delay=True, **kwargs)
 
-    # Ensure log directory exists (works in container too)
-    try:
-        os.makedirs(settings.log_dir, exist_ok=True)
-    except Exception:
-        # Fall back to current directory if not permitted
-        fallback_dir = os.path.join(os.getcwd(), "logs")
-        os.makedirs(fallback_dir, exist_ok=True)
-        settings.log_dir = fallback_dir
+    def _open(self):
+        name = os.path.basename(self.baseFilename)
+        for directory in (
+            os.path.dirname(self.baseFilename),
+            os.path.join(os.getcwd(), "logs"),
+        ):
+            try:
+                os.makedirs(directory, exist_ok=True)
+                self.baseFilename = os.path.join(directory, name)
+                settings.log_dir = directory
+                return super()._open()
+            except OSError:
+                continue
+        self.setLevel(logging.CRITICAL + 1)
+        return open(os.devnull, "a", encoding=self.encoding)
+
+
+def configure_logging() -> logging.Logger:
+    level = getattr(logging, settings.log_level.upper(), logging.INFO)
 
     logger = logging.getLogger("ai-agents")
     logger.setLevel(level)
     logger.handlers.clear()
+    logger.filters.clear()
+    stop_queue_logging()
+    # Request id and stage are read on the logging task, before any queueing
+    logger.addFilter(ContextFilter())
 
-    fmt = logging.Formatter(
-        fmt="%(asctime)s %(levelname)s %(name)s %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
+    datefmt = "%Y-%m-%d %H:%M:%S"
+    fmt = (
+        JsonFormatter()
+        if settings.log_format == "json"
+        else logging.Formatter(
+            fmt="%(asctime)s %(levelname)s %(name)s %(message)s", datefmt=datefmt
+        )
     )
 
     # Console handler
     sh = logging.StreamHandler()
     sh.setLevel(level)
     sh.setFormatter(fmt)
-    logger.addHandler(sh)
 
-    # Rotating file handler
-    file_path = os.path.join(settings.log_dir, "app.log")
-    fh = TimedRotatingFileHandler(
-        file_path,
+    # Rotating file handler; the file is opened by the first record written
+    fh = _DeferredFileHandler(
+        os.path.join(settings.log_dir, "app.log"),
         when=settings.log_rotation_when,
         backupCount=settings.log_rotation_backup_count,
     )
     fh.setLevel(level)
     fh.setFormatter(fmt)
-    logger.addHandler(fh)
 
-    logger.info(f"Logging initialized at level {settings.log_level} -> {file_path}")
+    if settings.log_async:
+        # Both handlers run on the listener thread; requests only enqueue
+        logger.addHandler(start_queue_logging([sh, fh], settings.log_queue_size))
+    else:
+        logger.addHandler(sh)
+        logger.addHandler(fh)
     return logger
 
 
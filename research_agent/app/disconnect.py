@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import anyio
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+_RECEIVE = "research_agent.server_receive"
+
+
+class DisconnectMiddleware:
+    """Keeps the server's `receive` in the scope for `client_disconnected`.
+
+    Endpoints behind `@app.middleware("http")` get a wrapped `receive` on
+    which `Request.is_disconnected()` never reports a disconnect once the
+    body has been read. Add this outermost so the original is reachable.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            scope[_RECEIVE] = receive
+        await self.app(scope, receive, send)
+
+
+async def client_disconnected(request: Request) -> bool:
+    """True once the client has closed the connection; never blocks.
+
+    Call only after the request body has been read.
+    """
+    receive = request.scope.get(_RECEIVE)
+    if receive is None:
+        return await request.is_disconnected()
+    message = {}
+    with anyio.CancelScope() as scope:
+        scope.cancel()
+        message = await receive()
+    return message.get("type") == "http.disconnect"
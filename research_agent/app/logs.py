@@ -0,0 +1,210 @@
+"""Log handlers and formatters used by `deps.configure_logging`.
+
+Imports nothing from the app, so `deps` can use it while settings load.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter
+
+# Set by the request middleware; spans and log lines carry it
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# Innermost pipeline stage running (`telemetry.span`)
+stage_var: ContextVar[Optional[str]] = ContextVar("stage", default=None)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+    ["level"],
+)
+
+# Attributes every LogRecord has; anything else was passed with `extra=`
+_RECORD_ATTRS = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {
+    "message",
+    "asctime",
+    "request_id",
+    "stage",
+}
+
+
+class ContextFilter(logging.Filter):
+    """Stamp records with the request id and stage of the logging task.
+
+    Runs on the calling thread, before a record is queued: the listener
+    thread does not see the request's context variables.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        if not hasattr(record, "stage"):
+            record.stage = stage_var.get()
+        return True
+
+
+_TS_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, request_id, stage,
+    then any `extra=` fields (e.g. `latency_ms`, `status` on access logs)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": f"{self.formatTime(record, _TS_FORMAT)}.{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        stage = getattr(record, "stage", None)
+        if stage:
+            entry["stage"] = stage
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Queue records for a `QueueListener`; drop them when the queue is full.
+
+    Logging never blocks the request path. Drops are counted in
+    `log_records_dropped_total`, and a warning with the count is queued once
+    there is room again. The listener thread is started by the first record,
+    not when logging is configured at import.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        self._reported = 0
+        self._drop_lock = threading.Lock()
+        self._start: Optional[Callable[[], None]] = None
+        self._start_lock = threading.Lock()
+
+    def start_on_first_record(self, start: Callable[[], None]) -> None:
+        self._start = start
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now, as they may change once we return; leave
+        # formatting (timestamps, JSON, tracebacks) to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._start is not None:
+            with self._start_lock:
+                start, self._start = self._start, None
+            if start is not None:
+                start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+            LOG_RECORDS_DROPPED.labels(record.levelname).inc()
+            return
+        if self.dropped != self._reported:
+            self._report_drops()
+
+    def _report_drops(self) -> None:
+        with self._drop_lock:
+            count = self.dropped - self._reported
+            self._reported = self.dropped
+        notice = logging.makeLogRecord(
+            {
+                "name": "ai-agents",
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"Dropped {count} log records: log queue full",
+                "request_id": None,
+                "stage": None,
+            }
+        )
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            with self._drop_lock:
+                self._reported -= count
+
+
+class _DrainingQueueListener(logging.handlers.QueueListener):
+    # `stop` must not fail on a full queue: wait for room, so every record
+    # queued before shutdown is written
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+    def stop(self) -> None:
+        if self._thread is not None:  # never started: nothing was logged
+            super().stop()
+
+
+_active: Optional[Tuple[BoundedQueueHandler, _DrainingQueueListener]] = None
+
+
+def start_queue_logging(
+    handlers: List[logging.Handler], maxsize: int
+) -> BoundedQueueHandler:
+    """Move `handlers` onto a background thread; returns the handler to attach.
+
+    The thread starts with the first record. Replaces (and flushes) a
+    previously started listener.
+    """
+    global _active
+    stop_queue_logging()
+    handler = BoundedQueueHandler(maxsize)
+    listener = _DrainingQueueListener(
+        handler.queue, *handlers, respect_handler_level=True
+    )
+    handler.start_on_first_record(listener.start)
+    _active = (handler, listener)
+    return handler
+
+
+def stop_queue_logging() -> None:
+    """Write out queued records and stop the listener thread, if any."""
+    global _active
+    if _active is None:
+        return
+    _, listener = _active
+    _active = None
+    listener.stop()
+
+
+def _restart_in_child() -> None:
+    # A forked worker inherits the queue but not the listener thread
+    global _active
+    if _active is None:
+        return
+    handler, listener = _active
+    handler.queue = queue.Queue(handler.queue.maxsize)
+    # Another thread may have held it at the fork
+    handler._start_lock = threading.Lock()
+    listener = _DrainingQueueListener(
+        handler.queue, *listener.handlers, respect_handler_level=True
+    )
+    handler.start_on_first_record(listener.start)
+    _active = (handler, listener)
+
+
+atexit.register(stop_queue_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
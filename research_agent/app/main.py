@@ -1,15 +1,110 @@
+import asyncio
+import logging
+import os
 import time
 import uuid
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from research_agent.app.compression import CompressionMiddleware
+from research_agent.app.disconnect import DisconnectMiddleware
 from research_agent.app.routes import router as agents_router
-from research_agent.app.deps import logger
+from research_agent.app.deps import logger, settings
+from research_agent.core.clients import registry as client_registry
+from research_agent.core import telemetry
+from research_agent.core.health import health
+from research_agent.core.research import drain_research
+from research_agent.services import history, rag, sheets
+from research_agent.services.jobs import get_job_queue, shutdown_job_queue
 from research_agent import __version__
 
+
+async def _prewarm() -> None:
+    """Load the provider stack and open clients before the first request.
+
+    Heavy modules are imported lazily, so without this the first request pays
+    for importing LangChain, loading the tokenizer and opening the worksheet.
+    """
+    from research_agent.core.components import SearchTool, Summarizer
+    from research_agent.core.context import get_token_counter
+
+    def load() -> None:
+        import langchain_openai  # noqa: F401
+        import langchain_tavily  # noqa: F401
+
+        get_token_counter()
+        if settings.semantic_cache_enabled or settings.rag_enabled:
+            from research_agent.core.embeddings import get_embedder
+
+            get_embedder()
+        if sheets._sheets_configured():
+            sheets._get_worksheet()
+
+    await asyncio.to_thread(load)
+    # Async client pools belong to an event loop; build them on the serving one
+    for build in (SearchTool()._ensure_tool, Summarizer()._ensure_llm):
+        try:
+            build()
+        except Exception as e:
+            logger.info(f"Pre-warm skipped a client: {e}")
+
+
+def _backfill_history() -> None:
+    try:
+        history.backfill_from_sheets()
+    except Exception as e:
+        logger.error(f"History backfill from Sheets failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    telemetry.configure_tracing()
+    if settings.prewarm_clients:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(_prewarm(), settings.prewarm_timeout_s)
+        except Exception as e:
+            logger.error(f"Pre-warm failed; clients load on first use: {e!r}")
+        logger.info(f"Pre-warm done in {int((time.perf_counter() - start) * 1000)}ms")
+    # Seed a fresh local history store from the Sheets mirror, off the loop
+    backfill = asyncio.ensure_future(asyncio.to_thread(_backfill_history))
+    # Pick up jobs persisted before a restart (JOBS_BACKEND=sqlite)
+    try:
+        if get_job_queue().resume():
+            logger.info("Resumed unfinished research jobs")
+    except Exception as e:
+        logger.error(f"Failed to resume research jobs: {e}")
+    yield
+    # Uvicorn has stopped accepting connections and waited for open requests.
+    # Let coalesced runs whose clients left and running jobs finish too.
+    await asyncio.gather(backfill, return_exceptions=True)
+    deadline = time.monotonic() + settings.serve_graceful_timeout_s
+    unfinished = await drain_research(deadline - time.monotonic())
+    if unfinished:
+        logger.info(f"Shutting down with {unfinished} research runs unfinished")
+    await shutdown_job_queue(max(0.0, deadline - time.monotonic()))
+    # Push buffered history rows to Sheets; anything left stays spooled on disk
+    await asyncio.to_thread(sheets.close_write_buffer)
+    # Index results still waiting in the RAG ingestion batch
+    await asyncio.to_thread(rag.close_rag_store)
+    # Drop pooled keep-alive connections to Tavily/OpenRouter on shutdown
+    await client_registry.aclose()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        # Drop this worker's live gauges from the merged view
+        multiprocess.mark_process_dead(os.getpid())
+
+
 app = FastAPI(
     title="AI Agents API",
     version=__version__,
     description="Exposes AI research agent via FastAPI",
+    lifespan=lifespan,
+    # orjson renders the large summary and history payloads several times
+    # faster than the stdlib encoder
+    default_response_class=ORJSONResponse,
 )
 
 origins = [
@@ -25,29 +120,81 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_bytes,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+
 
-# Simple request timing middleware
+# Request timing middleware: access log with per-stage timings plus metrics
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start = time.perf_counter()
     request_id = request.headers.get("x-request-id", str(uuid.uuid4()))
-    try:
-        response = await call_next(request)
+    telemetry.HTTP_IN_FLIGHT.inc()
+    with telemetry.request_scope(request_id) as stages:
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            logger.error(
+                "request_id=%s method=%s path=%s error=%s time_ms=%s",
+                request_id,
+                request.method,
+                request.url.path,
+                e,
+                duration_ms,
+                extra={
+                    "request_id": request_id,
+                    "method": request.method,
+                    "path": request.url.path,
+                    "status": 500,
+                    "latency_ms": duration_ms,
+                },
+            )
+            _observe(request, 500, start)
+            raise
+        finally:
+            telemetry.HTTP_IN_FLIGHT.dec()
+    # Skip building the line (and its JSON fields) when INFO is off
+    if logger.isEnabledFor(logging.INFO):
         duration_ms = int((time.perf_counter() - start) * 1000)
+        stage_ms = telemetry.stage_totals(stages)
         logger.info(
-            f"request_id={request_id} method={request.method} "
-            f"path={request.url.path} status={response.status_code} "
-            f"time_ms={duration_ms}"
+            "request_id=%s method=%s path=%s status=%s time_ms=%s%s",
+            request_id,
+            request.method,
+            request.url.path,
+            response.status_code,
+            duration_ms,
+            f" stages={telemetry.format_stages(stages)}" if stages else "",
+            extra={
+                "request_id": request_id,
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "latency_ms": duration_ms,
+                "stages": stage_ms,
+            },
         )
-        response.headers["x-request-id"] = request_id
-        return response
-    except Exception as e:
-        duration_ms = int((time.perf_counter() - start) * 1000)
-        logger.error(
-            f"request_id={request_id} method={request.method} "
-            f"path={request.url.path} error={e} time_ms={duration_ms}"
-        )
-        raise
+    _observe(request, response.status_code, start)
+    response.headers["x-request-id"] = request_id
+    return response
+
+
+# Outermost, so endpoints can still detect disconnects (see its docstring)
+app.add_middleware(DisconnectMiddleware)
+
+
+def _observe(request: Request, status: int, start: float) -> None:
+    # Label by route template so path parameters don't explode cardinality
+    route = request.scope.get("route")
+    telemetry.HTTP_REQUEST_SECONDS.labels(
+        request.method, getattr(route, "path", "unmatched"), str(status)
+    ).observe(time.perf_counter() - start)
 
 
 # include routes
@@ -58,3 +205,38 @@ app.include_router(agents_router)
 @app.get("/health")
 def health_check():
     return {"status": "ok", "version": __version__}
+
+
+# per-model health and circuit breaker state for the LLM fallback chain
+@app.get("/health/models")
+def model_health():
+    return {"models": health.snapshot()}
+
+
+# write-behind buffer state for the Google Sheets history mirror
+@app.get("/health/sheets")
+def sheets_health():
+    buffer = sheets.current_write_buffer()
+    return {"write_behind": buffer.snapshot() if buffer else None}
+
+
+# local knowledge (RAG) ingestion stats and index size
+@app.get("/health/rag")
+def rag_health():
+    store = rag.current_rag_store()
+    return {"store": store.snapshot() if store else None}
+
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Several workers: merge the per-process files into one scrape
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
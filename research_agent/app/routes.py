@@ -1,20 +1,56 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from research_agent.app.schemas import (
+    ResearchBatchPayload,
+    ResearchBatchResponse,
+    ResearchJobPayload,
+    ResearchJobStatus,
+    ResearchMetadata,
     ResearchPayload,
     ResearchResponse,
     ResearchHistoryResponse,
     ResearchRecord,
 )
-from research_agent.core.research import run_research
+from research_agent.core.research import (
+    iter_research_batch,
+    run_research_async,
+    stream_research,
+)
 from research_agent.app.deps import logger, settings, resolve_model_name
-from research_agent.services import sheets
+from research_agent.app.disconnect import client_disconnected
+from research_agent.core import deadlines
+from research_agent.services import history, jobs
 
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
 
 @router.post("/research", response_model=ResearchResponse)
-def research_endpoint(payload: ResearchPayload, background_tasks: BackgroundTasks):
+async def research_endpoint(
+    payload: ResearchPayload,
+    background_tasks: BackgroundTasks,
+    request: Request,
+    response: Response,
+):
+    """Run the research pipeline for one query.
+
+    An `x-request-timeout` header (seconds, or e.g. `2500ms`) or
+    `REQUEST_TIMEOUT_S` sets a deadline for the search and LLM calls; past
+    it the work is cancelled and the answer is a 504. If the client
+    disconnects first the work is cancelled too and nothing is persisted.
+    """
+    try:
+        timeout = deadlines.parse_timeout(request.headers.get("x-request-timeout"))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=f"Invalid x-request-timeout: {ve}")
     try:
         # Resolve model and temperature from payload with validation
         try:
@@ -27,19 +63,41 @@ def research_endpoint(payload: ResearchPayload, background_tasks: BackgroundTask
             if payload.temperature is not None
             else settings.temperature
         )
-        logger.info(f"Resolved LLM config: model={resolved_model} temp={resolved_temp}")
+        logger.info(
+            "Resolved LLM config: model=%s temp=%s", resolved_model, resolved_temp
+        )
 
-        result = run_research(
-            payload.query, model_name=resolved_model, temperature=resolved_temp
+        probe = (
+            partial(client_disconnected, request)
+            if settings.cancel_on_disconnect
+            else None
         )
+        with deadlines.request_deadline(timeout):
+            result = await deadlines.run_for_client(
+                run_research_async(
+                    payload.query,
+                    model_name=resolved_model,
+                    temperature=resolved_temp,
+                    **_pipeline_options(payload),
+                ),
+                probe,
+            )
+        # hit | semantic-hit | miss, or bypass when caching is disabled
+        response.headers["x-cache"] = result.get("cache", "bypass")
+        if "rag" in result:
+            # answer (served from local knowledge) | augment | miss
+            response.headers["x-rag"] = result["rag"]
         # Persist asynchronously after returning response if enabled
-        if settings.persist_results and not result["final_summary"].startswith("Error"):
-            background_tasks.add_task(sheets.append_research_result, result)
-        return ResearchResponse(
-            query=result["query"],
-            final_summary=result["final_summary"],
-            sources=result["sources"],
+        if _should_persist(result):
+            background_tasks.add_task(history.record_result, result)
+        return _to_response(result)
+    except deadlines.DeadlineExceeded:
+        raise HTTPException(
+            status_code=504, detail="Gateway Timeout: request deadline exceeded"
         )
+    except deadlines.ClientDisconnected:
+        # Nobody is listening; 499 is the access-log convention for this
+        return Response(status_code=499)
     except Exception as e:
         logger.error(f"Research agent failed: {e}")
         raise HTTPException(
@@ -47,10 +105,258 @@ def research_endpoint(payload: ResearchPayload, background_tasks: BackgroundTask
         )
 
 
+def _to_response(result: Dict[str, Any]) -> ResearchResponse:
+    metadata = None
+    if "attempts" in result:
+        metadata = ResearchMetadata(
+            model=result.get("model"),
+            attempts=result["attempts"],
+            search_queries=result.get("search_queries"),
+        )
+    return ResearchResponse(
+        query=result["query"],
+        final_summary=result["final_summary"],
+        sources=result["sources"],
+        metadata=metadata,
+        usage=result.get("usage"),
+    )
+
+
+def _pipeline_options(payload: ResearchPayload) -> Dict[str, Any]:
+    # Only forward options the client set; unset ones use the server defaults
+    return {"deep": payload.deep} if payload.deep is not None else {}
+
+
+def _should_persist(result: Dict[str, Any]) -> bool:
+    # Answers from local knowledge are already in the history
+    return (
+        settings.persist_results
+        and result.get("rag") != "answer"
+        and not result["final_summary"].startswith("Error")
+    )
+
+
+@router.post("/research/batch", response_model=ResearchBatchResponse)
+async def research_batch_endpoint(
+    payload: ResearchBatchPayload,
+    background_tasks: BackgroundTasks,
+    stream: bool = False,
+):
+    """Run many research queries concurrently, deduplicating identical ones.
+
+    With `?stream=true` results are sent as NDJSON lines (`{"index": i, ...}`)
+    in completion order; otherwise they are returned in request order.
+    """
+    if len(payload.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large: at most {settings.batch_max_items} items",
+        )
+    try:
+        items = [
+            (
+                p.query,
+                resolve_model_name(p.model_name),
+                p.temperature if p.temperature is not None else settings.temperature,
+                *_pipeline_options(p).values(),
+            )
+            for p in payload.items
+        ]
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    if stream:
+        completed: list = []
+
+        async def lines() -> AsyncIterator[str]:
+            async for indices, result in iter_research_batch(items):
+                completed.append(result)
+                body = _to_response(result).model_dump(mode="json")
+                for i in indices:
+                    yield json.dumps({"index": i, **body}) + "\n"
+
+        def persist_all() -> None:
+            for result in completed:
+                if _should_persist(result):
+                    history.record_result(result)
+
+        return StreamingResponse(
+            lines(),
+            media_type="application/x-ndjson",
+            background=BackgroundTask(persist_all),
+        )
+
+    ordered: list = [None] * len(items)
+    try:
+        async for indices, result in iter_research_batch(items):
+            for i in indices:
+                ordered[i] = _to_response(result)
+            if _should_persist(result):
+                background_tasks.add_task(history.record_result, result)
+    except Exception as e:
+        logger.error(f"Batch research failed: {e}")
+        raise HTTPException(
+            status_code=500, detail="Internal Server Error: Research agent failed"
+        )
+    return ResearchBatchResponse(items=ordered)
+
+
+def _job_status(job: jobs.Job) -> ResearchJobStatus:
+    return ResearchJobStatus(
+        job_id=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        created_at=datetime.fromtimestamp(job.created_at, tz=timezone.utc),
+        updated_at=datetime.fromtimestamp(job.updated_at, tz=timezone.utc),
+        result=_to_response(job.result) if job.result else None,
+        error=job.error,
+    )
+
+
+@router.post("/research/jobs", response_model=ResearchJobStatus, status_code=202)
+async def submit_research_job(payload: ResearchJobPayload):
+    """Queue a research request and return immediately; poll or use a callback."""
+    try:
+        resolved_model = resolve_model_name(payload.model_name)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    if payload.callback_url:
+        try:
+            await asyncio.to_thread(
+                jobs.check_callback_url, str(payload.callback_url)
+            )
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+    job = jobs.Job(
+        query=payload.query,
+        model_name=resolved_model,
+        temperature=(
+            payload.temperature
+            if payload.temperature is not None
+            else settings.temperature
+        ),
+        priority=payload.priority,
+        deep=payload.deep,
+        callback_url=str(payload.callback_url) if payload.callback_url else None,
+        max_attempts=settings.jobs_max_attempts,
+    )
+    try:
+        jobs.get_job_queue().submit(job)
+    except Exception as e:
+        logger.error(f"Failed to queue research job: {e}")
+        raise HTTPException(
+            status_code=500, detail="Internal Server Error: job queue failed"
+        )
+    return _job_status(job)
+
+
+@router.get("/research/jobs/{job_id}", response_model=ResearchJobStatus)
+def get_research_job(job_id: str):
+    job = jobs.get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job)
+
+
+@router.post("/research/stream")
+async def research_stream_endpoint(payload: ResearchPayload):
+    """Server-Sent Events variant of `/research` (see `stream_research`)."""
+    try:
+        resolved_model = resolve_model_name(payload.model_name)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    resolved_temp = (
+        payload.temperature if payload.temperature is not None else settings.temperature
+    )
+    done: Dict[str, Any] = {}
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event, data in stream_research(
+                payload.query,
+                model_name=resolved_model,
+                temperature=resolved_temp,
+                **_pipeline_options(payload),
+            ):
+                if event == "final":
+                    done["result"] = data
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            logger.error(f"Research stream failed: {e}")
+            detail = json.dumps({"detail": "Internal Server Error"})
+            yield f"event: error\ndata: {detail}\n\n"
+
+    def persist() -> None:
+        result = done.get("result")
+        if result is not None and _should_persist(result):
+            history.record_result(result)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(persist),
+    )
+
+
+def _etag(*parts: Any) -> str:
+    # Weak: the same page may be sent gzip, brotli or uncompressed
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+    return f'W/"{digest[:24]}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
 @router.get("/research/history", response_model=ResearchHistoryResponse)
-def research_history(limit: int = 20):
+def research_history(
+    request: Request,
+    response: Response,
+    limit: int = 20,
+    before: Optional[str] = None,
+    q: Optional[str] = None,
+):
+    """Most recent results first; pass `next_cursor` back as `before` to page.
+
+    Pages carry an ETag. Pollers that send it back in `If-None-Match` get a
+    304 until a new result is recorded, without the page being read.
+    """
+    if before:
+        try:
+            history.decode_cursor(before)
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+    try:
+        version = history.history_version()
+        etag = _etag(version, limit, before, q) if version is not None else None
+        if etag and _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(
+                status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"}
+            )
+        items, next_cursor = history.read_history(limit=limit, before=before, q=q)
+        if etag is None:
+            # Backends without a cheap version (Sheets): hash the page itself.
+            # The page is read anyway, but an unchanged one is not resent.
+            etag = _etag(items, next_cursor, limit, before, q)
+            if _etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(
+                    status_code=304,
+                    headers={"ETag": etag, "Cache-Control": "no-cache"},
+                )
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    except Exception as e:
+        logger.error(f"Failed to fetch research history: {e}")
+        raise HTTPException(
+            status_code=500, detail="Internal Server Error: history failed"
+        )
     try:
-        items = sheets.read_research_history(limit=limit)
         # Coerce into response model list
         return ResearchHistoryResponse(
             items=[
@@ -61,7 +367,8 @@ def research_history(limit: int = 20):
                     created_at=i.get("created_at"),
                 )
                 for i in items
-            ]
+            ],
+            next_cursor=next_cursor,
         )
     except Exception as e:
         logger.error(f"Failed to fetch research history: {e}")
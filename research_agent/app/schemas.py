@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel, Field, ConfigDict, AliasChoices
+from pydantic import BaseModel, Field, ConfigDict, AliasChoices, HttpUrl
 from typing import List, Literal, Optional
 
 
@@ -19,6 +19,10 @@ class ResearchPayload(BaseModel):
         description="Sampling temperature (0.0 - 2.0)",
         validation_alias=AliasChoices("temperature", "temp"),
     )
+    deep: Optional[bool] = Field(
+        default=None,
+        description="Search several expansions of the query and merge the results",
+    )
 
 
 class Source(BaseModel):
@@ -26,10 +30,81 @@ class Source(BaseModel):
     url: str
 
 
+class ModelAttempt(BaseModel):
+    model: str
+    start_ms: int
+    end_ms: Optional[int] = None
+    status: str
+    error: Optional[str] = None
+
+
+class ResearchMetadata(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    # Model that produced the summary and every attempt made on the way
+    model: Optional[str] = None
+    attempts: List[ModelAttempt] = []
+    # Sub-queries searched in deep mode
+    search_queries: Optional[List[str]] = None
+
+
+class ModelUsage(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    model: str
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    # Input tokens the provider served from its prompt cache
+    cached_tokens: int
+    # Estimated from MODEL_PRICES; None for unpriced models
+    cost_usd: Optional[float] = None
+
+
+class ResearchUsage(BaseModel):
+    input_tokens: int
+    output_tokens: int
+    cached_tokens: int
+    total_tokens: int
+    cache_hit_rate: float
+    cost_usd: Optional[float] = None
+    models: List[ModelUsage] = []
+
+
 class ResearchResponse(BaseModel):
     query: str
     final_summary: str
     sources: List[Source]
+    metadata: Optional[ResearchMetadata] = None
+    # Token usage of the LLM calls made for this request (absent for answers
+    # served from the cache or local knowledge)
+    usage: Optional[ResearchUsage] = None
+
+
+class ResearchBatchPayload(BaseModel):
+    items: List[ResearchPayload] = Field(min_length=1)
+
+
+class ResearchBatchResponse(BaseModel):
+    # Same order as the request items
+    items: List[ResearchResponse]
+
+
+class ResearchJobPayload(ResearchPayload):
+    priority: int = Field(default=0, description="Higher runs first")
+    callback_url: Optional[HttpUrl] = Field(
+        default=None,
+        description="POSTed the job status JSON when the job finishes",
+        validation_alias=AliasChoices("callback_url", "callbackUrl"),
+    )
+
+
+class ResearchJobStatus(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int = 0
+    created_at: datetime
+    updated_at: datetime
+    result: Optional[ResearchResponse] = None
+    error: Optional[str] = None
 
 
 class ResearchRecord(BaseModel):
@@ -41,3 +116,5 @@ class ResearchRecord(BaseModel):
 
 class ResearchHistoryResponse(BaseModel):
     items: List[ResearchRecord]
+    # Pass as `before` to fetch the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
@@ -0,0 +1,539 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+)
+
+from research_agent.app.deps import settings, logger
+
+if TYPE_CHECKING:
+    # Only the semantic tier needs numpy; it is imported when that tier is used
+    import numpy as np
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return _WS_RE.sub(" ", query.strip().lower()).rstrip("?!. ")
+
+
+def make_key(*parts: Any) -> str:
+    raw = json.dumps(parts, separators=(",", ":"), sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class CacheBackend(Protocol):
+    # Does disk I/O: async callers run its methods in a worker thread
+    blocking: bool
+
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class MemoryCache:
+    """In-process LRU cache bounded by total value bytes, with per-entry TTL."""
+
+    blocking = False
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (time.time() + ttl, value)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _pop(self, key: str) -> None:
+        _, value = self._data.pop(key)
+        self._bytes -= len(value)
+
+
+class SQLiteCache:
+    """Local on-disk cache with the same TTL/LRU semantics as `MemoryCache`.
+
+    Survives restarts and can be shared by several worker processes on one
+    host. Eviction removes least-recently-accessed rows once the stored bytes
+    exceed `max_bytes`.
+
+    Triggers keep the stored bytes and row count in a one-row stats table,
+    so a write never sums the whole cache. Hits record their access time in
+    memory and write it in batches of `touch_batch` (or after
+    `touch_interval_s`) instead of one UPDATE per hit.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int,
+        table: str = "cache",
+        touch_batch: int = 64,
+        touch_interval_s: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.table = table
+        self.touch_batch = touch_batch
+        self.touch_interval_s = touch_interval_s
+        self.evictions = 0
+        self._local = threading.local()
+        self._touched: Dict[str, float] = {}
+        self._touched_at = time.monotonic()
+        self._touch_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_expires ON {table} (expires_at)"
+            )
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table}_stats ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "bytes INTEGER NOT NULL, entries INTEGER NOT NULL)"
+            )
+            # Seeded from the rows of caches created before the stats table
+            conn.execute(
+                f"INSERT OR IGNORE INTO {table}_stats (id, bytes, entries) "
+                f"SELECT 0, COALESCE(SUM(size), 0), COUNT(*) FROM {table}"
+            )
+            stats = f"UPDATE {table}_stats SET"
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_added AFTER INSERT ON {table} "
+                f"BEGIN {stats} bytes = bytes + NEW.size, entries = entries + 1; END"
+            )
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_removed "
+                f"AFTER DELETE ON {table} "
+                f"BEGIN {stats} bytes = bytes - OLD.size, entries = entries - 1; END"
+            )
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_resized "
+                f"AFTER UPDATE OF size ON {table} "
+                f"BEGIN {stats} bytes = bytes + NEW.size - OLD.size; END"
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            return None
+        with self._touch_lock:
+            self._touched[key] = now
+            due = (
+                len(self._touched) >= self.touch_batch
+                or time.monotonic() - self._touched_at >= self.touch_interval_s
+            )
+        if due:
+            self._flush_touches(conn)
+        return bytes(row[0])
+
+    def _flush_touches(self, conn: sqlite3.Connection) -> None:
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+            self._touched_at = time.monotonic()
+        if touched:
+            conn.executemany(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                [(at, key) for key, at in touched.items()],
+            )
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            f"INSERT INTO {self.table} "
+            "(key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+            "size = excluded.size, expires_at = excluded.expires_at, "
+            "accessed_at = excluded.accessed_at",
+            (key, value, len(value), now + ttl, now),
+        )
+        self._evict(conn, now)
+
+    def _stats(self, conn: sqlite3.Connection) -> Tuple[int, int]:
+        row = conn.execute(
+            f"SELECT bytes, entries FROM {self.table}_stats WHERE id = 0"
+        ).fetchone()
+        return row[0], row[1]
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        stored, entries = self._stats(conn)
+        if stored <= self.max_bytes:
+            return
+        # Over budget: drop expired rows, then the least recently accessed
+        self._flush_touches(conn)
+        conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        stored, entries = self._stats(conn)
+        while stored > self.max_bytes and entries:
+            # Enough rows of average size to cover the excess
+            count = -(-(stored - self.max_bytes) * entries // stored)
+            cur = conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM "
+                f"{self.table} ORDER BY accessed_at LIMIT ?)",
+                (count,),
+            )
+            self.evictions += cur.rowcount
+            stored, entries = self._stats(conn)
+
+    def delete(self, key: str) -> None:
+        self._conn().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._touch_lock:
+            self._touched = {}
+        self._conn().execute(f"DELETE FROM {self.table}")
+
+
+async def _io(backend: CacheBackend, method: Callable[..., Any], *args: Any) -> Any:
+    """Call a backend method, in a worker thread when it does disk I/O."""
+    if backend.blocking:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+def build_backend(kind: str, max_bytes: int, table: str) -> CacheBackend:
+    if kind == "sqlite":
+        path = os.path.join(settings.data_dir, "cache.sqlite3")
+        return SQLiteCache(path, max_bytes, table=table)
+    return MemoryCache(max_bytes)
+
+
+class _SemanticIndex:
+    """Ring buffer of query embeddings mapped to exact cache keys.
+
+    Search is a single matrix-vector product over at most `max_entries` rows.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._vectors: Optional[np.ndarray] = None
+        self._meta: List[Optional[Tuple[str, str, float]]] = [None] * max_entries
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def add(self, vector: np.ndarray, scope: str, key: str, ttl: float) -> None:
+        import numpy as np
+
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[-1]:
+                self._vectors = np.zeros(
+                    (self.max_entries, vector.shape[-1]), dtype=np.float32
+                )
+                self._next = self._size = 0
+            self._vectors[self._next] = vector.reshape(-1)
+            self._meta[self._next] = (scope, key, time.time() + ttl)
+            self._next = (self._next + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def search(self, vector: np.ndarray, scope: str, threshold: float) -> Optional[str]:
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[-1]:
+                return None
+            scores = self._vectors[: self._size] @ vector.reshape(-1)
+            now = time.time()
+            for idx in (-scores).argsort():
+                if scores[idx] < threshold:
+                    return None
+                meta = self._meta[idx]
+                if meta and meta[0] == scope and meta[2] > now:
+                    return meta[1]
+            return None
+
+
+class ResearchCache:
+    """Two-tier cache for parsed `{final_summary, sources}` research results.
+
+    Tier one is an exact match on (normalized query, model, temperature). Tier
+    two, when enabled, embeds the query and reuses an entry whose query is
+    above a cosine-similarity threshold for the same model and temperature.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        *,
+        ttl: float,
+        semantic: bool = False,
+        threshold: float = 0.92,
+        max_semantic_entries: int = 10_000,
+    ) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.threshold = threshold
+        self._index = _SemanticIndex(max_semantic_entries) if semantic else None
+        self.stats: Dict[str, int] = {"hits": 0, "semantic_hits": 0, "misses": 0}
+
+    @staticmethod
+    def _scope(model: str, temperature: float, variant: str = "") -> str:
+        scope = f"{model}|{temperature}"
+        return f"{scope}|{variant}" if variant else scope
+
+    async def lookup(
+        self, query: str, model: str, temperature: float, variant: str = ""
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Return `(value, status)` where status is hit, semantic-hit or miss.
+
+        `variant` separates results produced by a different pipeline (e.g.
+        deep search) for the same query, model and temperature.
+        """
+        norm = normalize_query(query)
+        scope = self._scope(model, temperature, variant)
+        raw = await _io(
+            self.backend, self.backend.get, make_key("research", norm, scope)
+        )
+        if raw is not None:
+            self.stats["hits"] += 1
+            return json.loads(raw), "hit"
+        if self._index is not None:
+            from research_agent.core.embeddings import get_embedder
+
+            vector = (await get_embedder().aembed([norm]))[0]
+            key = self._index.search(vector, scope, self.threshold)
+            raw = await _io(self.backend, self.backend.get, key) if key else None
+            if raw is not None:
+                self.stats["semantic_hits"] += 1
+                return json.loads(raw), "semantic-hit"
+        self.stats["misses"] += 1
+        return None, "miss"
+
+    async def store(
+        self,
+        query: str,
+        model: str,
+        temperature: float,
+        value: Dict[str, Any],
+        variant: str = "",
+    ) -> None:
+        norm = normalize_query(query)
+        scope = self._scope(model, temperature, variant)
+        key = make_key("research", norm, scope)
+        payload = {"final_summary": value["final_summary"], "sources": value["sources"]}
+        await _io(
+            self.backend, self.backend.set, key, json.dumps(payload).encode(), self.ttl
+        )
+        if self._index is not None:
+            from research_agent.core.embeddings import get_embedder
+
+            vector = (await get_embedder().aembed([norm]))[0]
+            self._index.add(vector, scope, key, self.ttl)
+
+
+class SearchCache:
+    """Cache of raw Tavily payloads, stored zlib-compressed.
+
+    Entries are fresh for `ttl` seconds and then served stale for up to
+    `stale_ttl` more while a single background task refreshes them, so hot
+    queries never wait on Tavily.
+    """
+
+    _HEADER = struct.Struct("!d")  # stored_at timestamp
+
+    def __init__(self, backend: CacheBackend, *, ttl: float, stale_ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "stale_hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(query: str, limit: int, options: Dict[str, Any]) -> str:
+        return make_key("search", normalize_query(query), limit, options)
+
+    def _encode(self, raw: Dict[str, Any]) -> bytes:
+        body = zlib.compress(json.dumps(raw, separators=(",", ":")).encode(), 6)
+        return self._HEADER.pack(time.time()) + body
+
+    def _decode(self, value: bytes) -> Tuple[float, Dict[str, Any]]:
+        (stored_at,) = self._HEADER.unpack_from(value)
+        body = zlib.decompress(value[self._HEADER.size :])
+        return stored_at, json.loads(body)
+
+    async def _store(self, key: str, raw: Dict[str, Any]) -> None:
+        # Only cache successful payloads; the tool returns {"error": ...} on failure
+        if "error" in raw or not raw.get("results"):
+            return
+        value = self._encode(raw)
+        await _io(self.backend, self.backend.set, key, value, self.ttl + self.stale_ttl)
+
+    async def get_or_fetch(
+        self,
+        query: str,
+        limit: int,
+        options: Dict[str, Any],
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], str]:
+        """Return `(raw_payload, status)`; status is hit, stale or miss."""
+        key = self.key(query, limit, options)
+        value = await _io(self.backend, self.backend.get, key)
+        if value is not None:
+            stored_at, raw = self._decode(value)
+            if time.time() - stored_at < self.ttl:
+                self.stats["hits"] += 1
+                return raw, "hit"
+            self.stats["stale_hits"] += 1
+            self._revalidate(key, fetch)
+            return raw, "stale"
+        self.stats["misses"] += 1
+        raw = await fetch()
+        await self._store(key, raw)
+        return raw, "miss"
+
+    def _revalidate(
+        self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh() -> None:
+            try:
+                await self._store(key, await fetch())
+            except Exception as e:
+                logger.error(f"Search cache revalidation failed: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        # A fresh context: the refresh outlives the request that found the
+        # stale entry and must not inherit its deadline (or request id)
+        self._refreshing[key] = asyncio.get_running_loop().create_task(
+            refresh(), context=contextvars.Context()
+        )
+
+
+_result_cache: ResearchCache | None = None
+_search_cache: SearchCache | None = None
+
+
+def get_result_cache() -> ResearchCache | None:
+    """Return the shared result cache, or None when `CACHE_ENABLED` is off."""
+    global _result_cache
+    if not settings.cache_enabled:
+        return None
+    if _result_cache is None:
+        _result_cache = ResearchCache(
+            build_backend(settings.cache_backend, settings.cache_max_bytes, "results"),
+            ttl=settings.cache_ttl_s,
+            semantic=settings.semantic_cache_enabled,
+            threshold=settings.semantic_cache_threshold,
+        )
+        logger.info(
+            f"Result cache enabled: backend={settings.cache_backend} "
+            f"semantic={settings.semantic_cache_enabled}"
+        )
+    return _result_cache
+
+
+def get_search_cache() -> SearchCache | None:
+    """Return the shared Tavily payload cache, or None when disabled."""
+    global _search_cache
+    if not settings.search_cache_enabled:
+        return None
+    if _search_cache is None:
+        _search_cache = SearchCache(
+            build_backend(
+                settings.search_cache_backend,
+                settings.search_cache_max_bytes,
+                "search",
+            ),
+            ttl=settings.search_cache_ttl_s,
+            stale_ttl=settings.search_cache_stale_ttl_s,
+        )
+    return _search_cache
+
+
+def reset_caches() -> None:
+    """Drop the shared cache instances (used by tests and config reloads)."""
+    global _result_cache, _search_cache
+    _result_cache = None
+    _search_cache = None
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from research_agent.app.deps import settings, logger
+
+if TYPE_CHECKING:
+    # httpx and the LangChain stack dominate import time; load them on first use
+    import httpx
+    from langchain_openai import ChatOpenAI
+    from langchain_tavily import TavilySearch
+
+# (provider, model, temperature, base_url)
+LLMKey = Tuple[str, str, float, Optional[str]]
+
+
+def _limits() -> httpx.Limits:
+    import httpx
+
+    return httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_s,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    import httpx
+
+    return httpx.Timeout(settings.http_timeout_s, connect=10.0)
+
+
+@lru_cache(maxsize=1)
+def _pooled_tavily_wrapper() -> type:
+    """Build `PooledTavilyAPIWrapper` (its base class lives in langchain_tavily)."""
+    from langchain_tavily._utilities import TAVILY_API_URL, TavilySearchAPIWrapper
+
+    class PooledTavilyAPIWrapper(TavilySearchAPIWrapper):
+        """Tavily API wrapper that sends requests over the shared HTTP pools.
+
+        The upstream wrapper uses a bare `requests.post` for sync calls and opens
+        a new `aiohttp.ClientSession` for every async call, so each search pays
+        for a fresh TCP/TLS handshake.
+        """
+
+        def _request(self, params: Dict[str, Any]) -> Tuple[str, Dict[str, Any], dict]:
+            headers = {
+                "Authorization": f"Bearer {self.tavily_api_key.get_secret_value()}",
+                "Content-Type": "application/json",
+                "X-Client-Source": "langchain-tavily",
+            }
+            body = {k: v for k, v in params.items() if v is not None}
+            base_url = self.api_base_url or TAVILY_API_URL
+            return f"{base_url}/search", body, headers
+
+        def raw_results(  # type: ignore[override]
+            self, **kwargs: Any
+        ) -> Dict[str, Any]:
+            url, body, headers = self._request(kwargs)
+            response = registry.http_client().post(url, json=body, headers=headers)
+            if response.status_code != 200:
+                detail = response.json().get("detail", {})
+                error_message = (
+                    detail.get("error") if isinstance(detail, dict) else "Unknown error"
+                )
+                raise ValueError(f"Error {response.status_code}: {error_message}")
+            return response.json()
+
+        async def raw_results_async(  # type: ignore[override]
+            self, **kwargs: Any
+        ) -> Dict[str, Any]:
+            url, body, headers = self._request(kwargs)
+            client = registry.async_http_client()
+            response = await client.post(url, json=body, headers=headers)
+            if response.status_code != 200:
+                raise Exception(
+                    f"Error {response.status_code}: {response.reason_phrase}"
+                )
+            return response.json()
+
+    return PooledTavilyAPIWrapper
+
+
+def __getattr__(name: str) -> Any:
+    if name == "PooledTavilyAPIWrapper":
+        return _pooled_tavily_wrapper()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LoopPool:
+    """Clients bound to a single event loop (httpx async pools are loop-bound)."""
+
+    def __init__(self, http: httpx.AsyncClient | None) -> None:
+        self.http = http
+        self.llms: Dict[LLMKey, ChatOpenAI] = {}
+        self.search: TavilySearch | None = None
+
+
+class ClientRegistry:
+    """Process-wide registry of provider clients backed by keep-alive pools.
+
+    LLM clients are keyed by `(provider, model, temperature, base_url)` so the
+    primary model and every fallback attempt reuse the same connections. Sync
+    callers share one `httpx.Client`; async callers get one `httpx.AsyncClient`
+    per running event loop.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._http: httpx.Client | None = None
+        self._sync_pool = _LoopPool(None)
+        # event loop -> _LoopPool; entries vanish with their loop
+        self._loop_pools: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.stats: Dict[str, int] = {"llm_created": 0, "search_created": 0}
+
+    def http_client(self) -> httpx.Client:
+        with self._lock:
+            if self._http is None:
+                import httpx
+
+                self._http = httpx.Client(
+                    http2=settings.http2_enabled, limits=_limits(), timeout=_timeout()
+                )
+            return self._http
+
+    def async_http_client(self) -> httpx.AsyncClient:
+        pool = self._pool()
+        if pool.http is None:
+            import httpx
+
+            pool.http = httpx.AsyncClient(
+                http2=settings.http2_enabled, limits=_limits(), timeout=_timeout()
+            )
+        return pool.http
+
+    def _pool(self) -> _LoopPool:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._sync_pool
+        with self._lock:
+            pool = self._loop_pools.get(loop)
+            if pool is None:
+                pool = _LoopPool(None)
+                self._loop_pools[loop] = pool
+            return pool
+
+    def get_llm(
+        self,
+        *,
+        provider: str,
+        model: str,
+        temperature: float,
+        base_url: str | None = None,
+        api_key: str | None = None,
+    ) -> ChatOpenAI:
+        if not settings.pool_clients:
+            return self._build_llm(model, temperature, base_url, api_key, None)
+        pool = self._pool()
+        key: LLMKey = (provider, model, temperature, base_url)
+        llm = pool.llms.get(key)
+        if llm is None:
+            async_http = None if pool is self._sync_pool else self.async_http_client()
+            llm = self._build_llm(model, temperature, base_url, api_key, async_http)
+            pool.llms[key] = llm
+        return llm
+
+    def _build_llm(
+        self,
+        model: str,
+        temperature: float,
+        base_url: str | None,
+        api_key: str | None,
+        async_http: httpx.AsyncClient | None,
+    ) -> ChatOpenAI:
+        self.stats["llm_created"] += 1
+        # stream_usage: streamed answers report token usage in a final chunk.
+        # max_retries: `execute()` falls back instead of the SDK retrying
+        kwargs: Dict[str, Any] = {
+            "model": model,
+            "temperature": temperature,
+            "stream_usage": True,
+            "max_retries": settings.llm_max_retries,
+        }
+        if api_key:
+            kwargs["api_key"] = api_key
+        if base_url:
+            kwargs["base_url"] = base_url
+        if settings.pool_clients:
+            kwargs["http_client"] = self.http_client()
+            if async_http is not None:
+                kwargs["http_async_client"] = async_http
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(**kwargs)
+
+    def get_search_tool(self, api_key: str | None = None) -> TavilySearch:
+        if not settings.pool_clients:
+            return self._build_search_tool(api_key)
+        pool = self._pool()
+        if pool.search is None:
+            pool.search = self._build_search_tool(api_key)
+        return pool.search
+
+    def _build_search_tool(self, api_key: str | None) -> TavilySearch:
+        self.stats["search_created"] += 1
+        from langchain_tavily import TavilySearch
+
+        if not settings.pool_clients:
+            kwargs: Dict[str, Any] = {}
+            if api_key:
+                kwargs["tavily_api_key"] = api_key
+            if settings.tavily_base_url:
+                kwargs["api_base_url"] = settings.tavily_base_url
+            return TavilySearch(**kwargs)
+        wrapper_kwargs: Dict[str, Any] = {"api_base_url": settings.tavily_base_url}
+        if api_key:
+            wrapper_kwargs["tavily_api_key"] = api_key
+        wrapper = _pooled_tavily_wrapper()(**wrapper_kwargs)
+        return TavilySearch(api_wrapper=wrapper)
+
+    async def aclose(self) -> None:
+        """Close pooled connections; called from the FastAPI lifespan.
+
+        Only the current loop's async pool can be awaited here; pools of other
+        (finished) loops are dropped and reclaimed with their loop.
+        """
+        pool = self._pool()
+        with self._lock:
+            self._loop_pools.clear()
+            http, self._http = self._http, None
+            self._sync_pool = _LoopPool(None)
+        if pool.http is not None:
+            await pool.http.aclose()
+        if http is not None:
+            http.close()
+        logger.info("Closed pooled provider clients")
+
+
+registry = ClientRegistry()
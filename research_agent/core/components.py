@@ -1,12 +1,29 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Tuple
 
-from langchain_openai import ChatOpenAI
-from langchain_tavily import TavilySearch
+from research_agent.app.deps import context_budget, settings, logger as app_logger
+from research_agent.core.cache import get_search_cache
+from research_agent.core.clients import registry
+from research_agent.core.context import build_context as build_budgeted_context
+from research_agent.core.deadlines import DeadlineExceeded, bounded
+from research_agent.core.health import health
+from research_agent.core.limits import llm_provider, provider_slot, throttle
+from research_agent.core.parsing import (
+    SourceCollector,
+    StructuredSummary,
+    parse_content,
+    parse_structured,
+)
+from research_agent.core.prompts import Prompt, as_messages, research_prompt
+from research_agent.core.telemetry import record_usage
 
-from research_agent.app.deps import settings, logger as app_logger
+if TYPE_CHECKING:
+    # The LangChain stack is imported by the client registry on first use
+    from langchain_openai import ChatOpenAI
+    from langchain_tavily import TavilySearch
 
 
 @dataclass
@@ -29,10 +46,7 @@ class SearchTool:
             if settings.tavily_api_key
             else None
         )
-        if tavily_key:
-            self._tool = TavilySearch(tavily_api_key=tavily_key)
-        else:
-            self._tool = TavilySearch()
+        self._tool = registry.get_search_tool(api_key=tavily_key)
 
     def search(
         self, query: str, limit: int = 5
@@ -40,8 +54,41 @@ class SearchTool:
         self._ensure_tool()
         payload = {"query": query}
         raw = self._tool.invoke(payload)  # type: ignore[union-attr]
+        return self._parse_results(raw, limit), raw
+
+    async def asearch(
+        self, query: str, limit: int = 5
+    ) -> Tuple[List[SearchResult], Dict[str, Any]]:
+        self._ensure_tool()
+        payload = {"query": query}
+
+        async def fetch() -> Dict[str, Any]:
+            await throttle("tavily")
+            async with provider_slot("tavily"):
+                return await bounded(
+                    self._tool.ainvoke(payload)  # type: ignore[union-attr]
+                )
+
+        cache = get_search_cache()
+        if cache is None:
+            raw = await fetch()
+        else:
+            options = {k: v for k, v in payload.items() if k != "query"}
+            raw, _status = await cache.get_or_fetch(query, limit, options, fetch)
+        return self._parse_results(raw, limit), raw
+
+    async def adeep_search(
+        self, query: str, limit: int | None = None
+    ) -> Tuple[List[SearchResult], Dict[str, Any]]:
+        """Multi-query search; returns fused results and the sub-queries used."""
+        from research_agent.core.multiquery import deep_search
+
+        return await deep_search(self, query, limit=limit)
+
+    @staticmethod
+    def _parse_results(raw: Dict[str, Any], limit: int) -> List[SearchResult]:
         results = raw.get("results", [])[:limit]
-        parsed = [
+        return [
             SearchResult(
                 title=r.get("title", "No title"),
                 url=r.get("url", ""),
@@ -49,7 +96,6 @@ class SearchTool:
             )
             for r in results
         ]
-        return parsed, raw
 
 
 class Summarizer:
@@ -81,10 +127,12 @@ class Summarizer:
         )
 
         # If the model looks like an contains '/', require OpenRouter
-        is_openrouter_model = "/" in model_choice or ":free" in model_choice
+        is_openrouter_model = llm_provider(model_choice) == "openrouter"
         app_logger.info(
-            f"LLM init: model={model_choice} temp={temp_choice} "
-            f"route={'openrouter' if is_openrouter_model else 'openai-or-default'}"
+            "LLM init: model=%s temp=%s route=%s",
+            model_choice,
+            temp_choice,
+            "openrouter" if is_openrouter_model else "openai-or-default",
         )
         if is_openrouter_model:
             if not openrouter_key:
@@ -92,10 +140,11 @@ class Summarizer:
                     "Selected model requires OpenRouter API key(set OPENROUTER_API_KEY)"
                 )
             app_logger.info("Using OpenRouter base_url for LLM")
-            self._llm = ChatOpenAI(
+            self._llm = registry.get_llm(
+                provider="openrouter",
                 model=model_choice,
                 api_key=openrouter_key,
-                base_url="https://openrouter.ai/api/v1",
+                base_url=settings.openrouter_base_url,
                 temperature=temp_choice,
             )
             return
@@ -103,7 +152,8 @@ class Summarizer:
         # Otherwise, prefer OpenAI if configured
         if openai_key:
             app_logger.info("Using OpenAI for LLM")
-            self._llm = ChatOpenAI(
+            self._llm = registry.get_llm(
+                provider="openai",
                 model=model_choice,
                 api_key=openai_key,
                 temperature=temp_choice,
@@ -112,7 +162,9 @@ class Summarizer:
 
         # Attempt to initialize without explicit key; env-based or mocked usage
         app_logger.info("Using default environment LLM configuration")
-        self._llm = ChatOpenAI(model=model_choice, temperature=temp_choice)
+        self._llm = registry.get_llm(
+            provider="default", model=model_choice, temperature=temp_choice
+        )
 
     @staticmethod
     def build_context(results: List[SearchResult]) -> str:
@@ -122,73 +174,145 @@ class Summarizer:
         return "\n".join(lines)
 
     @staticmethod
-    def build_prompt(query: str, results: List[SearchResult]) -> str:
-        context_text = Summarizer.build_context(results)
-        return f"""
-You are a meticulous research assistant.
-
-Task: Research the following query:
-"{query}"
-
-Context: Here are some relevant search results:
-{context_text}
+    def build_prompt(
+        query: str,
+        results: List[SearchResult],
+        model: str | None = None,
+        structured: bool | None = None,
+    ) -> Prompt:
+        # Fit the search context into the target model's token budget
+        budget = context_budget(model or settings.model_name)
+        context_text = build_budgeted_context(query, results, budget)
+        if structured is None:
+            structured = settings.structured_output
+        return research_prompt(query, context_text, structured)
 
-Rules:
-- Produce a detailed Markdown summary with sections.
-- Do NOT use placeholders.
-- Always include at least 3 sources in the 'Sources' section as markdown links.
+    def summarize(self, prompt_text: Prompt | str) -> str:
+        # Accept raw prompt text to make unit testing easier
+        self._ensure_llm()
+        # type: ignore[union-attr]
+        response = self._llm.invoke(as_messages(prompt_text))
+        return response.content
 
-Format strictly as:
+    @property
+    def model(self) -> str:
+        return self._model_name or settings.model_name
 
-# Summary
-<actual summary>
+    async def astream(self, prompt_text: Prompt | str) -> AsyncIterator[str]:
+        self._ensure_llm()
+        messages = as_messages(prompt_text)
+        # Outside the try: queueing for quota is not a model failure
+        await throttle(llm_provider(self.model), self.model)
+        try:
+            async with provider_slot(llm_provider(self.model)):
+                start = time.perf_counter()
+                # type: ignore[union-attr]
+                async for chunk in self._llm.astream(messages):
+                    if chunk.content:
+                        yield chunk.content
+                    record_usage(self.model, getattr(chunk, "usage_metadata", None))
+        except Exception as e:
+            health.record_failure(self.model, e)
+            raise
+        health.record_success(self.model, time.perf_counter() - start)
 
-# Sources
-- [Title](URL)
-- [Title](URL)
-- [Title](URL)
-"""
+    async def asummarize_structured(
+        self, prompt_text: Prompt | str
+    ) -> StructuredSummary | str:
+        """Ask for a `StructuredSummary` via the model's structured output.
 
-    def summarize(self, prompt_text: str) -> str:
-        # Accept raw prompt text to make unit testing easier
-        from langchain_core.messages import HumanMessage
+        Returns the validated object, or the raw text (for the Markdown
+        parser) when the model answered without usable structured output.
+        """
+        self._ensure_llm()
+        runnable = self._llm.with_structured_output(  # type: ignore[union-attr]
+            StructuredSummary,
+            method=settings.structured_output_method,
+            include_raw=True,
+        )
+        await throttle(llm_provider(self.model), self.model)
+        try:
+            async with provider_slot(llm_provider(self.model)):
+                start = time.perf_counter()
+                out = await bounded(runnable.ainvoke(as_messages(prompt_text)))
+        except DeadlineExceeded:
+            raise  # the request ran out of time, not the model
+        except Exception as e:
+            health.record_failure(self.model, e)
+            raise
+        health.record_success(self.model, time.perf_counter() - start)
+        raw = out.get("raw")
+        record_usage(self.model, getattr(raw, "usage_metadata", None))
+        if out.get("parsed") is not None:
+            return out["parsed"]
+        text = getattr(raw, "content", None)
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"No structured output: {out.get('parsing_error')}")
+        return text
 
+    async def asummarize(self, prompt_text: Prompt | str) -> str:
         self._ensure_llm()
-        # type: ignore[union-attr]
-        response = self._llm.invoke([HumanMessage(content=prompt_text)])
+        messages = as_messages(prompt_text)
+        # Outside the try: queueing for quota is not a model failure
+        await throttle(llm_provider(self.model), self.model)
+        try:
+            async with provider_slot(llm_provider(self.model)):
+                start = time.perf_counter()
+                # type: ignore[union-attr]
+                response = await bounded(self._llm.ainvoke(messages))
+        except DeadlineExceeded:
+            raise  # the request ran out of time, not the model
+        except Exception as e:
+            health.record_failure(self.model, e)
+            raise
+        health.record_success(self.model, time.perf_counter() - start)
+        record_usage(self.model, getattr(response, "usage_metadata", None))
         return response.content
 
 
 class ResponseParser:
+    @staticmethod
+    def parse_source_line(line: str) -> Dict[str, str] | None:
+        collector = SourceCollector()
+        collector.section = "sources"
+        found = collector.consume(line)
+        return found[0] if found else None
+
     @staticmethod
     def parse_content(content: str) -> Dict[str, Any]:
-        # Extract sources
-        sources: List[Dict[str, str]] = []
-        if "# Sources" in content:
-            sources_section = content.split("# Sources", 1)[1]
-            for line in sources_section.splitlines():
-                s = line.strip()
-                if s.startswith("- ") or s.startswith("* "):
-                    s = s[2:].strip()
-                if s.startswith("[") and "](" in s and s.endswith(")"):
-                    try:
-                        text = s[s.index("[") + 1 : s.index("]")]
-                        url = s[s.index("(") + 1 : s.index(")")]
-                        sources.append({"title": text, "url": url})
-                    except Exception:
-                        continue
-                elif s.startswith("http"):
-                    sources.append({"title": s, "url": s})
-
-        # Extract summary
-        if "# Summary" in content:
-            try:
-                summary = (
-                    content.split("# Summary", 1)[1].split("# Sources", 1)[0].strip()
-                )
-            except Exception:
-                summary = content
-        else:
-            summary = content.strip()
+        return parse_content(content)
+
+    @staticmethod
+    def parse_structured(payload: Any) -> Dict[str, Any]:
+        return parse_structured(payload)
+
+
+class StreamingResponseParser:
+    """Incremental counterpart of `ResponseParser` for streamed LLM output.
+
+    `feed` returns sources as soon as their lines complete inside the
+    sources section; `finish` returns the same result as `parse_content`
+    over the whole text.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[str] = []
+        self._pending = ""
+        self._collector = SourceCollector()
+
+    def feed(self, chunk: str) -> List[Dict[str, str]]:
+        self._chunks.append(chunk)
+        self._pending += chunk
+        found: List[Dict[str, str]] = []
+        while "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+            found.extend(self._collector.consume(line))
+        return found
+
+    def finish(self) -> Dict[str, Any]:
+        return ResponseParser.parse_content("".join(self._chunks))
 
-        return {"summary_md": summary, "sources": sources}
+    def flush(self) -> List[Dict[str, str]]:
+        """Consume a trailing line without newline once the stream has ended."""
+        line, self._pending = self._pending, ""
+        return self._collector.consume(line) if line else []
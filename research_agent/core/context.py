@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import math
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Set
+
+from research_agent.app.deps import settings, logger
+
+_WORD = re.compile(r"\w+")
+_PIECE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_SPACE = re.compile(r"\s+")
+# Shingle overlap above which a snippet counts as a near-duplicate
+DUPLICATE_THRESHOLD = 0.8
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> Callable[[str], int]:
+    """Token counter for prompt budgeting, built once per process.
+
+    Uses tiktoken's `TOKENIZER_ENCODING` when its BPE file is available (it is
+    downloaded on first use); otherwise counts words and punctuation, which
+    tracks BPE counts closely enough for English prompts.
+    """
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(settings.tokenizer_encoding)
+        # Search snippets are untrusted text; never treat them as special tokens
+        return lambda text: len(encoding.encode_ordinary(text))
+    except Exception as e:
+        logger.info(f"tiktoken unavailable, estimating token counts: {e}")
+        return lambda text: len(_PIECE.findall(text))
+
+
+def count_tokens(text: str) -> int:
+    return get_token_counter()(text)
+
+
+def _shingles(words: Sequence[str], n: int = 3) -> Set[tuple]:
+    if len(words) < n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i : i + n]) for i in range(len(words) - n + 1)}
+
+
+def _overlap(a: Set[tuple], b: Set[tuple]) -> float:
+    # Containment rather than Jaccard: a truncated copy of a longer snippet
+    # is still a duplicate
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+class _Snippet:
+    __slots__ = ("index", "title", "url", "sentences", "scores", "duplicate")
+
+    def __init__(self, index: int, title: str, url: str, snippet: str) -> None:
+        self.index = index
+        self.title = title
+        self.url = url
+        text = _SPACE.sub(" ", snippet or "").strip()
+        self.sentences = [s.strip() for s in _SENTENCE.split(text) if s.strip()]
+        self.scores: List[float] = []
+        self.duplicate = False
+
+
+def _score_sentences(snippets: List[_Snippet], query: str) -> None:
+    """BM25-style relevance of each sentence to the query terms."""
+    query_terms = {w.lower() for w in _WORD.findall(query)}
+    docs = [
+        {w.lower() for w in _WORD.findall(s)} for sn in snippets for s in sn.sentences
+    ]
+    n_docs = len(docs)
+    idf = {}
+    for t in query_terms:
+        df = sum(t in d for d in docs)
+        idf[t] = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+    for sn in snippets:
+        sn.scores = []
+        for position, sentence in enumerate(sn.sentences):
+            words = {w.lower() for w in _WORD.findall(sentence)}
+            score = sum(idf[t] for t in query_terms if t in words)
+            # Lead sentences usually carry the gist; break ties toward them
+            sn.scores.append(score + 0.1 / (1 + position))
+
+
+def _mark_duplicates(snippets: List[_Snippet]) -> None:
+    """Drop repeated sentences and flag snippets that repeat an earlier one."""
+    seen_sentences: Set[str] = set()
+    seen_shingles: List[Set[tuple]] = []
+    for sn in snippets:
+        words = [w.lower() for w in _WORD.findall(" ".join(sn.sentences))]
+        shingles = _shingles(words)
+        if any(
+            _overlap(shingles, other) >= DUPLICATE_THRESHOLD for other in seen_shingles
+        ):
+            sn.duplicate = True
+            continue
+        seen_shingles.append(shingles)
+        kept = []
+        for sentence in sn.sentences:
+            key = " ".join(w.lower() for w in _WORD.findall(sentence))
+            if key and key not in seen_sentences:
+                seen_sentences.add(key)
+                kept.append(sentence)
+        sn.sentences = kept
+
+
+def build_context(query: str, results: Sequence, budget: int) -> str:
+    """Render search results as numbered context within `budget` tokens.
+
+    Every result keeps its `[title](url)` line so the model can still cite
+    it. Snippet text is deduplicated, then each result gets an equal share
+    of the remaining budget and fills it with its most query-relevant
+    sentences (kept in their original order); shares a result cannot use
+    roll over to the next. `budget <= 0` returns snippets verbatim.
+    """
+    if budget <= 0:
+        return "\n".join(
+            f"{i}. [{r.title}]({r.url})\n{r.snippet}\n"
+            for i, r in enumerate(results, 1)
+        )
+    count = get_token_counter()
+    snippets = [
+        _Snippet(i, r.title, r.url, r.snippet) for i, r in enumerate(results, 1)
+    ]
+    _mark_duplicates(snippets)
+    _score_sentences(snippets, query)
+
+    headers = [f"{sn.index}. [{sn.title}]({sn.url})" for sn in snippets]
+    remaining = budget - sum(count(h) + 1 for h in headers)
+    bodies: Dict[int, str] = {}
+    candidates = [sn for sn in snippets if not sn.duplicate and sn.sentences]
+    for position, sn in enumerate(candidates):
+        share = remaining // (len(candidates) - position)
+        ranked = sorted(range(len(sn.sentences)), key=lambda i: -sn.scores[i])
+        chosen: List[int] = []
+        used = 0
+        for i in ranked:
+            cost = count(sn.sentences[i]) + 1
+            if used + cost > share:
+                continue
+            chosen.append(i)
+            used += cost
+        if not chosen and share > 8:
+            # Nothing fits whole: keep the best sentence, truncated by words
+            words = sn.sentences[ranked[0]].split()
+            text = ""
+            for word in words:
+                if count(f"{text} {word}") + 2 > share:
+                    break
+                text = f"{text} {word}".strip()
+            if text:
+                bodies[sn.index] = f"{text} …"
+                used = count(bodies[sn.index]) + 1
+        elif chosen:
+            bodies[sn.index] = " ".join(sn.sentences[i] for i in sorted(chosen))
+        remaining -= used
+
+    lines: List[str] = []
+    for sn, header in zip(snippets, headers):
+        body = bodies.get(sn.index)
+        lines.append(f"{header}\n{body}\n" if body else f"{header}\n")
+    return "\n".join(lines)
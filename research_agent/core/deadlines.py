@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar
+
+from research_agent.app.deps import settings, logger
+from research_agent.core.telemetry import CANCELLED_REQUESTS, RECLAIMED_SECONDS
+
+T = TypeVar("T")
+
+# time.monotonic() by which the current request must be answered. Tasks
+# started inside a request copy the context, so provider calls see it too.
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request deadline passed before the work finished."""
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready."""
+
+
+def parse_timeout(header: Optional[str]) -> Optional[float]:
+    """Seconds allowed for a request, from `x-request-timeout` or the config.
+
+    The header takes seconds (`30`, `2.5`) or milliseconds (`2500ms`) and is
+    capped at `REQUEST_TIMEOUT_MAX_S`. Without it `REQUEST_TIMEOUT_S` applies;
+    None means no request deadline. Raises ValueError for a malformed value.
+    """
+    if header is None or not header.strip():
+        return settings.request_timeout_s or None
+    value = header.strip().lower()
+    seconds = float(value[:-2]) / 1000 if value.endswith("ms") else float(value)
+    if not seconds > 0:
+        raise ValueError(f"request timeout must be positive: {header!r}")
+    return min(seconds, settings.request_timeout_max_s)
+
+
+@contextmanager
+def request_deadline(timeout: Optional[float]) -> Iterator[Optional[float]]:
+    """Bind a deadline `timeout` seconds from now; an earlier one is kept."""
+    current = _deadline.get()
+    at = None if timeout is None else time.monotonic() + timeout
+    if current is not None and (at is None or current < at):
+        at = current
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """Clear the deadline, for work shared by callers with their own ones."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left before the deadline, at most `default`; None if neither."""
+    at = _deadline.get()
+    if at is None:
+        return default
+    left = max(0.0, at - time.monotonic())
+    return left if default is None else min(left, default)
+
+
+def expired() -> bool:
+    at = _deadline.get()
+    return at is not None and time.monotonic() >= at
+
+
+async def bounded(aw: Awaitable[T]) -> T:
+    """Await a provider call, cancelling it if the request deadline passes."""
+    left = remaining()
+    if left is None:
+        return await aw
+    if left <= 0:
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise DeadlineExceeded("request deadline exceeded")
+    try:
+        return await asyncio.wait_for(aw, left)
+    except asyncio.TimeoutError:
+        if expired():
+            raise DeadlineExceeded("request deadline exceeded") from None
+        raise
+
+
+def _record(reason: str, started: float) -> None:
+    elapsed = time.monotonic() - started
+    CANCELLED_REQUESTS.labels(reason).inc()
+    # Upper bound: the rest of the pipeline's own time budget
+    RECLAIMED_SECONDS.labels(reason).inc(
+        max(0.0, settings.research_deadline_s - elapsed)
+    )
+    logger.info(f"Research cancelled reason={reason} after_ms={int(elapsed * 1000)}")
+
+
+async def run_for_client(
+    work: Awaitable[T],
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> T:
+    """Await `work` while the client is connected and the deadline holds.
+
+    `is_disconnected` is polled every `DISCONNECT_POLL_S`. When the client
+    has gone or the deadline passes, the work is cancelled, which cancels
+    its outstanding search and LLM calls, and `ClientDisconnected` or
+    `DeadlineExceeded` is raised.
+    """
+    started = time.monotonic()
+    task = asyncio.ensure_future(work)
+    reason = None
+    try:
+        while reason is None:
+            left = remaining()
+            wait = settings.disconnect_poll_s if is_disconnected else left
+            if left is not None and wait is not None:
+                wait = min(wait, left)
+            done, _ = await asyncio.wait({task}, timeout=wait)
+            if done:
+                return task.result()
+            if expired():
+                reason = "deadline"
+            elif is_disconnected is not None and await is_disconnected():
+                reason = "disconnect"
+    except DeadlineExceeded:
+        # Raised inside the work by a provider call that ran out of time
+        _record("deadline", started)
+        raise
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    _record(reason, started)
+    if reason == "deadline":
+        raise DeadlineExceeded("request deadline exceeded")
+    raise ClientDisconnected()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import List, Protocol
+
+import numpy as np
+
+from research_agent.app.deps import settings
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class Embedder(Protocol):
+    dim: int
+
+    async def aembed(self, texts: List[str]) -> np.ndarray: ...
+
+    def embed(self, texts: List[str]) -> np.ndarray: ...
+
+
+class HashingEmbedder:
+    """Dependency-free embedder using signed feature hashing.
+
+    Words and character trigrams are hashed into a fixed number of buckets and
+    the vector is L2-normalised, so cosine similarity is a dot product. Good
+    enough to match reworded or re-ordered queries without a network call.
+    """
+
+    def __init__(self, dim: int = 512) -> None:
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN_RE.findall(text.lower())
+        feats = list(words)
+        for w in words:
+            padded = f"#{w}#"
+            feats.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+        return feats
+
+    def embed_one(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat in self._features(text):
+            digest = hashlib.blake2b(feat.encode(), digest_size=8).digest()
+            h = int.from_bytes(digest, "big")
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.vstack([self.embed_one(t) for t in texts])
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        return self.embed(texts)
+
+
+class OpenAIEmbedder:
+    """Embeddings from an OpenAI-compatible endpoint (needs OPENAI_API_KEY)."""
+
+    def __init__(self, model: str) -> None:
+        from langchain_openai import OpenAIEmbeddings
+
+        key = (
+            settings.openai_api_key.get_secret_value()
+            if settings.openai_api_key
+            else None
+        )
+        self._client = OpenAIEmbeddings(model=model, api_key=key)
+        self.dim = 0  # known after the first call
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        return self._normalize(await self._client.aembed_documents(texts))
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        # Sync variant for background threads that have no event loop
+        return self._normalize(self._client.embed_documents(texts))
+
+    def _normalize(self, raw: List[List[float]]) -> np.ndarray:
+        vectors = np.asarray(raw, np.float32)
+        self.dim = vectors.shape[1]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+@lru_cache(maxsize=1)
+def get_embedder() -> Embedder:
+    """Return the process-wide embedder selected by `EMBEDDING_MODEL`."""
+    if settings.embedding_model == "hashing":
+        return HashingEmbedder()
+    return OpenAIEmbedder(settings.embedding_model)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from research_agent.app.deps import settings, logger
+from research_agent.core.deadlines import DeadlineExceeded, expired
+from research_agent.core.health import health
+
+POLICIES = ("sequential", "hedged", "race")
+
+
+@dataclass
+class Attempt:
+    """One model invocation, timed relative to the start of the request."""
+
+    model: str
+    start_ms: int
+    end_ms: Optional[int] = None
+    status: str = "running"  # ok | error | timeout | cancelled
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class AllModelsFailed(Exception):
+    def __init__(self, attempts: List[Attempt]) -> None:
+        super().__init__(f"All {len(attempts)} model attempts failed")
+        self.attempts = attempts
+
+
+class LatencyTracker:
+    """Rolling window of successful LLM latencies used to pick hedge deadlines."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: int = 20) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+latencies = LatencyTracker()
+
+
+def hedge_delay() -> float:
+    observed = latencies.percentile(settings.hedge_percentile)
+    return observed if observed is not None else settings.hedge_delay_s
+
+
+async def execute(
+    models: List[str],
+    call: Callable[[str], Awaitable[str]],
+    *,
+    policy: str = "sequential",
+    attempt_timeout: float = 60.0,
+    deadline: float = 120.0,
+) -> Tuple[str, str, List[Attempt]]:
+    """Run `call(model)` over `models` according to `policy`.
+
+    - sequential: try the next model only after the previous one fails.
+    - hedged: also start the next model once the current attempt runs past
+      the observed latency percentile (`hedge_delay`).
+    - race: start every model at once.
+
+    The first successful attempt wins and the others are cancelled. Each
+    attempt is bounded by `attempt_timeout` and the whole call by `deadline`
+    seconds. Returns `(model, content, attempts)` or raises `AllModelsFailed`.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown execution policy: {policy}")
+    started = time.perf_counter()
+    attempts: List[Attempt] = []
+    pending: Dict[asyncio.Task, Attempt] = {}
+    queue = list(models)
+
+    def elapsed_ms() -> int:
+        return int((time.perf_counter() - started) * 1000)
+
+    async def timed(model: str) -> str:
+        t0 = time.perf_counter()
+        try:
+            content = await asyncio.wait_for(call(model), attempt_timeout)
+        except DeadlineExceeded:
+            raise  # the request ran out of time, not the model
+        except asyncio.TimeoutError as e:
+            # wait_for cancels the call, so the summarizer never sees a
+            # failure; a hung model must still count towards its circuit
+            if not expired():
+                health.record_failure(model, e)
+            raise
+        latencies.record(time.perf_counter() - t0)
+        return content
+
+    def launch() -> None:
+        model = queue.pop(0)
+        attempt = Attempt(model=model, start_ms=elapsed_ms())
+        attempts.append(attempt)
+        pending[asyncio.ensure_future(timed(model))] = attempt
+        if len(attempts) > 1:
+            logger.info("Attempting fallback model: %s policy=%s", model, policy)
+
+    async def cancel_pending(status: str) -> None:
+        for task, attempt in pending.items():
+            task.cancel()
+            attempt.status, attempt.end_ms = status, elapsed_ms()
+        await asyncio.gather(*pending, return_exceptions=True)
+        pending.clear()
+
+    launch()
+    while policy == "race" and queue:
+        launch()
+    try:
+        while pending:
+            remaining = deadline - (time.perf_counter() - started)
+            if remaining <= 0:
+                await cancel_pending("timeout")
+                break
+            wait_for = remaining
+            if policy == "hedged" and queue:
+                wait_for = min(remaining, hedge_delay())
+            done, _ = await asyncio.wait(
+                pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                if policy == "hedged" and queue:
+                    launch()
+                continue
+            for task in done:
+                attempt = pending.pop(task)
+                attempt.end_ms = elapsed_ms()
+                exc = task.exception()
+                if exc is None and task.result():
+                    attempt.status = "ok"
+                    await cancel_pending("cancelled")
+                    return attempt.model, task.result(), attempts
+                attempt.status = (
+                    "timeout" if isinstance(exc, asyncio.TimeoutError) else "error"
+                )
+                attempt.error = str(exc) if exc else "empty response"
+                logger.error("Model attempt failed: %s error=%s", attempt.model, exc)
+                if policy != "race" and queue:
+                    launch()
+    except asyncio.CancelledError:
+        await cancel_pending("cancelled")
+        raise
+    raise AllModelsFailed(attempts)
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import html
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from research_agent.app.deps import settings, logger
+from research_agent.core.clients import registry
+from research_agent.core.deadlines import remaining
+from research_agent.core.multiquery import canonicalize_url
+from research_agent.core.telemetry import PAGE_FETCHES
+
+# Elements that never hold article text (comments too)
+_DROP = re.compile(
+    r"<!--.*?-->|<(script|style|noscript|svg|template|iframe|nav|header|footer"
+    r"|aside|form|button|select)\b[^>]*>.*?</\1\s*>",
+    re.S | re.I,
+)
+_MAIN = re.compile(r"<(article|main)\b[^>]*>(.*?)</\1\s*>", re.S | re.I)
+_BLOCK = re.compile(
+    r"</?(?:p|div|li|h[1-6]|br|tr|td|th|section|blockquote|pre|dd|dt|table"
+    r"|ul|ol|figcaption)\b[^>]*>",
+    re.I,
+)
+_LINK_TEXT = re.compile(r"<a\b[^>]*>(.*?)</a\s*>", re.S | re.I)
+_TAG = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+# Blocks shorter than this are menus, bylines and buttons rather than prose
+_MIN_BLOCK_CHARS = 40
+_TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+
+def _plain(fragment: str) -> str:
+    return _SPACE.sub(" ", html.unescape(_TAG.sub(" ", fragment))).strip()
+
+
+def extract_text(page: str, max_chars: int = 0) -> str:
+    """Main text of an HTML page without navigation and other boilerplate.
+
+    Scripts, styles, navigation, headers, footers and forms are dropped, and
+    only `<article>`/`<main>` content is kept when the page marks it. Of the
+    remaining blocks, short ones and those made mostly of link text (menus,
+    tag clouds) are skipped. Regex passes rather than a DOM keep this at a
+    few milliseconds for a large page.
+    """
+    page = _DROP.sub(" ", page)
+    main = [m.group(2) for m in _MAIN.finditer(page)]
+    if main:
+        page = "\n".join(main)
+    blocks: List[str] = []
+    total = 0
+    for block in _BLOCK.split(page):
+        text = _plain(block)
+        if len(text) < _MIN_BLOCK_CHARS:
+            continue
+        links = sum(len(_plain(link)) for link in _LINK_TEXT.findall(block))
+        if links > 0.5 * len(text):
+            continue
+        blocks.append(text)
+        total += len(text) + 1
+        if max_chars and total >= max_chars:
+            break
+    text = "\n".join(blocks)
+    return text[:max_chars] if max_chars else text
+
+
+class PageCache:
+    """Extracted page text on disk, content-addressed and indexed by URL.
+
+    Each distinct text is stored once, zlib-compressed and named by its
+    SHA-256, under `objects/`. A SQLite index maps canonical URLs to a digest,
+    the server's ETag and the fetch time, so stale entries are revalidated
+    with `If-None-Match` instead of downloaded and extracted again.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self._local = threading.local()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, "
+            "digest TEXT NOT NULL, etag TEXT, fetched_at REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                os.path.join(self.root, "index.sqlite3"),
+                timeout=5.0,
+                isolation_level=None,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _object(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def lookup(self, url: str) -> Optional[Tuple[str, Optional[str], float]]:
+        """`(digest, etag, fetched_at)` for a canonical URL, if indexed."""
+        return (
+            self._conn()
+            .execute("SELECT digest, etag, fetched_at FROM pages WHERE url = ?", (url,))
+            .fetchone()
+        )
+
+    def read(self, digest: str) -> Optional[str]:
+        try:
+            with open(self._object(digest), "rb") as f:
+                return zlib.decompress(f.read()).decode("utf-8")
+        except (OSError, zlib.error):
+            return None
+
+    def store(self, url: str, text: str, etag: Optional[str]) -> str:
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(data))
+            os.replace(tmp, path)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO pages (url, digest, etag, fetched_at) "
+            "VALUES (?, ?, ?, ?)",
+            (url, digest, etag, time.time()),
+        )
+        return digest
+
+    def touch(self, url: str) -> None:
+        self._conn().execute(
+            "UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url)
+        )
+
+
+@dataclass
+class Page:
+    url: str
+    text: str
+    # cached | revalidated | fetched
+    status: str
+
+
+_cache: Optional[PageCache] = None
+# event loop -> host[:port] -> semaphore (asyncio primitives are loop-bound)
+_host_slots: "weakref.WeakKeyDictionary[Any, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_page_cache() -> Optional[PageCache]:
+    global _cache
+    if not settings.fetch_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = PageCache(os.path.join(settings.data_dir, "pages"))
+    return _cache
+
+
+def reset_page_cache() -> None:
+    global _cache
+    _cache = None
+
+
+def _host_slot(host: str) -> asyncio.Semaphore:
+    slots = _host_slots.setdefault(asyncio.get_running_loop(), {})
+    slot = slots.get(host)
+    if slot is None:
+        slot = slots[host] = asyncio.Semaphore(max(1, settings.fetch_per_host))
+    return slot
+
+
+async def fetch_page(url: str, cache: Optional[PageCache]) -> Optional[Page]:
+    """Main text of one page from the cache, a revalidation or a download."""
+    key = canonicalize_url(url)
+    entry = cache.lookup(key) if cache is not None else None
+    headers = {
+        "User-Agent": settings.fetch_user_agent,
+        "Accept": "text/html,application/xhtml+xml,text/plain;q=0.8",
+    }
+    if entry is not None:
+        digest, etag, fetched_at = entry
+        if time.time() - fetched_at < settings.fetch_cache_ttl_s:
+            text = cache.read(digest)  # type: ignore[union-attr]
+            if text is not None:
+                PAGE_FETCHES.labels("cached").inc()
+                return Page(url, text, "cached")
+        if etag:
+            headers["If-None-Match"] = etag
+
+    async with _host_slot(urlsplit(url).netloc):
+        client = registry.async_http_client()
+        async with client.stream(
+            "GET", url, headers=headers, follow_redirects=True
+        ) as response:
+            if response.status_code == 304 and entry is not None:
+                text = cache.read(entry[0])  # type: ignore[union-attr]
+                if text is not None:
+                    cache.touch(key)  # type: ignore[union-attr]
+                    PAGE_FETCHES.labels("revalidated").inc()
+                    return Page(url, text, "revalidated")
+            content_type = response.headers.get("content-type", "")
+            if response.status_code != 200 or not content_type.startswith(_TEXT_TYPES):
+                PAGE_FETCHES.labels("skipped").inc()
+                return None
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= settings.fetch_max_bytes:
+                    break  # keep the head of oversized pages
+            etag = response.headers.get("etag")
+            raw = bytes(body).decode(response.encoding or "utf-8", errors="replace")
+
+    if content_type.startswith("text/plain"):
+        text = _SPACE.sub(" ", raw).strip()[: settings.fetch_max_chars]
+    else:
+        # Regex extraction is CPU work; keep it off the event loop
+        text = await asyncio.to_thread(extract_text, raw, settings.fetch_max_chars)
+    if not text:
+        PAGE_FETCHES.labels("empty").inc()
+        return None
+    if cache is not None:
+        cache.store(key, text, etag)
+    PAGE_FETCHES.labels("fetched").inc()
+    return Page(url, text, "fetched")
+
+
+async def _fetch_quietly(url: str, cache: Optional[PageCache]) -> Optional[Page]:
+    try:
+        return await fetch_page(url, cache)
+    except Exception as e:
+        PAGE_FETCHES.labels("error").inc()
+        logger.info(f"Page fetch failed url={url}: {e!r}")
+        return None
+
+
+async def fetch_pages(
+    urls: Sequence[str], deadline: Optional[float] = None
+) -> Dict[str, Page]:
+    """Fetch pages concurrently; returns those ready within `deadline` seconds.
+
+    Pages on different hosts download in parallel, at most `FETCH_PER_HOST`
+    at a time per host, so wall-clock time tracks the slowest host rather
+    than the sum. Fetches still running at the deadline are cancelled.
+    """
+    if deadline is None:
+        deadline = remaining(settings.fetch_deadline_s)
+    cache = get_page_cache()
+    tasks = {
+        asyncio.ensure_future(_fetch_quietly(url, cache)): url
+        for url in dict.fromkeys(urls)
+    }
+    if not tasks:
+        return {}
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    if pending:
+        PAGE_FETCHES.labels("timeout").inc(len(pending))
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    return {tasks[t]: t.result() for t in done if t.result() is not None}
+
+
+async def enrich_results(results: List[Any], top_n: Optional[int] = None) -> List[Any]:
+    """Replace the snippets of the top results with their pages' main text.
+
+    Results whose page could not be fetched in time keep their snippet; the
+    prompt's context budget then picks the most relevant sentences.
+    """
+    top_n = settings.fetch_top_n if top_n is None else top_n
+    urls = [r.url for r in results[:top_n] if r.url.startswith(("http://", "https://"))]
+    pages = await fetch_pages(urls)
+    return [
+        replace(r, snippet=pages[r.url].text) if r.url in pages else r for r in results
+    ]
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from research_agent.app.deps import settings, logger
+
+# Smoothing factor for latency and error-rate EWMAs
+ALPHA = 0.2
+# Error rate assumed for a model with no calls yet: it ranks behind models
+# with a clean record and ahead of ones that have been failing
+PRIOR_ERROR_RATE = 0.1
+
+
+@dataclass
+class ModelHealth:
+    model: str
+    calls: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+    consecutive_failures: int = 0
+    latency_ewma_ms: Optional[float] = None
+    error_rate: float = 0.0
+    open_until: float = 0.0
+    last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self.open_until == 0.0:
+            return "closed"
+        return "open" if time.monotonic() < self.open_until else "half-open"
+
+    def score(self, prior_latency_ms: float = 0.0) -> float:
+        # Lower is better: expected latency inflated by the observed error rate.
+        # Without samples, assume the prior latency (and error rate if unused)
+        latency = (
+            self.latency_ewma_ms
+            if self.latency_ewma_ms is not None
+            else prior_latency_ms
+        )
+        error_rate = self.error_rate if self.calls else PRIOR_ERROR_RATE
+        return latency * (1.0 + 4.0 * error_rate) + 10_000.0 * error_rate
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "consecutive_failures": self.consecutive_failures,
+            "latency_ewma_ms": (
+                round(self.latency_ewma_ms, 1)
+                if self.latency_ewma_ms is not None
+                else None
+            ),
+            "error_rate": round(self.error_rate, 3),
+            "last_error": self.last_error,
+        }
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class HealthRegistry:
+    """Per-model health stats and circuit breakers fed by every LLM call.
+
+    Updates are plain attribute writes on a per-model record with no locking:
+    they run on the event loop thread, and a lost update under free threading
+    would only nudge an EWMA, never corrupt state.
+    """
+
+    def __init__(self) -> None:
+        self._models: Dict[str, ModelHealth] = {}
+
+    def get(self, model: str) -> ModelHealth:
+        health = self._models.get(model)
+        if health is None:
+            health = self._models.setdefault(model, ModelHealth(model=model))
+        return health
+
+    def record_success(self, model: str, latency_s: float) -> None:
+        h = self.get(model)
+        h.calls += 1
+        h.consecutive_failures = 0
+        h.open_until = 0.0
+        ms = latency_s * 1000
+        h.latency_ewma_ms = (
+            ms
+            if h.latency_ewma_ms is None
+            else h.latency_ewma_ms + ALPHA * (ms - h.latency_ewma_ms)
+        )
+        h.error_rate -= ALPHA * h.error_rate
+
+    def record_failure(self, model: str, exc: BaseException) -> None:
+        h = self.get(model)
+        h.calls += 1
+        h.failures += 1
+        h.consecutive_failures += 1
+        h.error_rate += ALPHA * (1.0 - h.error_rate)
+        h.last_error = f"{type(exc).__name__}: {exc}"[:200]
+        code = _status_code(exc)
+        cooldown = settings.circuit_cooldown_s
+        if code == 429:
+            h.rate_limited += 1
+            cooldown = _retry_after(exc) or cooldown
+        # Rate limits and missing endpoints will not heal on the next request
+        if (
+            code in (404, 429)
+            or h.consecutive_failures >= settings.circuit_failure_threshold
+            or h.state == "half-open"
+        ):
+            if h.state == "closed":
+                logger.info(f"Circuit opened for model={model} status={code}")
+            h.open_until = time.monotonic() + cooldown
+
+    def available(self, model: str) -> bool:
+        """False while the model's circuit is open; half-open lets calls probe."""
+        h = self._models.get(model)
+        return h is None or h.state != "open"
+
+    def order(self, models: List[str]) -> List[str]:
+        """Reorder candidates by health, keeping the requested model first.
+
+        Models with an open circuit move to the end so they are only tried as
+        a last resort; the remaining fallbacks are sorted by `score`. Models
+        not called yet are scored with the mean observed latency and
+        `PRIOR_ERROR_RATE`, so they follow the models known to be healthy.
+        """
+        if not models:
+            return models
+        primary, rest = models[0], models[1:]
+        latencies = [
+            h.latency_ewma_ms
+            for h in list(self._models.values())
+            if h.latency_ewma_ms is not None
+        ]
+        prior = sum(latencies) / len(latencies) if latencies else 0.0
+        healthy = sorted(
+            (m for m in rest if self.available(m)),
+            key=lambda m: self.get(m).score(prior),
+        )
+        tripped = [m for m in rest if not self.available(m)]
+        if self.available(primary):
+            return [primary] + healthy + tripped
+        return healthy + [primary] + tripped
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [h.snapshot() for h in list(self._models.values())]
+
+    def reset(self) -> None:
+        self._models.clear()
+
+
+health = HealthRegistry()
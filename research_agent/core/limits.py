@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from research_agent.app.deps import settings
+from research_agent.core.telemetry import (
+    COALESCED_REQUESTS,
+    RATE_LIMIT_REJECTIONS,
+    RATE_LIMIT_WAIT_SECONDS,
+)
+
+# provider name -> semaphore, set by callers that fan out many requests
+_provider_slots: ContextVar[Optional[Dict[str, asyncio.Semaphore]]] = ContextVar(
+    "provider_slots", default=None
+)
+
+
+def llm_provider(model: str) -> str:
+    """Provider a model is routed to (mirrors `Summarizer._ensure_llm`)."""
+    return "openrouter" if "/" in model or ":free" in model else "openai"
+
+
+@contextmanager
+def provider_concurrency(limits: Dict[str, int]) -> Iterator[None]:
+    """Cap concurrent calls per provider for tasks created inside the block.
+
+    Tasks copy the current context when created, so everything spawned here
+    shares the same semaphores.
+    """
+    slots = {name: asyncio.Semaphore(n) for name, n in limits.items() if n > 0}
+    token = _provider_slots.set(slots)
+    try:
+        yield
+    finally:
+        _provider_slots.reset(token)
+
+
+@asynccontextmanager
+async def provider_slot(provider: str) -> AsyncIterator[None]:
+    """Hold a concurrency slot for `provider` if a limit is active."""
+    slots = _provider_slots.get()
+    sem = slots.get(provider) if slots else None
+    if sem is None:
+        yield
+        return
+    async with sem:
+        yield
+
+
+class RateLimitExceeded(Exception):
+    """A call would have waited longer than `RATE_LIMIT_MAX_WAIT_S` for a token."""
+
+    def __init__(self, key: str, wait: float) -> None:
+        super().__init__(f"rate limit for {key}: next slot in {wait:.1f}s")
+        self.key = key
+        self.wait = wait
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average with bursts up to `capacity`.
+
+    Callers reserve a token up front; the balance may go negative, which
+    queues later callers behind earlier ones in arrival order.
+    """
+
+    # In-memory: cheap enough to call on the event loop
+    blocking = False
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Take a token and return how long to wait before using it.
+
+        Returns None (taking nothing) if the wait would exceed `max_wait`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self._tokens -= 1.0
+            return wait
+
+    def wait_time(self) -> float:
+        with self._lock:
+            elapsed = time.monotonic() - self._updated
+            tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            return max(0.0, (1.0 - tokens) / self.rate)
+
+    def refund(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1.0)
+
+
+class SQLiteTokenBucket:
+    """`TokenBucket` whose balance lives in SQLite, shared by worker processes.
+
+    Each reservation is one `BEGIN IMMEDIATE` transaction, so processes on a
+    host draw from the same budget. Uses wall-clock time, which all
+    processes agree on. `throttle` calls it from a worker thread, as the
+    transaction can wait up to 5s for another process's lock.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, key: str, rate: float, capacity: float) -> None:
+        self.path = path
+        self.key = key
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _update(self, change: Callable[[float], Tuple[float, Any]]) -> Any:
+        """Refill, then apply `change(tokens) -> (new_tokens, result)` atomically."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated FROM rate_buckets WHERE key = ?", (self.key,)
+            ).fetchone()
+            tokens = self.capacity
+            if row is not None:
+                elapsed = max(0.0, now - row[1])
+                tokens = min(self.capacity, row[0] + elapsed * self.rate)
+            tokens, result = change(tokens)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) "
+                "VALUES (?, ?, ?)",
+                (self.key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        def take(tokens: float) -> Tuple[float, Optional[float]]:
+            wait = max(0.0, (1.0 - tokens) / self.rate)
+            if wait > max_wait:
+                return tokens, None
+            return tokens - 1.0, wait
+
+        return self._update(take)
+
+    def wait_time(self) -> float:
+        return self._update(
+            lambda tokens: (tokens, max(0.0, (1.0 - tokens) / self.rate))
+        )
+
+    def refund(self) -> None:
+        self._update(lambda tokens: (min(self.capacity, tokens + 1.0), None))
+
+
+_buckets: Dict[str, Any] = {}
+_buckets_lock = threading.Lock()
+
+
+def _bucket(key: str) -> Optional[TokenBucket]:
+    rpm = settings.rate_limits_rpm.get(key)
+    if not rpm or rpm <= 0:
+        return None
+    bucket = _buckets.get(key)
+    if bucket is None:
+        if settings.rate_limit_backend == "sqlite":
+            path = os.path.join(settings.data_dir, "limits.sqlite3")
+            created: Any = SQLiteTokenBucket(
+                path, key, rpm / 60.0, settings.rate_limit_burst
+            )
+        else:
+            created = TokenBucket(rpm / 60.0, settings.rate_limit_burst)
+        with _buckets_lock:
+            bucket = _buckets.setdefault(key, created)
+    return bucket
+
+
+def reset_rate_limiters() -> None:
+    with _buckets_lock:
+        _buckets.clear()
+
+
+async def throttle(*keys: str) -> None:
+    """Wait for a token from each configured bucket among `keys`.
+
+    Keys are provider names (`tavily`, `openrouter`, `openai`) or model ids,
+    as configured in `RATE_LIMITS_RPM`. Raises `RateLimitExceeded` instead of
+    queueing longer than `RATE_LIMIT_MAX_WAIT_S`, so the caller can fall back.
+    """
+
+    async def call(bucket: Any, method: Callable[..., Any], *args: Any) -> Any:
+        if bucket.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    reserved: List[Tuple[str, TokenBucket, float]] = []
+    for key in keys:
+        bucket = _bucket(key)
+        if bucket is None:
+            continue
+        wait = await call(bucket, bucket.reserve, settings.rate_limit_max_wait_s)
+        if wait is None:
+            for _key, taken, _wait in reserved:
+                await call(taken, taken.refund)
+            RATE_LIMIT_REJECTIONS.labels(key).inc()
+            raise RateLimitExceeded(key, await call(bucket, bucket.wait_time))
+        reserved.append((key, bucket, wait))
+    if not reserved:
+        return
+    longest = max(wait for _key, _bucket, wait in reserved)
+    for key, _taken, _wait in reserved:
+        RATE_LIMIT_WAIT_SECONDS.labels(key).observe(longest)
+    if longest > 0:
+        await asyncio.sleep(longest)
+
+
+class SingleFlight:
+    """Lets concurrent callers with the same key share one execution.
+
+    The first caller starts the work as a task; callers arriving while it is
+    in flight await the same task. The task is shielded, so a caller that is
+    cancelled (its client disconnected) does not cancel the work for the
+    others; it is cancelled only when the last caller waiting on it goes.
+    Keys are scoped to the running event loop because tasks cannot be
+    awaited across loops.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Tuple[int, Hashable], "asyncio.Future[Any]"] = {}
+        self._waiters: Dict[Tuple[int, Hashable], int] = {}
+
+    async def run(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Return `(result, shared)`; `shared` is True for callers that joined."""
+        slot = (id(asyncio.get_running_loop()), key)
+        task = self._calls.get(slot)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[slot] = task
+
+            def _forget(done: "asyncio.Future[Any]") -> None:
+                if self._calls.get(slot) is done:
+                    del self._calls[slot]
+                    self._waiters.pop(slot, None)
+
+            task.add_done_callback(_forget)
+        else:
+            COALESCED_REQUESTS.inc()
+        self._waiters[slot] = self._waiters.get(slot, 0) + 1
+        try:
+            return await asyncio.shield(task), shared
+        except asyncio.CancelledError:
+            if self._calls.get(slot) is task:
+                self._waiters[slot] -= 1
+                if self._waiters[slot] <= 0:
+                    # Nobody is left to use the result
+                    task.cancel()
+            raise
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def drain(self, timeout: float) -> int:
+        """Wait up to `timeout` for this loop's calls; returns those unfinished.
+
+        Calls that still have a caller (a request or a job) get time to
+        finish, and to feed RAG, before shutdown.
+        """
+        loop_id = id(asyncio.get_running_loop())
+        tasks = [t for (lid, _key), t in self._calls.items() if lid == loop_id]
+        if not tasks or timeout <= 0:
+            return len(tasks)
+        _done, pending = await asyncio.wait(tasks, timeout=timeout)
+        return len(pending)
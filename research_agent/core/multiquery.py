@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import re
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from research_agent.app.deps import settings, logger
+
+if TYPE_CHECKING:
+    from research_agent.core.components import SearchResult, SearchTool
+
+# Reciprocal rank fusion constant from Cormack et al.; dampens top-rank spikes
+RRF_K = 60
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "igshid"}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_VERSUS = re.compile(r"\s+(?:vs\.?|versus|compared to)\s+", re.IGNORECASE)
+_LIST_PREFIX = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def canonicalize_url(url: str) -> str:
+    """Key for deduplicating URLs that point at the same page.
+
+    Drops the scheme, `www.`, default ports, fragments, tracking parameters
+    and trailing slashes, and sorts the remaining query parameters.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = parts.port
+    if port and port != _DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{port}"
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or ""
+    return urlunsplit(("", host, path, urlencode(query), ""))
+
+
+def expand_query_rules(query: str, max_queries: int) -> List[str]:
+    """Sub-queries covering common facets of a research question."""
+    query = query.strip()
+    year = datetime.now(timezone.utc).year
+    candidates = [query]
+    sides = [s.strip(" ?") for s in _VERSUS.split(query) if s.strip(" ?")]
+    if len(sides) > 1:
+        candidates += sides
+    candidates += [
+        f"{query} overview",
+        f"{query} latest developments {year}",
+        f"{query} challenges and limitations",
+        f"{query} examples and case studies",
+    ]
+    return _unique(candidates)[:max_queries]
+
+
+async def expand_query_llm(query: str, max_queries: int) -> List[str]:
+    """One short LLM call proposing sub-queries; falls back to the rules."""
+    from research_agent.core.components import Summarizer
+
+    prompt = (
+        f"Write {max_queries - 1} different web search queries that together "
+        f"cover the research question below. One query per line, no numbering "
+        f"or commentary.\n\nQuestion: {query}"
+    )
+    model = settings.deep_search_expansion_model or settings.model_name
+    try:
+        text = await asyncio.wait_for(
+            Summarizer(model_name=model, temperature=0.0).asummarize(prompt),
+            settings.deep_search_expansion_timeout_s,
+        )
+    except Exception as e:
+        logger.error(f"Query expansion failed, using rules: {e}")
+        return expand_query_rules(query, max_queries)
+    lines = [_LIST_PREFIX.sub("", line).strip(" \"'") for line in text.splitlines()]
+    subs = [line for line in lines if 3 <= len(line) <= 200]
+    if not subs:
+        return expand_query_rules(query, max_queries)
+    return _unique([query] + subs)[:max_queries]
+
+
+def _unique(queries: Sequence[str]) -> List[str]:
+    seen, out = set(), []
+    for q in queries:
+        key = " ".join(q.lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            out.append(q)
+    return out
+
+
+def fuse_results(
+    ranked_lists: Sequence[Sequence["SearchResult"]], limit: int, k: int = RRF_K
+) -> List["SearchResult"]:
+    """Merge ranked result lists with reciprocal rank fusion.
+
+    Results sharing a canonical URL are merged (their scores add up, so
+    pages found by several sub-queries rise); the first occurrence's title
+    and the longest snippet are kept.
+    """
+    scores: Dict[str, float] = {}
+    best: Dict[str, "SearchResult"] = {}
+    for results in ranked_lists:
+        for rank, result in enumerate(results, 1):
+            key = canonicalize_url(result.url) or result.title
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            kept = best.get(key)
+            if kept is None:
+                best[key] = result
+            elif len(result.snippet) > len(kept.snippet):
+                best[key] = type(kept)(kept.title, kept.url, result.snippet)
+    order = sorted(scores, key=lambda key: -scores[key])
+    return [best[key] for key in order[:limit]]
+
+
+async def deep_search(
+    tool: "SearchTool",
+    query: str,
+    *,
+    max_queries: Optional[int] = None,
+    per_query: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> Tuple[List["SearchResult"], Dict[str, object]]:
+    """Search several expansions of `query` concurrently and fuse the results.
+
+    The original query starts immediately, so LLM expansion overlaps with it
+    and wall-clock time stays close to one search. Failed sub-queries are
+    skipped; the call only fails if every sub-query does.
+    """
+    max_queries = max(1, max_queries or settings.deep_search_max_queries)
+    per_query = per_query or settings.deep_search_per_query
+    limit = limit or settings.deep_search_max_results
+
+    first = asyncio.ensure_future(tool.asearch(query, limit=per_query))
+    try:
+        if settings.deep_search_expansion == "llm" and max_queries > 1:
+            subs = await expand_query_llm(query, max_queries)
+        else:
+            subs = expand_query_rules(query, max_queries)
+        rest = [
+            asyncio.ensure_future(tool.asearch(q, limit=per_query)) for q in subs[1:]
+        ]
+    except BaseException:
+        first.cancel()
+        raise
+    outcomes = await asyncio.gather(first, *rest, return_exceptions=True)
+
+    ranked: List[List["SearchResult"]] = []
+    for sub, outcome in zip(subs, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"Deep search sub-query failed: {sub!r} error={outcome}")
+            continue
+        ranked.append(outcome[0])
+    if not ranked:
+        raise outcomes[0]  # type: ignore[misc]
+    fused = fuse_results(ranked, limit)
+    return fused, {"queries": subs, "candidates": sum(len(r) for r in ranked)}
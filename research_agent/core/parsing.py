@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+# A section heading on its own line: `# Sources`, `### References:`,
+# `**Sources**` or a bare `Sources:`
+_HEADING = re.compile(
+    r"^[ \t]{0,3}(?:#{1,6}[ \t]*)?(?:\*\*|__)?[ \t]*"
+    r"(summary|sources|references|citations|bibliography)"
+    r"[ \t]*:?[ \t]*(?:\*\*|__)?[ \t]*:?[ \t\r]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_SOURCE_HEADINGS = {"sources", "references", "citations", "bibliography"}
+# Any ATX heading; one at the level of the sources heading or above ends it
+_ATX_HEADING = re.compile(r"[ \t]{0,3}(#{1,6})(?:[ \t]|$)")
+# Bold and bare labels rank below every `#` heading
+_LABEL_LEVEL = 7
+_HEADING_WORDS = ("summary", *_SOURCE_HEADINGS)
+# Bullets, numbered items (`1.`, `2)`) and footnote-style `[1]` prefixes
+_LIST_MARKER = re.compile(r"^\s*(?:[-*+•]|\d{1,3}[.)]|\[\d{1,3}\](?!\s*[:(\[]))\s*")
+# Reference definition: `[label]: url "optional title"`
+_DEFINITION = re.compile(
+    r"""^[ \t]{0,3}\[([^\]\n]+)\]:[ \t]*<?(\S+?)>?"""
+    r"""(?:[ \t]+["'(](.+?)["')])?[ \t\r]*$""",
+    re.MULTILINE,
+)
+# `[title](url "optional title")` with one level of nesting on either side;
+# deeper nesting falls back to the bracket scanner
+# (possessive quantifiers, Python 3.11+, keep failed matches from backtracking)
+_LINK = (
+    r"""\[((?:[^\[\]\\]++|\\.|\[[^\[\]]*+\])*+)\]"""
+    r"""\(\s*<?((?:[^()\s<>]++|\([^()\s]*+\))++)>?(?:\s+["'(][^)]*)?\)"""
+)
+_INLINE_LINK = re.compile(_LINK)
+# The common source line in one match: optional bullet or number, optional
+# emphasis, then an inline link
+_SOURCE_LINK = re.compile(r"[ \t]*(?:[-*+•]|\d{1,3}[.)])?[ \t]*(?:\*\*|__)?" + _LINK)
+# A whole line of the prompt's `- [Title](URL)` sources list
+_BULLET_LINK = re.compile(r"[ \t]*-[ \t]+" + _LINK + r"[.,;]?[ \t\r]*")
+_URL = re.compile(r"<?(https?://[^\s<>]+)>?")
+_TRAILING_PUNCT = ".,;:"
+
+
+class Source(BaseModel):
+    title: str
+    url: str
+
+
+class StructuredSummary(BaseModel):
+    """Answer shape requested from models in structured output mode."""
+
+    summary_md: str = Field(
+        description="Detailed Markdown summary with sections, without a sources list"
+    )
+    sources: List[Source] = Field(
+        description="At least 3 sources used, each with a title and a URL"
+    )
+
+
+def _balanced(text: str, start: int, open_ch: str, close_ch: str) -> int:
+    """Index of the bracket closing `text[start]`, or -1 if unbalanced."""
+    depth = 0
+    i = start
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\":
+            i += 2  # escaped bracket
+            continue
+        if ch == open_ch:
+            depth += 1
+        elif ch == close_ch:
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return -1
+
+
+def _heading_level(line: str) -> int:
+    match = _ATX_HEADING.match(line)
+    return len(match.group(1)) if match else _LABEL_LEVEL
+
+
+def _split_link(text: str) -> Optional[Tuple[str, str, str]]:
+    """Parse a leading `[title](url)` or `[title][ref]`.
+
+    Returns `(kind, title, target)` where kind is "inline" or "ref". Titles
+    may contain nested brackets and URLs may contain balanced parentheses.
+    """
+    if not text.startswith("["):
+        return None
+    fast = _INLINE_LINK.match(text)
+    if fast is not None:
+        return "inline", fast.group(1).strip(), fast.group(2)
+    end = _balanced(text, 0, "[", "]")
+    if end < 0:
+        return None
+    title = text[1:end].strip()
+    rest = text[end + 1 :]
+    if rest.startswith("("):
+        close = _balanced(rest, 0, "(", ")")
+        if close < 0:
+            return None
+        target = rest[1:close].strip()
+        # Drop an optional link title: [t](url "title")
+        target = target.split(" ", 1)[0].strip("<>")
+        return "inline", title, target
+    if rest.startswith("["):
+        close = rest.find("]")
+        if close < 0:
+            return None
+        label = rest[1:close].strip() or title
+        return "ref", title, label
+    # Shortcut reference: `[label]` on its own
+    if not rest.strip():
+        return "ref", title, title
+    return None
+
+
+class SourceCollector:
+    """Single-pass state machine over the lines of a model answer.
+
+    Tracks which section a line belongs to, records reference definitions
+    wherever they appear and yields each distinct source as soon as it can
+    be resolved (a reference-style link waits for its definition).
+    """
+
+    def __init__(self) -> None:
+        self.section = "preamble"
+        # Level of the heading that opened the sources section
+        self.level = _LABEL_LEVEL
+        self.sources: List[Dict[str, str]] = []
+        self._seen: set = set()
+        self._definitions: Dict[str, Tuple[str, str]] = {}
+        self._pending: Dict[str, List[str]] = {}
+
+    def heading(self, line: str) -> Optional[str]:
+        match = _HEADING.match(line)
+        if match is None:
+            return None
+        name = match.group(1).lower()
+        return "sources" if name in _SOURCE_HEADINGS else "summary"
+
+    def _emit(self, title: str, url: str) -> List[Dict[str, str]]:
+        url = url.rstrip(_TRAILING_PUNCT)
+        if not url or url in self._seen:
+            return []
+        self._seen.add(url)
+        source = {"title": title or url, "url": url}
+        self.sources.append(source)
+        return [source]
+
+    def consume(self, line: str) -> List[Dict[str, str]]:
+        """Advance over one line; returns sources it completed."""
+        if self.section == "sources":
+            fast = _SOURCE_LINK.match(line)
+            if fast is not None:
+                return self._emit(fast.group(1).strip(), fast.group(2))
+        stripped = line.strip()
+        # Cheap checks keep the regexes off ordinary prose
+        if stripped[:1] in "#*_" or len(stripped) < 16:
+            section = self.heading(line)
+            if section is not None:
+                self.section = section
+                self.level = _heading_level(line)
+                return []
+            closing = _ATX_HEADING.match(line) if stripped[:1] == "#" else None
+            if (
+                self.section == "sources"
+                and closing is not None
+                and len(closing.group(1)) <= self.level
+            ):
+                # `# Notes` after `# Sources`: the list is over
+                self.section = "other"
+                return []
+        definition = _DEFINITION.match(line) if stripped[:1] == "[" else None
+        if definition is not None:
+            label, url, title = definition.groups()
+            key = label.strip().lower()
+            self._definitions[key] = (url, title or "")
+            waiting = self._pending.pop(key, None)
+            if waiting:
+                return [s for t in waiting for s in self._emit(t, url)]
+            if self.section == "sources":
+                return self._emit(title or label.strip(), url)
+            return []
+        if self.section != "sources":
+            return []
+        return self._source_line(line)
+
+    def _source_line(self, line: str) -> List[Dict[str, str]]:
+        text = _LIST_MARKER.sub("", line.strip(), count=1).strip()
+        if not text:
+            return []
+        # Emphasised links: **[Title](url)**
+        text = text.strip("*_") if text[:1] in "*_" else text
+        link = _split_link(text)
+        if link is not None:
+            kind, title, target = link
+            if kind == "inline":
+                return self._emit(title, target)
+            key = target.lower()
+            if key in self._definitions:
+                return self._emit(title, self._definitions[key][0])
+            self._pending.setdefault(key, []).append(title)
+            return []
+        match = _URL.search(text)
+        if match is None:
+            return []
+        # `Title - https://...`, `Title: https://...` or a bare URL
+        title = text[: match.start()].strip(" -–—:|").strip()
+        return self._emit(title, match.group(1))
+
+
+def _matching_lines(
+    haystack: str, needles: Tuple[str, ...], pattern: re.Pattern, text: str = ""
+) -> List[re.Match]:
+    """Lines of `text` matching `pattern` among those containing a needle.
+
+    `str.find` locates candidates at C speed, so the anchored pattern runs
+    on a handful of lines instead of being tried at every position.
+    """
+    text = text or haystack
+    starts = set()
+    for needle in needles:
+        i = haystack.find(needle)
+        while i != -1:
+            starts.add(haystack.rfind("\n", 0, i) + 1)
+            i = haystack.find(needle, i + len(needle))
+    matches = []
+    for start in sorted(starts):
+        end = text.find("\n", start)
+        match = pattern.match(text, start, len(text) if end == -1 else end)
+        if match is not None:
+            matches.append(match)
+    return matches
+
+
+def _section_end(content: str, start: int, end: int, level: int) -> int:
+    """Where a sources section in `content[start:end]` ends: at the first
+    heading of `level` or above, else at `end`."""
+    i = content.find("#", start, end)
+    while i != -1:
+        line_start = content.rfind("\n", 0, i) + 1
+        if line_start >= start and i - line_start <= 3:
+            match = _ATX_HEADING.match(content, line_start, end)
+            if match is not None and len(match.group(1)) <= level:
+                return line_start
+        # Skip the rest of the line: `#` inside URLs and text
+        i = content.find("\n", i, end)
+        i = -1 if i == -1 else content.find("#", i, end)
+    return end
+
+
+def _parse_standard(content: str) -> Optional[Dict[str, Any]]:
+    """The layout the prompt asks for, or None to use the general parser.
+
+    `# Summary` first, then `# Sources` followed by nothing but
+    `- [Title](URL)` lines, with no other summary or sources headings.
+    """
+    if not content.startswith("# Summary\n"):
+        return None
+    cut = content.find("\n# Sources\n")
+    if cut == -1:
+        return None
+    sources: List[Dict[str, str]] = []
+    seen = set()
+    for line in content[cut + 11 :].splitlines():
+        match = _BULLET_LINK.fullmatch(line)
+        if match is None:
+            if line.strip():
+                return None
+            continue
+        url = match.group(2).rstrip(_TRAILING_PUNCT)
+        if url and url not in seen:
+            seen.add(url)
+            sources.append({"title": match.group(1).strip() or url, "url": url})
+    summary = content[10:cut]
+    if _matching_lines(summary.lower(), _HEADING_WORDS, _HEADING, summary):
+        return None  # e.g. a `## References` section inside the summary
+    return {"summary_md": summary.strip(), "sources": sources}
+
+
+def parse_content(content: str) -> Dict[str, Any]:
+    """Split a Markdown answer into its summary and sources.
+
+    The summary is the text under a `Summary` heading (any level), or else
+    everything before the sources heading. Sources come from sources-like
+    sections (`Sources`, `References`, ...): inline links, reference-style
+    links and definitions, numbered or bulleted, or bare URLs.
+
+    A sources section ends at the next summary or sources heading, or at
+    any other heading of the same level or above (`# Notes` after
+    `# Sources`).
+
+    The prompt's own layout is parsed by a fast path. Otherwise headings
+    and reference definitions are located with `str.find`, so only
+    candidate lines and the lines of the sources sections are examined.
+    The result matches feeding every line to a `SourceCollector`.
+    """
+    standard = _parse_standard(content)
+    if standard is not None:
+        return standard
+    summary_start = summary_end = None
+    # (start, end, heading level) of each sources section
+    regions: List[Tuple[int, int, int]] = []
+    opened: Optional[Tuple[int, int]] = None
+
+    def close(end: int) -> None:
+        if opened is not None:
+            start, level = opened
+            regions.append((start, _section_end(content, start, end, level), level))
+
+    for match in _matching_lines(content.lower(), _HEADING_WORDS, _HEADING, content):
+        kind = match.group(1).lower()
+        if kind in _SOURCE_HEADINGS:
+            if summary_end is None:
+                summary_end = match.start()
+            close(match.start())
+            opened = (match.end(), _heading_level(match.group(0)))
+        else:
+            if summary_start is None:
+                summary_start = match.end()
+            close(match.start())
+            opened = None
+    close(len(content))
+
+    collector = SourceCollector()
+    if regions and "]:" not in content:
+        # No reference definitions anywhere: just walk the sources sections
+        for a, b, level in regions:
+            collector.section, collector.level = "sources", level
+            for line in content[a:b].splitlines():
+                collector.consume(line)
+    elif regions:
+        # Definitions outside the sources sections still resolve references
+        events = [
+            (m.start(), "summary", _LABEL_LEVEL, m.group(0))
+            for m in _matching_lines(content, ("]:",), _DEFINITION)
+            if not any(a <= m.start() < b for a, b, _level in regions)
+        ]
+        for a, b, level in regions:
+            position = a
+            for line in content[a:b].splitlines(keepends=True):
+                events.append((position, "sources", level, line))
+                position += len(line)
+        events.sort(key=lambda event: event[0])
+        for _position, section, level, line in events:
+            collector.section, collector.level = section, level
+            collector.consume(line)
+
+    if summary_start is None:
+        summary = content[:summary_end]
+    elif summary_end is not None and summary_end >= summary_start:
+        summary = content[summary_start:summary_end]
+    else:
+        summary = content[summary_start:]
+    return {"summary_md": summary.strip(), "sources": collector.sources}
+
+
+def parse_structured(payload: Any) -> Dict[str, Any]:
+    """Validate a structured-output answer into the `parse_content` shape."""
+    answer = (
+        payload
+        if isinstance(payload, StructuredSummary)
+        else StructuredSummary.model_validate(payload)
+    )
+    sources: List[Dict[str, str]] = []
+    seen = set()
+    for source in answer.sources:
+        url = source.url.strip()
+        if url and url not in seen:
+            seen.add(url)
+            sources.append({"title": source.title.strip() or url, "url": url})
+    return {"summary_md": answer.summary_md.strip(), "sources": sources}
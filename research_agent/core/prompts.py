@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, List
+
+# Instructions are the same for every request, so they go first, in the
+# system message: providers that cache prompt prefixes can then reuse them.
+# Only the user message varies (query and search context).
+_PREAMBLE = """You are a meticulous research assistant.
+
+The user sends a research query and relevant web search results. Research
+the query using those results."""
+
+SYSTEM_MARKDOWN = f"""{_PREAMBLE}
+
+Rules:
+- Produce a detailed Markdown summary with sections.
+- Do NOT use placeholders.
+- Always include at least 3 sources in the 'Sources' section as markdown links.
+
+Format strictly as:
+
+# Summary
+<actual summary>
+
+# Sources
+- [Title](URL)
+- [Title](URL)
+- [Title](URL)
+"""
+
+SYSTEM_STRUCTURED = f"""{_PREAMBLE}
+
+Rules:
+- Put a detailed Markdown summary with sections in `summary_md`.
+- Do NOT use placeholders.
+- List at least 3 sources you used in `sources`, each with a title and URL.
+"""
+
+USER_TEMPLATE = """Task: Research the following query:
+"{query}"
+
+Context: Here are some relevant search results:
+{context}
+"""
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """A summarization prompt: fixed instructions plus the request's content."""
+
+    system: str
+    user: str
+
+    def __str__(self) -> str:
+        return f"{self.system}\n{self.user}"
+
+    def to_messages(self) -> List[Any]:
+        from langchain_core.messages import HumanMessage
+
+        return [system_message(self.system), HumanMessage(content=self.user)]
+
+
+def research_prompt(query: str, context: str, structured: bool) -> Prompt:
+    system = SYSTEM_STRUCTURED if structured else SYSTEM_MARKDOWN
+    return Prompt(system, USER_TEMPLATE.format(query=query, context=context))
+
+
+@lru_cache(maxsize=8)
+def system_message(text: str) -> Any:
+    """One shared `SystemMessage` per instruction text (messages are immutable)."""
+    from langchain_core.messages import SystemMessage
+
+    return SystemMessage(content=text)
+
+
+def as_messages(prompt: "Prompt | str") -> List[Any]:
+    """Chat messages for a `Prompt`, or a single user message for plain text."""
+    if isinstance(prompt, Prompt):
+        return prompt.to_messages()
+    from langchain_core.messages import HumanMessage
+
+    return [HumanMessage(content=prompt)]
@@ -1,11 +1,213 @@
-from typing import Dict, Any, Optional
-from research_agent.app.deps import logger, fallback_models
-from research_agent.core.components import SearchTool, Summarizer, ResponseParser
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Any, List, Optional, Sequence, Tuple
+from research_agent.app.deps import (
+    context_budget,
+    fallback_models,
+    logger,
+    settings,
+)
+from research_agent.core.cache import get_result_cache, normalize_query
+from research_agent.core.deadlines import (
+    DeadlineExceeded,
+    bounded,
+    expired,
+    no_deadline,
+    remaining,
+)
+from research_agent.core.execution import AllModelsFailed, execute
+from research_agent.core.fetch import enrich_results
+from research_agent.core.health import health
+from research_agent.core.limits import SingleFlight, provider_concurrency
+from research_agent.core.multiquery import canonicalize_url
+from research_agent.core.prompts import Prompt
+from research_agent.core.telemetry import (
+    CACHE_LOOKUPS,
+    FALLBACKS,
+    LLM_ATTEMPT_SECONDS,
+    record_attempts,
+    span,
+    summarize_usage,
+    usage_scope,
+)
+from research_agent.core.components import (
+    SearchResult,
+    SearchTool,
+    Summarizer,
+    ResponseParser,
+    StreamingResponseParser,
+)
+from research_agent.services.rag import SNIPPET, RagStore, get_rag_store
 
 
 def run_research(
-    query: str, *, model_name: Optional[str] = None, temperature: Optional[float] = None
+    query: str,
+    *,
+    model_name: Optional[str] = None,
+    temperature: Optional[float] = None,
+    deep: Optional[bool] = None,
 ) -> Dict[str, Any]:
+    """Blocking wrapper around `run_research_async` for scripts and sync callers."""
+    return asyncio.run(
+        run_research_async(
+            query, model_name=model_name, temperature=temperature, deep=deep
+        )
+    )
+
+
+async def _search(
+    search: SearchTool, query: str, deep: bool
+) -> Tuple[List[Any], Optional[List[str]]]:
+    """Single Tavily query, or the multi-query deep search when `deep`."""
+    with span("search", deep=deep):
+        if deep:
+            results, info = await search.adeep_search(query)
+            return results, info["queries"]
+        results, _raw = await search.asearch(query, limit=5)
+        return results, None
+
+
+async def _consult_rag(
+    query: str, model: str, temperature: float
+) -> Tuple[Optional[RagStore], Optional[Dict[str, Any]], List[SearchResult]]:
+    """Look the query up in local knowledge before going to the web.
+
+    Returns the store (None when RAG is off), a ready answer when a recent past
+    summary for the same model and temperature is similar enough, and past
+    snippets worth adding to the context.
+    """
+    try:
+        store = get_rag_store()
+        if store is None:
+            return None, None, []
+        with span("rag_retrieve"):
+            hits = await store.retrieve(query)
+    except Exception as e:
+        logger.error(f"RAG retrieval failed: {e}")
+        return None, None, []
+    now = time.time()
+    for doc, score in hits:
+        if (
+            doc.answers(model, temperature)
+            and score >= settings.rag_answer_threshold
+            and now - doc.created_at <= settings.rag_max_age_s
+        ):
+            answer = {
+                "query": query,
+                "final_summary": doc.content,
+                "sources": doc.sources,
+                "rag": "answer",
+            }
+            return store, answer, []
+    local = [
+        SearchResult(doc.title, doc.url, doc.content)
+        for doc, score in hits
+        if doc.kind == SNIPPET and score >= settings.rag_augment_threshold
+    ]
+    return store, None, local
+
+
+def _augment(top_results: List[Any], local: List[SearchResult]) -> List[Any]:
+    """Append local snippets whose pages the web search did not return."""
+    seen = {canonicalize_url(r.url) for r in top_results}
+    extra = [r for r in local if canonicalize_url(r.url) not in seen]
+    return list(top_results) + extra
+
+
+_inflight = SingleFlight()
+
+
+async def run_research_async(
+    query: str,
+    *,
+    model_name: Optional[str] = None,
+    temperature: Optional[float] = None,
+    deep: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Run the research pipeline, sharing work with identical in-flight calls.
+
+    With `COALESCE_REQUESTS`, concurrent calls for the same normalized query,
+    model, temperature and search mode await one pipeline run.
+    """
+    deep = settings.deep_search_default if deep is None else deep
+    if not settings.coalesce_requests:
+        return await _run_research_async(query, model_name, temperature, deep)
+    key = (
+        normalize_query(query),
+        model_name or settings.model_name,
+        temperature if temperature is not None else settings.temperature,
+        deep,
+    )
+
+    async def run_shared() -> Dict[str, Any]:
+        # The run starts in the first caller's context; its deadline must not
+        # cut the run short for callers that join later
+        with no_deadline():
+            return await _run_research_async(query, model_name, temperature, deep)
+
+    # Each caller waits until its own deadline; the run is cancelled only
+    # when the last caller gives up
+    result, shared = await bounded(_inflight.run(key, run_shared))
+    if shared:
+        # Callers annotate their result (headers, persistence); give each a copy
+        logger.info("Coalesced research request onto in-flight query=%r", key[0])
+        shared_result = {**result, "query": query}
+        # The tokens were spent (and reported) by the request that ran it
+        shared_result.pop("usage", None)
+        return shared_result
+    return result
+
+
+async def drain_research(timeout: float) -> int:
+    """Wait for in-flight pipeline runs; returns how many did not finish."""
+    return await _inflight.drain(timeout)
+
+
+async def _run_research_async(
+    query: str,
+    model_name: Optional[str],
+    temperature: Optional[float],
+    deep: bool,
+) -> Dict[str, Any]:
+    with usage_scope() as usage:
+        result = await _pipeline(query, model_name, temperature, deep)
+    return _with_usage(result, usage)
+
+
+def _with_usage(result: Dict[str, Any], usage: Dict[str, Any]) -> Dict[str, Any]:
+    # Cache and RAG answers made no LLM calls and get no usage block
+    summary = summarize_usage(usage) if settings.usage_in_response else None
+    return result if summary is None else {**result, "usage": summary}
+
+
+async def _pipeline(
+    query: str,
+    model_name: Optional[str],
+    temperature: Optional[float],
+    deep: bool,
+) -> Dict[str, Any]:
+    variant = "deep" if deep else ""
+    # Serve repeated (or, with the semantic tier, near-repeated) queries from cache
+    cache = get_result_cache()
+    primary_model = model_name or settings.model_name
+    cache_temp = temperature if temperature is not None else settings.temperature
+    if cache is not None:
+        try:
+            with span("cache_lookup"):
+                cached, status = await cache.lookup(
+                    query, primary_model, cache_temp, variant
+                )
+        except Exception as e:
+            logger.error(f"Result cache lookup failed: {e}")
+            cached, status = None, "miss"
+        CACHE_LOOKUPS.labels(status).inc()
+        if cached is not None:
+            return {"query": query, **cached, "cache": status}
+
+    rag, answer, local = await _consult_rag(query, primary_model, cache_temp)
+    if answer is not None:
+        return answer
+
     # Initialize components
     try:
         search = SearchTool()
@@ -18,7 +220,7 @@ def run_research(
         }
 
     try:
-        summarizer = Summarizer(model_name=model_name, temperature=temperature)
+        summarizer = Summarizer(model_name=primary_model, temperature=temperature)
     except Exception as e:
         logger.error(f"Failed to initialize summarizer: {e}")
         return {
@@ -29,7 +231,9 @@ def run_research(
 
     # Search
     try:
-        top_results, _raw = search.search(query, limit=5)
+        top_results, search_queries = await _search(search, query, deep)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error during search: {e}")
         return {
@@ -37,39 +241,263 @@ def run_research(
             "final_summary": "Error: Search invocation failed.",
             "sources": [],
         }
+    web_results = top_results
+    if local:
+        top_results = _augment(top_results, local)
+    if settings.fetch_enabled:
+        with span("fetch"):
+            top_results = await enrich_results(top_results)
+
+    # Summarize, falling back to other models per the configured policy
+    # Prompts depend on each model's context budget; build each variant once
+    prompts: Dict[int, Prompt] = {}
+
+    def prompt_for(model: str) -> Prompt:
+        budget = context_budget(model)
+        if budget not in prompts:
+            with span("prompt"):
+                prompts[budget] = Summarizer.build_prompt(query, top_results, model)
+        return prompts[budget]
+
+    prompt_for(primary_model)
+
+    async def attempt(model: str) -> Any:
+        llm = (
+            summarizer
+            if model == primary_model
+            else Summarizer(model_name=model, temperature=temperature)
+        )
+        if settings.structured_output:
+            return await llm.asummarize_structured(prompt_for(model))
+        return await llm.asummarize(prompt_for(model))
 
-    # Summarize (with fallback if initial attempt fails)
-    prompt_text = summarizer.build_prompt(query, top_results)
     try:
-        content = summarizer.summarize(prompt_text)
-    except Exception as e:
+        with span("llm", policy=settings.fallback_policy):
+            used_model, content, attempts = await execute(
+                health.order(
+                    [primary_model] + fallback_models(exclude_provider_id=primary_model)
+                ),
+                attempt,
+                policy=settings.fallback_policy,
+                attempt_timeout=settings.llm_attempt_timeout_s,
+                deadline=remaining(settings.research_deadline_s),
+            )
+    except AllModelsFailed as e:
+        record_attempts(e.attempts)
+        if expired():
+            raise DeadlineExceeded("request deadline exceeded") from e
         logger.error(f"Error during summarization: {e}")
-        # Try fallbacks
-        tried: list[str] = []
-        primary_model = getattr(summarizer, "_model_name", None)
-        for alt_model in fallback_models(exclude_provider_id=primary_model):
-            tried.append(alt_model)
-            logger.info(f"Attempting fallback model: {alt_model}")
-            try:
-                alt = Summarizer(model_name=alt_model, temperature=temperature)
-                content = alt.summarize(prompt_text)
-                summarizer = alt  # switch to the working summarizer for downstream
-                break
-            except Exception as ex:
-                logger.error(f"Fallback model failed: {alt_model} error={ex}")
-                content = None  # ensure not using stale content
-        if not content:
-            return {
-                "query": query,
-                "final_summary": "Error: Language model invocation failed.",
-                "sources": [],
-            }
+        return {
+            "query": query,
+            "final_summary": "Error: Language model invocation failed.",
+            "sources": [],
+            "attempts": [a.to_dict() for a in e.attempts],
+        }
+
+    record_attempts(attempts)
 
     # Parse
-    parsed = ResponseParser.parse_content(content)
+    with span("parse"):
+        if isinstance(content, str):
+            parsed = ResponseParser.parse_content(content)
+        else:
+            parsed = ResponseParser.parse_structured(content)
     result = {
         "query": query,
         "final_summary": parsed["summary_md"],
         "sources": parsed["sources"],
+        "model": used_model,
+        "attempts": [a.to_dict() for a in attempts],
     }
+    if search_queries is not None:
+        result["search_queries"] = search_queries
+    if rag is not None:
+        result["rag"] = "augment" if len(top_results) > len(web_results) else "miss"
+        rag.ingest(result, web_results, primary_model, cache_temp)
+    if cache is not None:
+        result["cache"] = "miss"
+        try:
+            await cache.store(query, primary_model, cache_temp, result, variant)
+        except Exception as e:
+            logger.error(f"Result cache store failed: {e}")
     return result
+
+
+async def stream_research(
+    query: str,
+    *,
+    model_name: Optional[str] = None,
+    temperature: Optional[float] = None,
+    deep: Optional[bool] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Run the research pipeline yielding `(event, data)` pairs as work completes.
+
+    Events: `sources` (search results), `token` (summary text deltas), `source`
+    (a source parsed from the streamed `# Sources` section), `final` (the
+    parsed result, same shape as `run_research_async`) or `error`.
+    """
+    with usage_scope() as usage:
+        async for event, data in _stream_pipeline(
+            query, model_name=model_name, temperature=temperature, deep=deep
+        ):
+            if event == "final":
+                data = _with_usage(data, usage)
+            yield event, data
+
+
+async def _stream_pipeline(
+    query: str,
+    *,
+    model_name: Optional[str],
+    temperature: Optional[float],
+    deep: Optional[bool],
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    deep = settings.deep_search_default if deep is None else deep
+    variant = "deep" if deep else ""
+    cache = get_result_cache()
+    cache_model = model_name or settings.model_name
+    cache_temp = temperature if temperature is not None else settings.temperature
+    if cache is not None:
+        try:
+            with span("cache_lookup"):
+                cached, status = await cache.lookup(
+                    query, cache_model, cache_temp, variant
+                )
+        except Exception as e:
+            logger.error(f"Result cache lookup failed: {e}")
+            cached, status = None, "miss"
+        CACHE_LOOKUPS.labels(status).inc()
+        if cached is not None:
+            yield "sources", {"sources": cached["sources"]}
+            yield "final", {"query": query, **cached, "cache": status}
+            return
+
+    rag, answer, local = await _consult_rag(query, cache_model, cache_temp)
+    if answer is not None:
+        yield "sources", {"sources": answer["sources"]}
+        yield "final", answer
+        return
+
+    try:
+        top_results, _queries = await _search(SearchTool(), query, deep)
+    except Exception as e:
+        logger.error(f"Error during search: {e}")
+        yield "error", {"detail": "Error: Search invocation failed."}
+        return
+    web_results = top_results
+    if local:
+        top_results = _augment(top_results, local)
+    yield "sources", {
+        "sources": [{"title": r.title, "url": r.url} for r in top_results]
+    }
+    if settings.fetch_enabled:
+        with span("fetch"):
+            top_results = await enrich_results(top_results)
+
+    prompts: Dict[int, Prompt] = {}
+    candidates = health.order(
+        [cache_model] + fallback_models(exclude_provider_id=cache_model)
+    )
+    for i, candidate in enumerate(candidates):
+        if i:
+            FALLBACKS.labels(candidate).inc()
+        summarizer = Summarizer(model_name=candidate, temperature=temperature)
+        parser = StreamingResponseParser()
+        streamed = False
+        started = time.perf_counter()
+        try:
+            budget = context_budget(candidate)
+            if budget not in prompts:
+                with span("prompt"):
+                    # Streaming needs text; structured output stays off here
+                    prompts[budget] = Summarizer.build_prompt(
+                        query, top_results, candidate, structured=False
+                    )
+            async for text in summarizer.astream(prompts[budget]):
+                streamed = True
+                yield "token", {"text": text}
+                for source in parser.feed(text):
+                    yield "source", source
+        except Exception as e:
+            LLM_ATTEMPT_SECONDS.labels(candidate, "error").observe(
+                time.perf_counter() - started
+            )
+            logger.error(f"Streaming summarization failed: {candidate} error={e}")
+            if streamed:
+                # Tokens already reached the client; switching models would garble
+                yield "error", {"detail": "Error: Language model stream interrupted."}
+                return
+            continue
+        LLM_ATTEMPT_SECONDS.labels(candidate, "ok").observe(
+            time.perf_counter() - started
+        )
+        for source in parser.flush():
+            yield "source", source
+        parsed = parser.finish()
+        result: Dict[str, Any] = {
+            "query": query,
+            "final_summary": parsed["summary_md"],
+            "sources": parsed["sources"],
+        }
+        if rag is not None:
+            augmented = len(top_results) > len(web_results)
+            result["rag"] = "augment" if augmented else "miss"
+            rag.ingest(result, web_results, cache_model, cache_temp)
+        if cache is not None:
+            result["cache"] = "miss"
+            try:
+                await cache.store(query, cache_model, cache_temp, result, variant)
+            except Exception as e:
+                logger.error(f"Result cache store failed: {e}")
+        yield "final", result
+        return
+    yield "error", {"detail": "Error: Language model invocation failed."}
+
+
+async def iter_research_batch(
+    items: Sequence[Tuple[Any, ...]],
+    *,
+    concurrency: Optional[int] = None,
+    provider_limits: Optional[Dict[str, int]] = None,
+) -> AsyncIterator[Tuple[List[int], Dict[str, Any]]]:
+    """Run many `(query, model_name, temperature[, deep])` items concurrently.
+
+    Identical items (same normalized query, model and temperature) run once.
+    Yields `(indices, result)` as each unique item completes, where `indices`
+    are the positions in `items` that share the result.
+    """
+    groups: Dict[Tuple[Any, ...], List[int]] = {}
+    for i, (query, *options) in enumerate(items):
+        groups.setdefault((normalize_query(query), *options), []).append(i)
+
+    gate = asyncio.Semaphore(concurrency or settings.batch_concurrency)
+
+    async def run_one(indices: List[int]) -> Tuple[List[int], Dict[str, Any]]:
+        query, model, temp, *extra = items[indices[0]]
+        # deep is only passed when the item sets it
+        kwargs = {"deep": extra[0]} if extra and extra[0] is not None else {}
+        async with gate:
+            try:
+                result = await run_research_async(
+                    query, model_name=model, temperature=temp, **kwargs
+                )
+            except Exception as e:
+                logger.error(f"Batch research item failed: {e}")
+                result = {
+                    "query": query,
+                    "final_summary": "Error: Research agent failed.",
+                    "sources": [],
+                }
+        return indices, result
+
+    limits = (
+        settings.batch_provider_limits if provider_limits is None else provider_limits
+    )
+    with provider_concurrency(limits):
+        tasks = [asyncio.ensure_future(run_one(ix)) for ix in groups.values()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from research_agent.app.deps import model_price, settings, logger
+from research_agent.app.logs import request_id_var, stage_var
+
+# (stage, seconds) pairs for the current request, summarised in the access log.
+# Child tasks share the list because they copy the context by reference.
+_stages: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "stages", default=None
+)
+# model -> token counts for the current pipeline run (see `usage_scope`)
+_usage: ContextVar[Optional[Dict[str, Dict[str, int]]]] = ContextVar(
+    "usage", default=None
+)
+
+# Bucket bounds in seconds: from cache hits and history reads up to slow LLMs
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=_BUCKETS,
+)
+# livesum: with several workers (PROMETHEUS_MULTIPROC_DIR), add up live ones
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being served",
+    multiprocess_mode="livesum",
+)
+STAGE_SECONDS = Histogram(
+    "research_stage_duration_seconds",
+    "Time spent in each research pipeline stage",
+    ["stage"],
+    buckets=_BUCKETS,
+)
+LLM_ATTEMPT_SECONDS = Histogram(
+    "llm_attempt_duration_seconds",
+    "Duration of each LLM attempt by model and outcome",
+    ["model", "status"],
+    buckets=_BUCKETS,
+)
+# kind: input | output | cached (input tokens read from the prompt cache)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens reported by the provider", ["model", "kind"]
+)
+LLM_COST = Counter(
+    "llm_cost_usd_total", "Estimated LLM spend from MODEL_PRICES", ["model"]
+)
+FALLBACKS = Counter(
+    "research_fallbacks_total", "Fallback model attempts started", ["model"]
+)
+CACHE_LOOKUPS = Counter(
+    "research_cache_lookups_total", "Result cache lookups by outcome", ["result"]
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "rate_limit_wait_seconds",
+    "Time calls queued for a provider/model token bucket",
+    ["key"],
+    buckets=(0, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total",
+    "Calls that would have waited too long for a token",
+    ["key"],
+)
+COALESCED_REQUESTS = Counter(
+    "research_coalesced_requests_total",
+    "Research requests that joined an identical in-flight request",
+)
+CANCELLED_REQUESTS = Counter(
+    "research_cancelled_total",
+    "Research requests whose work was cancelled (disconnect or deadline)",
+    ["reason"],
+)
+RECLAIMED_SECONDS = Counter(
+    "research_reclaimed_seconds_total",
+    "Pipeline time budget not spent because work was cancelled (upper bound)",
+    ["reason"],
+)
+PAGE_FETCHES = Counter(
+    "research_page_fetches_total",
+    "Source page fetches by outcome (cached, revalidated, fetched, timeout, ...)",
+    ["result"],
+)
+
+# Label lookups hash and lock; stage names are few, so keep the children
+_stage_children: Dict[str, Any] = {}
+_tracer: Any = None
+
+
+def configure_tracing() -> None:
+    """Export spans over OTLP when `OTEL_ENABLED` and the SDK is installed.
+
+    The exporter reads the standard `OTEL_EXPORTER_OTLP_*` environment.
+    """
+    global _tracer
+    if not settings.otel_enabled or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        logger.info(f"OpenTelemetry not installed; trace export disabled: {e}")
+        return
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.otel_service_name})
+    )
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("research_agent")
+    logger.info("OpenTelemetry trace export enabled")
+
+
+@contextmanager
+def request_scope(request_id: str) -> Iterator[List[Tuple[str, float]]]:
+    """Bind `request_id` and collect stage timings for one request."""
+    stages: List[Tuple[str, float]] = []
+    id_token = request_id_var.set(request_id)
+    stages_token = _stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _stages.reset(stages_token)
+        request_id_var.reset(id_token)
+
+
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[None]:
+    """Time a pipeline stage into `STAGE_SECONDS` (and an OTel span if enabled).
+
+    Costs two clock reads and a histogram update when tracing is off. Log
+    lines written inside carry the stage.
+    """
+    otel = None
+    if _tracer is not None:
+        otel = _tracer.start_as_current_span(
+            stage,
+            attributes={"request_id": request_id_var.get() or "", **attributes},
+        )
+        otel.__enter__()
+    stage_token = stage_var.set(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_var.reset(stage_token)
+        child = _stage_children.get(stage)
+        if child is None:
+            child = _stage_children.setdefault(stage, STAGE_SECONDS.labels(stage))
+        child.observe(elapsed)
+        stages = _stages.get()
+        if stages is not None:
+            stages.append((stage, elapsed))
+        if otel is not None:
+            otel.__exit__(None, None, None)
+
+
+def stage_totals(stages: List[Tuple[str, float]]) -> Dict[str, int]:
+    """Milliseconds per stage, summed, in first-run order."""
+    totals: Dict[str, float] = {}
+    for stage, seconds in stages:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return {name: int(s * 1000) for name, s in totals.items()}
+
+
+def format_stages(stages: List[Tuple[str, float]]) -> str:
+    """`search:120,llm:850,parse:0` in milliseconds, summed per stage."""
+    return ",".join(f"{name}:{ms}" for name, ms in stage_totals(stages).items())
+
+
+def record_attempts(attempts: List[Any]) -> None:
+    """Export the per-model outcome of every `execution.Attempt`."""
+    for i, attempt in enumerate(attempts):
+        if attempt.end_ms is not None:
+            LLM_ATTEMPT_SECONDS.labels(attempt.model, attempt.status).observe(
+                (attempt.end_ms - attempt.start_ms) / 1000
+            )
+        if i:
+            FALLBACKS.labels(attempt.model).inc()
+
+
+def record_usage(model: str, usage: Optional[Dict[str, Any]]) -> None:
+    """Count tokens from a LangChain `usage_metadata` dict, if the provider sent one.
+
+    Adds to the per-model metrics and, inside `usage_scope`, to the current
+    request's totals.
+    """
+    if not usage:
+        return
+    input_tokens = usage.get("input_tokens", 0)
+    output_tokens = usage.get("output_tokens", 0)
+    cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    LLM_TOKENS.labels(model, "input").inc(input_tokens)
+    LLM_TOKENS.labels(model, "output").inc(output_tokens)
+    LLM_TOKENS.labels(model, "cached").inc(cached_tokens)
+    cost = usage_cost(model, input_tokens, output_tokens, cached_tokens)
+    if cost:
+        LLM_COST.labels(model).inc(cost)
+    totals = _usage.get()
+    if totals is not None:
+        entry = totals.setdefault(
+            model,
+            {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0},
+        )
+        entry["calls"] += 1
+        entry["input_tokens"] += input_tokens
+        entry["output_tokens"] += output_tokens
+        entry["cached_tokens"] += cached_tokens
+
+
+def usage_cost(
+    model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0
+) -> Optional[float]:
+    """Estimated USD cost from `MODEL_PRICES`, or None for unpriced models."""
+    prices = model_price(model)
+    if prices is None:
+        return None
+    cached_price = prices.get("cached_input", prices.get("input", 0.0))
+    return (
+        (input_tokens - cached_tokens) * prices.get("input", 0.0)
+        + cached_tokens * cached_price
+        + output_tokens * prices.get("output", 0.0)
+    ) / 1_000_000
+
+
+@contextmanager
+def usage_scope() -> Iterator[Dict[str, Dict[str, int]]]:
+    """Collect the token usage of LLM calls made in this context, per model."""
+    totals: Dict[str, Dict[str, int]] = {}
+    token = _usage.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage.reset(token)
+
+
+def summarize_usage(totals: Dict[str, Dict[str, int]]) -> Optional[Dict[str, Any]]:
+    """The response `usage` block for `usage_scope` totals; None if empty."""
+    if not totals:
+        return None
+    models = []
+    for model, counts in totals.items():
+        cost = usage_cost(
+            model,
+            counts["input_tokens"],
+            counts["output_tokens"],
+            counts["cached_tokens"],
+        )
+        models.append(
+            {
+                "model": model,
+                **counts,
+                "cost_usd": None if cost is None else round(cost, 8),
+            }
+        )
+    input_tokens = sum(m["input_tokens"] for m in models)
+    output_tokens = sum(m["output_tokens"] for m in models)
+    cached_tokens = sum(m["cached_tokens"] for m in models)
+    costs = [m["cost_usd"] for m in models if m["cost_usd"] is not None]
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cached_tokens": cached_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "cache_hit_rate": (
+            round(cached_tokens / input_tokens, 4) if input_tokens else 0.0
+        ),
+        "cost_usd": round(sum(costs), 8) if costs else None,
+        "models": models,
+    }
@@ -0,0 +1,130 @@
+"""Production entry point: `python -m research_agent.serve`.
+
+Runs the API under uvicorn with uvloop and httptools (both ship with
+`uvicorn[standard]`) and one worker process per CPU available to the
+container. With several workers:
+
+- caches, the job store and rate limiters default to their SQLite backends
+  under `DATA_DIR`, so workers share them instead of keeping one copy each
+  (explicit `*_BACKEND` settings are left alone)
+- Prometheus metrics are kept per process in `PROMETHEUS_MULTIPROC_DIR`
+  and merged by `GET /metrics`
+
+On SIGTERM uvicorn stops accepting connections and waits up to
+`SERVE_GRACEFUL_TIMEOUT_S` for open requests; the app lifespan then lets
+running research and jobs finish and flushes buffered history rows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import math
+import os
+import shutil
+from typing import Dict, Optional
+
+from research_agent.app.deps import logger, settings
+
+# Settings that hold per-process state unless pointed at a shared backend
+SHARED_BACKENDS = (
+    "cache_backend",
+    "search_cache_backend",
+    "jobs_backend",
+    "rate_limit_backend",
+)
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota of this container in cores, or None when unlimited."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", encoding="utf-8") as f:
+            quota_us = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", encoding="utf-8") as f:
+            period_us = int(f.read())
+        return None if quota_us <= 0 else quota_us / period_us
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: affinity mask, capped by the cgroup quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS, Windows
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_limit()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def worker_count(requested: Optional[int] = None) -> int:
+    """Workers to run: `requested`, else `SERVE_WORKERS`, else one per CPU."""
+    workers = requested if requested is not None else settings.serve_workers
+    if workers > 0:
+        return workers
+    return max(1, min(available_cpus(), settings.serve_max_workers))
+
+
+def shared_state_env(workers: int) -> Dict[str, str]:
+    """Environment for worker processes so they share state on this host."""
+    if workers <= 1:
+        return {}
+    env = {
+        name.upper(): "sqlite"
+        for name in SHARED_BACKENDS
+        if name not in settings.model_fields_set
+    }
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        path = os.path.join(settings.data_dir, "prometheus")
+        # Files left by a previous run would be merged into this one's metrics
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+        env["PROMETHEUS_MULTIPROC_DIR"] = os.path.abspath(path)
+    return env
+
+
+def main(argv: Optional[list] = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=settings.serve_host)
+    parser.add_argument("--port", type=int, default=settings.serve_port)
+    parser.add_argument("--workers", type=int, help="0 = one per available CPU")
+    args = parser.parse_args(argv)
+
+    workers = worker_count(args.workers)
+    env = shared_state_env(workers)
+    # Workers are spawned processes: they read these when importing settings
+    os.environ.update(env)
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    logger.info(
+        f"Serving on {args.host}:{args.port} workers={workers} loop={loop} "
+        f"http={http} shared={sorted(env) or 'none'}"
+    )
+    uvicorn.run(
+        "research_agent.app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        # The request middleware writes the access log
+        access_log=False,
+        log_level=settings.log_level.lower(),
+        timeout_graceful_shutdown=int(settings.serve_graceful_timeout_s),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from research_agent.app.deps import settings, logger
+from research_agent.core.telemetry import span
+from research_agent.services import sheets
+
+Page = Tuple[List[Dict[str, Any]], Optional[str]]
+
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    raw = json.dumps([created_at, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    return str(created_at), int(row_id)
+
+
+class HistoryBackend(Protocol):
+    def append(self, data: Dict[str, Any]) -> None: ...
+
+    def page(
+        self, limit: int, before: Optional[str] = None, q: Optional[str] = None
+    ) -> Page: ...
+
+    def version(self) -> Optional[str]:
+        """Changes whenever a row is added; None if it cannot be cheaply known."""
+        ...
+
+
+class SQLiteHistoryStore:
+    """Local research history in SQLite (WAL), newest first via keyset paging.
+
+    Rows are indexed on `(created_at, id)` and `query`; an FTS5 table mirrors
+    queries and summaries for full-text search when SQLite supports it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS research_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                query TEXT NOT NULL,
+                final_summary TEXT NOT NULL,
+                sources_json TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS research_history_created
+                ON research_history (created_at, id);
+            CREATE INDEX IF NOT EXISTS research_history_query
+                ON research_history (query);
+            CREATE TABLE IF NOT EXISTS history_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """)
+        self.fts = self._ensure_fts(conn)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _ensure_fts(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS research_history_fts USING fts5(
+                    query, final_summary,
+                    content='research_history', content_rowid='id'
+                );
+                CREATE TRIGGER IF NOT EXISTS research_history_ai
+                AFTER INSERT ON research_history BEGIN
+                    INSERT INTO research_history_fts (rowid, query, final_summary)
+                    VALUES (new.id, new.query, new.final_summary);
+                END;
+                """)
+            return True
+        except sqlite3.OperationalError as e:
+            logger.info(f"SQLite FTS5 unavailable; history search uses LIKE: {e}")
+            return False
+
+    def append(self, data: Dict[str, Any]) -> None:
+        created_at = data.get("created_at") or datetime.now(timezone.utc).isoformat()
+        self._conn().execute(
+            "INSERT INTO research_history "
+            "(created_at, query, final_summary, sources_json) VALUES (?, ?, ?, ?)",
+            (
+                created_at,
+                data.get("query", ""),
+                data.get("final_summary", ""),
+                json.dumps(data.get("sources", [])),
+            ),
+        )
+
+    def backfilled(self) -> bool:
+        row = (
+            self._conn()
+            .execute("SELECT 1 FROM history_meta WHERE key = 'sheets_backfill'")
+            .fetchone()
+        )
+        return row is not None
+
+    def backfill(self, items: List[Dict[str, Any]]) -> int:
+        """Import rows (oldest first) once; returns the rows added.
+
+        Rows already here, matched on query and summary, are skipped: the
+        Sheets mirror holds copies of everything recorded locally.
+        """
+        conn = self._conn()
+        # IMMEDIATE: workers starting together import the rows only once
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.backfilled():
+                conn.execute("COMMIT")
+                return 0
+            added = 0
+            now = datetime.now(timezone.utc).isoformat()
+            for item in items:
+                cur = conn.execute(
+                    "INSERT INTO research_history "
+                    "(created_at, query, final_summary, sources_json) "
+                    "SELECT ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM "
+                    "research_history WHERE query = ? AND final_summary = ?)",
+                    (
+                        str(item.get("created_at") or now),
+                        item.get("query", ""),
+                        item.get("final_summary", ""),
+                        json.dumps(item.get("sources", [])),
+                        item.get("query", ""),
+                        item.get("final_summary", ""),
+                    ),
+                )
+                added += cur.rowcount
+            conn.execute(
+                "INSERT INTO history_meta (key, value) VALUES ('sheets_backfill', ?)",
+                (now,),
+            )
+            conn.execute("COMMIT")
+            return added
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def version(self) -> Optional[str]:
+        # Rows are only ever appended and AUTOINCREMENT ids never go back
+        row = self._conn().execute("SELECT max(id) FROM research_history").fetchone()
+        return str(row[0] or 0)
+
+    def page(
+        self, limit: int, before: Optional[str] = None, q: Optional[str] = None
+    ) -> Page:
+        where: List[str] = []
+        params: List[Any] = []
+        if before:
+            where.append("(h.created_at, h.id) < (?, ?)")
+            params.extend(decode_cursor(before))
+        # Quote each term so user input cannot inject FTS syntax
+        terms = " ".join(f'"{t}"' for t in (q or "").replace('"', " ").split())
+        if terms and self.fts:
+            where.append(
+                "h.id IN (SELECT rowid FROM research_history_fts "
+                "WHERE research_history_fts MATCH ?)"
+            )
+            params.append(terms)
+        elif q:
+            where.append("(h.query LIKE ? OR h.final_summary LIKE ?)")
+            params.extend([f"%{q}%", f"%{q}%"])
+        sql = (
+            "SELECT h.id, h.created_at, h.query, h.final_summary, h.sources_json "
+            "FROM research_history h"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY h.created_at DESC, h.id DESC LIMIT ?"
+        params.append(limit + 1)
+        rows = self._conn().execute(sql, params).fetchall()
+        items: List[Dict[str, Any]] = []
+        for row_id, created_at, query, summary, sources_json in rows[:limit]:
+            try:
+                sources = json.loads(sources_json)
+            except Exception:
+                sources = []
+            items.append(
+                {
+                    "query": query,
+                    "final_summary": summary,
+                    "sources": sources,
+                    "created_at": created_at,
+                }
+            )
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last[1], last[0])
+        return items, next_cursor
+
+
+class SheetsHistoryBackend:
+    """Legacy backend reading the whole worksheet (no paging or search)."""
+
+    def append(self, data: Dict[str, Any]) -> None:
+        sheets.append_research_result(data)
+
+    def page(
+        self, limit: int, before: Optional[str] = None, q: Optional[str] = None
+    ) -> Page:
+        return sheets.read_research_history(limit=limit), None
+
+    def version(self) -> Optional[str]:
+        return None
+
+
+_backend: Optional[HistoryBackend] = None
+
+
+def get_history_backend() -> HistoryBackend:
+    global _backend
+    if _backend is None:
+        if settings.history_backend == "sheets":
+            _backend = SheetsHistoryBackend()
+        else:
+            _backend = SQLiteHistoryStore(
+                os.path.join(settings.data_dir, "history.sqlite3")
+            )
+    return _backend
+
+
+def reset_history_backend() -> None:
+    global _backend
+    _backend = None
+
+
+def record_result(data: Dict[str, Any]) -> None:
+    """Persist a research result; mirrors to Google Sheets when enabled.
+
+    Runs as a background task after the response is sent.
+    """
+    backend = None
+    with span("persist"):
+        try:
+            # Inside the guard: an unwritable DATA_DIR must not stop the mirror
+            backend = get_history_backend()
+            backend.append(data)
+        except Exception as e:
+            logger.error(f"Failed to write research history: {e}")
+        if settings.history_mirror_sheets and not isinstance(
+            backend, SheetsHistoryBackend
+        ):
+            sheets.append_research_result(data)
+
+
+def backfill_from_sheets() -> int:
+    """Fill an unseeded local store from the Sheets mirror; returns rows added.
+
+    A fresh `DATA_DIR` (new container, no volume) would otherwise serve only
+    results recorded since it was created. Runs once per store.
+    """
+    backend = get_history_backend()
+    if (
+        not isinstance(backend, SQLiteHistoryStore)
+        or not settings.history_mirror_sheets
+        or backend.backfilled()
+    ):
+        return 0
+    items = sheets.read_all_research_history()
+    if items is None:
+        return 0  # Sheets not configured or unreachable; try on next start
+    added = backend.backfill(items)
+    if added:
+        logger.info(f"Backfilled {added} history rows from Google Sheets")
+    return added
+
+
+def read_history(
+    limit: int = 20, before: Optional[str] = None, q: Optional[str] = None
+) -> Page:
+    return get_history_backend().page(max(1, min(limit, 100)), before=before, q=q)
+
+
+def history_version() -> Optional[str]:
+    return get_history_backend().version()
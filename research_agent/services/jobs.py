@@ -0,0 +1,506 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Protocol, Set
+from urllib.parse import urlsplit
+
+from research_agent.app.deps import settings, logger
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+@dataclass
+class Job:
+    query: str
+    model_name: Optional[str] = None
+    temperature: Optional[float] = None
+    priority: int = 0
+    callback_url: Optional[str] = None
+    max_attempts: int = 3
+    deep: Optional[bool] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    available_at: float = 0.0
+    lease_until: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobStore(Protocol):
+    def submit(self, job: Job) -> None: ...
+
+    def claim(self, lease_s: float) -> Optional[Job]: ...
+
+    def renew(self, job_id: str, attempt: int, lease_s: float) -> bool: ...
+
+    def save(self, job: Job) -> None: ...
+
+    def get(self, job_id: str) -> Optional[Job]: ...
+
+    def prune(self, older_than: float) -> int: ...
+
+    def has_unfinished(self) -> bool: ...
+
+
+class MemoryJobStore:
+    """In-process store: a priority heap of ready jobs plus a dict of all jobs."""
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, Job] = {}
+        self._ready: List[tuple] = []
+        self._running: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def submit(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._push(job)
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._ready, (-job.priority, job.created_at, job.id))
+
+    def claim(self, lease_s: float) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            # Jobs whose lease expired (worker died or hung) become visible again
+            for job_id in [j for j in self._running if self._jobs[j].lease_until < now]:
+                self._running.discard(job_id)
+                self._jobs[job_id].status = QUEUED
+                self._push(self._jobs[job_id])
+            deferred = []
+            claimed = None
+            while self._ready:
+                entry = heapq.heappop(self._ready)
+                job = self._jobs.get(entry[2])
+                if job is None or job.status != QUEUED:
+                    continue
+                if job.available_at > now:
+                    deferred.append(entry)
+                    continue
+                claimed = job
+                break
+            for entry in deferred:
+                heapq.heappush(self._ready, entry)
+            if claimed is None:
+                return None
+            claimed.status = RUNNING
+            claimed.attempts += 1
+            claimed.lease_until = now + lease_s
+            claimed.updated_at = now
+            self._running.add(claimed.id)
+            return claimed
+
+    def renew(self, job_id: str, attempt: int, lease_s: float) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != RUNNING or job.attempts != attempt:
+                return False  # lease expired and the job was claimed again
+            job.lease_until = time.time() + lease_s
+            return True
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            job.updated_at = time.time()
+            self._jobs[job.id] = job
+            if job.status != RUNNING:
+                self._running.discard(job.id)
+            if job.status == QUEUED:
+                self._push(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def prune(self, older_than: float) -> int:
+        with self._lock:
+            stale = [
+                j.id
+                for j in self._jobs.values()
+                if j.status in (SUCCEEDED, FAILED) and j.updated_at < older_than
+            ]
+            for job_id in stale:
+                del self._jobs[job_id]
+            return len(stale)
+
+    def has_unfinished(self) -> bool:
+        with self._lock:
+            return any(j.status in (QUEUED, RUNNING) for j in self._jobs.values())
+
+
+class SQLiteJobStore:
+    """Durable store; jobs survive restarts and can be shared by local workers."""
+
+    _COLUMNS = [
+        "id",
+        "query",
+        "model_name",
+        "temperature",
+        "priority",
+        "callback_url",
+        "max_attempts",
+        "deep",
+        "status",
+        "attempts",
+        "result",
+        "error",
+        "created_at",
+        "updated_at",
+        "available_at",
+        "lease_until",
+    ]
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, query TEXT NOT NULL, model_name TEXT, "
+            "temperature REAL, priority INTEGER NOT NULL, callback_url TEXT, "
+            "max_attempts INTEGER NOT NULL, deep INTEGER, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+            "available_at REAL NOT NULL, lease_until REAL NOT NULL)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "deep" not in columns:
+            # Added after the first release; older databases lack it
+            conn.execute("ALTER TABLE jobs ADD COLUMN deep INTEGER")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_ready "
+            "ON jobs (status, priority DESC, created_at)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _row(self, job: Job) -> tuple:
+        data = job.to_dict()
+        data["result"] = json.dumps(job.result) if job.result is not None else None
+        return tuple(data[c] for c in self._COLUMNS)
+
+    def _job(self, row: tuple) -> Job:
+        data = dict(zip(self._COLUMNS, row))
+        data["result"] = json.loads(data["result"]) if data["result"] else None
+        data["deep"] = None if data["deep"] is None else bool(data["deep"])
+        return Job(**data)
+
+    def submit(self, job: Job) -> None:
+        self.save(job)
+
+    def save(self, job: Job) -> None:
+        job.updated_at = time.time()
+        placeholders = ", ".join("?" for _ in self._COLUMNS)
+        self._conn().execute(
+            f"INSERT OR REPLACE INTO jobs ({', '.join(self._COLUMNS)}) "
+            f"VALUES ({placeholders})",
+            self._row(job),
+        )
+
+    def claim(self, lease_s: float) -> Optional[Job]:
+        now = time.time()
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front so two workers never claim
+        # the same row
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs "
+                "WHERE (status = ? AND available_at <= ?) "
+                "OR (status = ? AND lease_until < ?) "
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            job = self._job(row)
+            job.status = RUNNING
+            job.attempts += 1
+            job.lease_until = now + lease_s
+            job.updated_at = now
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, lease_until = ?, "
+                "updated_at = ? WHERE id = ?",
+                (job.status, job.attempts, job.lease_until, now, job.id),
+            )
+            conn.execute("COMMIT")
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def renew(self, job_id: str, attempt: int, lease_s: float) -> bool:
+        # Each claim bumps `attempts`, so it identifies the lease holder
+        cur = self._conn().execute(
+            "UPDATE jobs SET lease_until = ? "
+            "WHERE id = ? AND status = ? AND attempts = ?",
+            (time.time() + lease_s, job_id, RUNNING, attempt),
+        )
+        return cur.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = (
+            self._conn()
+            .execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            )
+            .fetchone()
+        )
+        return self._job(row) if row else None
+
+    def prune(self, older_than: float) -> int:
+        cur = self._conn().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (SUCCEEDED, FAILED, older_than),
+        )
+        return cur.rowcount
+
+    def has_unfinished(self) -> bool:
+        row = (
+            self._conn()
+            .execute(
+                "SELECT 1 FROM jobs WHERE status IN (?, ?) LIMIT 1", (QUEUED, RUNNING)
+            )
+            .fetchone()
+        )
+        return row is not None
+
+
+def check_callback_url(url: str) -> None:
+    """Raise ValueError unless `url` may receive job callbacks.
+
+    Hosts in `JOBS_CALLBACK_ALLOWED_HOSTS` are always allowed. Others must
+    resolve only to public addresses, so a callback cannot reach the
+    loopback interface, the private network or cloud metadata endpoints.
+    Blocks on DNS; call it from a thread.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError("callback_url must be an http(s) URL")
+    allowed = {
+        h.strip().lower()
+        for h in settings.jobs_callback_allowed_hosts.split(",")
+        if h.strip()
+    }
+    if host in allowed:
+        return
+    try:
+        infos = socket.getaddrinfo(host, parts.port or 443, type=socket.SOCK_STREAM)
+    except OSError as e:
+        raise ValueError(f"callback_url host {host} does not resolve: {e}")
+    for info in infos:
+        addr = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if not addr.is_global or addr.is_multicast:
+            raise ValueError(f"callback_url host {host} is not a public address")
+
+
+class JobQueue:
+    """Runs queued research jobs on the event loop with bounded concurrency.
+
+    A single dispatcher claims jobs (leasing them for the visibility timeout)
+    and spawns one task per job, so one process can keep hundreds of
+    long-running LLM calls in flight without a thread per job.
+    """
+
+    def __init__(self, store: JobStore) -> None:
+        self.store = store
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def submit(self, job: Job) -> Job:
+        self.store.submit(job)
+        self.ensure_started()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def resume(self) -> bool:
+        """Start the dispatcher for jobs left by a previous run, if any.
+
+        Queued jobs and jobs whose lease will expire (cancelled at shutdown)
+        are otherwise only claimed once a new job is submitted.
+        """
+        if not self.store.has_unfinished():
+            return False
+        self.ensure_started()
+        return True
+
+    def ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        d = self._dispatcher
+        if d is None or d.done() or d.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        wakeup = self._wakeup or asyncio.Event()
+        slots = asyncio.Semaphore(settings.jobs_concurrency)
+        last_prune = 0.0
+        while True:
+            await slots.acquire()
+            try:
+                job = self.store.claim(settings.jobs_visibility_timeout_s)
+            except Exception as e:
+                logger.error(f"Job claim failed: {e}")
+                job = None
+            if job is None:
+                slots.release()
+                if time.time() - last_prune > 60:
+                    last_prune = time.time()
+                    self.store.prune(time.time() - settings.jobs_retention_s)
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), settings.jobs_poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.get_running_loop().create_task(self._run(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            task.add_done_callback(lambda _t: slots.release())
+
+    async def _run(self, job: Job) -> None:
+        from research_agent.core.research import run_research_async
+
+        # Keep the lease while the run lasts longer than the visibility timeout
+        attempt = job.attempts
+        renewal = asyncio.get_running_loop().create_task(
+            self._keep_lease(job.id, attempt)
+        )
+        try:
+            kwargs = {"deep": job.deep} if job.deep is not None else {}
+            result = await run_research_async(
+                job.query,
+                model_name=job.model_name,
+                temperature=job.temperature,
+                **kwargs,
+            )
+            error = (
+                result["final_summary"]
+                if result["final_summary"].startswith("Error")
+                else None
+            )
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+        finally:
+            renewal.cancel()
+
+        if not self.store.renew(job.id, attempt, settings.jobs_visibility_timeout_s):
+            # Another worker claimed the job after our lease lapsed; its run
+            # reports the outcome
+            logger.warning(f"Job {job.id} lost its lease; dropping attempt {attempt}")
+            return
+        if error is None:
+            job.status, job.result, job.error = SUCCEEDED, result, None
+        elif job.attempts < job.max_attempts:
+            # Retry with exponential backoff
+            job.status, job.error = QUEUED, error
+            job.available_at = time.time() + 2**job.attempts
+            logger.info(f"Job {job.id} attempt {job.attempts} failed; retrying")
+        else:
+            job.status, job.result, job.error = FAILED, result, error
+        self.store.save(job)
+        if job.status == QUEUED:
+            return
+        logger.info(f"Job {job.id} finished status={job.status}")
+        if (
+            job.status == SUCCEEDED
+            and settings.persist_results
+            and result.get("rag") != "answer"
+        ):
+            from research_agent.services import history
+
+            await asyncio.to_thread(history.record_result, result)
+        if job.callback_url:
+            await self._callback(job)
+
+    async def _keep_lease(self, job_id: str, attempt: int) -> None:
+        lease_s = settings.jobs_visibility_timeout_s
+        while True:
+            await asyncio.sleep(lease_s / 3)
+            try:
+                if not self.store.renew(job_id, attempt, lease_s):
+                    return
+            except Exception as e:
+                logger.error(f"Job {job_id} lease renewal failed: {e}")
+
+    async def _callback(self, job: Job) -> None:
+        from research_agent.core.clients import registry
+
+        try:
+            # Checked again at send time: DNS may have changed since submit
+            await asyncio.to_thread(check_callback_url, job.callback_url)
+            response = await registry.async_http_client().post(
+                job.callback_url, json=job.to_dict(), timeout=10.0
+            )
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Job {job.id} callback to {job.callback_url} failed: {e}")
+
+    async def stop(self, timeout: float = 0.0) -> None:
+        """Stop claiming jobs, give running ones `timeout` seconds, then cancel.
+
+        Cancelled jobs keep their lease, so they are retried once it expires.
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        running = list(self._running)
+        if running and timeout > 0:
+            _done, pending = await asyncio.wait(running, timeout=timeout)
+            if pending:
+                logger.info(f"Cancelling {len(pending)} jobs still running")
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        if settings.jobs_backend == "sqlite":
+            store: JobStore = SQLiteJobStore(
+                os.path.join(settings.data_dir, "jobs.sqlite3")
+            )
+        else:
+            store = MemoryJobStore()
+        _queue = JobQueue(store)
+    return _queue
+
+
+async def shutdown_job_queue(timeout: float = 0.0) -> None:
+    if _queue is not None:
+        await _queue.stop(timeout)
@@ -0,0 +1,487 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Protocol, Sequence, Tuple
+
+from research_agent.app.deps import settings, logger
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SUMMARY, SNIPPET = "summary", "snippet"
+
+
+@dataclass
+class Document:
+    """A piece of local knowledge: a past summary or a fetched search snippet."""
+
+    kind: str
+    content: str
+    query: str = ""
+    title: str = ""
+    url: str = ""
+    sources: List[Dict[str, str]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    # Requested model and temperature of a summary; answers only match these
+    model: str = ""
+    temperature: Optional[float] = None
+
+    @property
+    def id(self) -> str:
+        # Content-addressed so re-ingesting the same snippet is a no-op
+        raw = f"{self.kind}|{self.url}|{self.content}"
+        if self.kind == SUMMARY:
+            raw += f"|{self.model}|{self.temperature}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    def answers(self, model: str, temperature: float) -> bool:
+        """True for a summary written for this model and temperature."""
+        return (
+            self.kind == SUMMARY
+            and self.model == model
+            and self.temperature == temperature
+        )
+
+    def embed_text(self) -> str:
+        # Summaries are matched question-to-question, so reuse needs a
+        # near-identical query rather than a merely related topic
+        if self.kind == SUMMARY:
+            return self.query
+        return f"{self.title}\n{self.content}"
+
+
+Hit = Tuple[Document, float]
+
+
+class VectorIndex(Protocol):
+    def add(self, docs: Sequence[Document], vectors: np.ndarray) -> int: ...
+
+    def search(self, vector: np.ndarray, k: int) -> List[Hit]: ...
+
+    def count(self) -> int: ...
+
+
+class NumpyFlatIndex:
+    """Exact cosine search over an in-memory matrix (vectors are normalized).
+
+    Used when Postgres is not configured and in tests. Search is one
+    matrix-vector product; capacity doubles as documents are added, up to
+    `max_entries`. When the matrix is full, documents older than `max_age_s`
+    are dropped first, then the oldest ones, so search cost stays bounded.
+    """
+
+    def __init__(
+        self, max_entries: int = 20_000, max_age_s: Optional[float] = None
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.max_age_s = max_age_s
+        self.evicted = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._docs: List[Document] = []
+        self._ids: set = set()
+        self._lock = threading.Lock()
+
+    def _evict(self, room: int) -> int:
+        """Compact the matrix to leave `room` free rows; returns rows kept."""
+        import numpy as np
+
+        n = len(self._docs)
+        keep = range(n)
+        if self.max_age_s is not None:
+            cutoff = time.time() - self.max_age_s
+            keep = [i for i in keep if self._docs[i].created_at >= cutoff]
+        if len(keep) > self.max_entries - room:
+            by_age = sorted(keep, key=lambda i: self._docs[i].created_at)
+            keep = sorted(by_age[len(keep) - (self.max_entries - room) :])
+        if len(keep) == n:
+            return n
+        index = np.asarray(keep, dtype=np.intp)
+        self._vectors[: len(index)] = self._vectors[index]
+        self._docs = [self._docs[i] for i in keep]
+        self._ids = {doc.id for doc in self._docs}
+        self.evicted += n - len(keep)
+        return len(keep)
+
+    def add(self, docs: Sequence[Document], vectors: np.ndarray) -> int:
+        import numpy as np
+
+        with self._lock:
+            fresh = [
+                (doc, vec) for doc, vec in zip(docs, vectors) if doc.id not in self._ids
+            ]
+            # A batch larger than the whole index keeps its newest documents
+            fresh = fresh[-self.max_entries :]
+            if not fresh:
+                return 0
+            n, dim = len(self._docs), vectors.shape[1]
+            if self._vectors is None or self._vectors.shape[1] != dim:
+                self._vectors = np.zeros(
+                    (min(self.max_entries, max(64, len(fresh))), dim), np.float32
+                )
+                self._docs, self._ids, n = [], set(), 0
+            if n + len(fresh) > self._vectors.shape[0]:
+                # Full: drop expired (and, at the cap, oldest) rows before growing
+                n = self._evict(len(fresh))
+            if n + len(fresh) > self._vectors.shape[0]:
+                size = max(2 * self._vectors.shape[0], n + len(fresh))
+                grown = np.zeros((min(self.max_entries, size), dim), np.float32)
+                grown[:n] = self._vectors[:n]
+                self._vectors = grown
+            for i, (doc, vec) in enumerate(fresh):
+                self._vectors[n + i] = vec
+                self._docs.append(doc)
+                self._ids.add(doc.id)
+            return len(fresh)
+
+    def search(self, vector: np.ndarray, k: int) -> List[Hit]:
+        with self._lock:
+            n = len(self._docs)
+            if self._vectors is None or n == 0:
+                return []
+            if self._vectors.shape[1] != vector.shape[-1]:
+                return []
+            scores = self._vectors[:n] @ vector.reshape(-1)
+            k = min(k, n)
+            top = (-scores).argpartition(k - 1)[:k]
+            top = top[(-scores[top]).argsort()]
+            return [(self._docs[i], float(scores[i])) for i in top]
+
+    def count(self) -> int:
+        return len(self._docs)
+
+
+class PgVectorIndex:
+    """Documents in Postgres with the pgvector extension.
+
+    The table is created on first use with the embedder's dimension and an
+    approximate index: HNSW (`RAG_INDEX=hnsw`, better recall/latency, slower
+    builds) or IVFFlat (`ivfflat`, faster builds, needs data before it is
+    useful). Inserts from one ingestion batch share a single transaction.
+    """
+
+    def __init__(self, dsn: str, index: str = "hnsw") -> None:
+        import psycopg  # optional dependency, only needed for this backend
+
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self.index = index
+        self._local = threading.local()
+        self._dim: Optional[int] = None
+        self._schema_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.closed:
+            conn = self._psycopg.connect(self.dsn, autocommit=True)
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self, dim: int) -> None:
+        if self._dim == dim:
+            return
+        with self._schema_lock:
+            conn = self._conn()
+            conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rag_documents ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, query TEXT, title TEXT, "
+                "url TEXT, content TEXT NOT NULL, sources JSONB, "
+                "created_at DOUBLE PRECISION NOT NULL, "
+                f"embedding vector({int(dim)}) NOT NULL)"
+            )
+            # Added after the first release; older tables lack them
+            conn.execute(
+                "ALTER TABLE rag_documents ADD COLUMN IF NOT EXISTS model TEXT, "
+                "ADD COLUMN IF NOT EXISTS temperature DOUBLE PRECISION"
+            )
+            if self.index == "ivfflat":
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS rag_documents_embedding "
+                    "ON rag_documents USING ivfflat (embedding vector_cosine_ops) "
+                    f"WITH (lists = {int(settings.rag_ivfflat_lists)})"
+                )
+            else:
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS rag_documents_embedding "
+                    "ON rag_documents USING hnsw (embedding vector_cosine_ops) "
+                    "WITH (m = 16, ef_construction = 64)"
+                )
+            self._dim = dim
+
+    @staticmethod
+    def _literal(vector: np.ndarray) -> str:
+        return "[" + ",".join(f"{x:.6g}" for x in vector.reshape(-1)) + "]"
+
+    def add(self, docs: Sequence[Document], vectors: np.ndarray) -> int:
+        if not docs:
+            return 0
+        import json
+
+        self._ensure_schema(vectors.shape[1])
+        rows = [
+            (
+                doc.id,
+                doc.kind,
+                doc.query,
+                doc.title,
+                doc.url,
+                doc.content,
+                json.dumps(doc.sources),
+                doc.created_at,
+                doc.model,
+                doc.temperature,
+                self._literal(vec),
+            )
+            for doc, vec in zip(docs, vectors)
+        ]
+        conn = self._conn()
+        with conn.transaction(), conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO rag_documents (id, kind, query, title, url, content, "
+                "sources, created_at, model, temperature, embedding) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::vector) "
+                "ON CONFLICT (id) DO NOTHING",
+                rows,
+            )
+            # Rows inserted across the batch; conflicting ids are not counted
+            added = cur.rowcount
+        return max(0, added)
+
+    def search(self, vector: np.ndarray, k: int) -> List[Hit]:
+        self._ensure_schema(vector.shape[-1])
+        literal = self._literal(vector)
+        conn = self._conn()
+        with conn.transaction(), conn.cursor() as cur:
+            # SET LOCAL scopes the recall knob to this query's transaction
+            if self.index == "ivfflat":
+                cur.execute(
+                    f"SET LOCAL ivfflat.probes = {int(settings.rag_ivfflat_probes)}"
+                )
+            else:
+                cur.execute(
+                    f"SET LOCAL hnsw.ef_search = {int(settings.rag_hnsw_ef_search)}"
+                )
+            cur.execute(
+                "SELECT kind, content, query, title, url, sources, created_at, "
+                "model, temperature, "
+                "1 - (embedding <=> %s::vector) AS score FROM rag_documents "
+                "ORDER BY embedding <=> %s::vector LIMIT %s",
+                (literal, literal, k),
+            )
+            rows = cur.fetchall()
+        return [
+            (
+                Document(
+                    kind=kind,
+                    content=content,
+                    query=query or "",
+                    title=title or "",
+                    url=url or "",
+                    sources=sources or [],
+                    created_at=created_at,
+                    model=model or "",
+                    temperature=temperature,
+                ),
+                float(score),
+            )
+            for (
+                kind,
+                content,
+                query,
+                title,
+                url,
+                sources,
+                created_at,
+                model,
+                temperature,
+                score,
+            ) in rows
+        ]
+
+    def count(self) -> int:
+        row = self._conn().execute("SELECT count(*) FROM rag_documents").fetchone()
+        return int(row[0])
+
+
+class _IngestBuffer:
+    """Collects documents and embeds/inserts them in batches on one thread.
+
+    Flushes when `batch_size` documents are waiting or every `interval_s`,
+    so many results share one embedding call and one insert transaction.
+    """
+
+    def __init__(self, index: VectorIndex, batch_size: int, interval_s: float):
+        self.index = index
+        self.batch_size = batch_size
+        self.interval_s = interval_s
+        self._pending: List[Document] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.stats = {"batches": 0, "documents": 0, "errors": 0}
+
+    def submit(self, docs: Sequence[Document]) -> None:
+        with self._cond:
+            self._pending.extend(docs)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._loop, name="rag-ingest", daemon=True
+                )
+                self._thread.start()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or len(self._pending) >= self.batch_size,
+                    timeout=self.interval_s,
+                )
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def flush(self) -> None:
+        while True:
+            with self._cond:
+                batch = self._pending[: self.batch_size]
+                del self._pending[: len(batch)]
+            if not batch:
+                return
+            from research_agent.core.embeddings import get_embedder
+
+            try:
+                vectors = get_embedder().embed([d.embed_text() for d in batch])
+                added = self.index.add(batch, vectors)
+            except Exception as e:
+                # Knowledge is best-effort; never let ingestion hurt requests
+                self.stats["errors"] += 1
+                logger.error(f"RAG ingestion of {len(batch)} documents failed: {e}")
+                return
+            self.stats["batches"] += 1
+            self.stats["documents"] += added
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+class RagStore:
+    """Retrieval over past research results and the snippets behind them."""
+
+    def __init__(self, index: VectorIndex) -> None:
+        self.index = index
+        self._ingest = _IngestBuffer(
+            index, settings.rag_ingest_batch_size, settings.rag_ingest_interval_s
+        )
+
+    @staticmethod
+    def documents_for(
+        result: Dict[str, Any],
+        snippets: Sequence[Any] = (),
+        model: str = "",
+        temperature: Optional[float] = None,
+    ) -> List[Document]:
+        query = result.get("query", "")
+        docs = [
+            Document(
+                kind=SUMMARY,
+                content=result["final_summary"],
+                query=query,
+                sources=list(result.get("sources") or []),
+                model=model,
+                temperature=temperature,
+            )
+        ]
+        for item in snippets:
+            if item.snippet:
+                docs.append(
+                    Document(
+                        kind=SNIPPET,
+                        content=item.snippet,
+                        query=query,
+                        title=item.title,
+                        url=item.url,
+                    )
+                )
+        return docs
+
+    def ingest(
+        self,
+        result: Dict[str, Any],
+        snippets: Sequence[Any] = (),
+        model: str = "",
+        temperature: Optional[float] = None,
+    ) -> None:
+        """Queue a finished result and its search snippets for indexing.
+
+        `model` and `temperature` are the ones requested; the summary is
+        only served as an answer to requests for the same pair. Returns
+        immediately; a background thread embeds and inserts batches.
+        """
+        self._ingest.submit(self.documents_for(result, snippets, model, temperature))
+
+    def flush(self) -> None:
+        self._ingest.flush()
+
+    async def retrieve(self, query: str, k: Optional[int] = None) -> List[Hit]:
+        from research_agent.core.embeddings import get_embedder
+
+        vector = (await get_embedder().aembed([query]))[0]
+        k = k or settings.rag_top_k
+        if isinstance(self.index, NumpyFlatIndex):
+            return self.index.search(vector, k)
+        return await asyncio.to_thread(self.index.search, vector, k)
+
+    def close(self) -> None:
+        self._ingest.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self._ingest.stats, "indexed": self.index.count()}
+
+
+_store: Optional[RagStore] = None
+_store_lock = threading.Lock()
+
+
+def get_rag_store() -> Optional[RagStore]:
+    """Process-wide store, or None when `RAG_ENABLED` is false."""
+    global _store
+    if not settings.rag_enabled:
+        return None
+    with _store_lock:
+        if _store is None:
+            if settings.rag_backend == "pgvector":
+                if not settings.rag_database_url:
+                    raise ValueError("RAG_BACKEND=pgvector requires RAG_DATABASE_URL")
+                index: VectorIndex = PgVectorIndex(
+                    settings.rag_database_url, settings.rag_index
+                )
+            else:
+                index = NumpyFlatIndex(settings.rag_max_entries, settings.rag_max_age_s)
+            _store = RagStore(index)
+        return _store
+
+
+def current_rag_store() -> Optional[RagStore]:
+    """The store if one has been created, without creating it."""
+    return _store
+
+
+def close_rag_store() -> None:
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
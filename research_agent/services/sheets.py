@@ -1,14 +1,26 @@
 from __future__ import annotations
 
 import json
+import os
+import threading
+import time
 from datetime import datetime
-from typing import Any, Dict, List
-
-import gspread
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Optional
 
 from research_agent.app.deps import settings, logger
 
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, spools are not adopted
+    fcntl = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    # gspread pulls in google-auth and requests; import it on first use
+    import gspread
+
 _client: gspread.Client | None = None
+_worksheet: gspread.Worksheet | None = None
+_worksheet_lock = threading.Lock()
 
 
 def _get_client() -> gspread.Client | None:
@@ -21,6 +33,8 @@ def _get_client() -> gspread.Client | None:
         return None
 
     try:
+        import gspread
+
         sa_info = json.loads(settings.google_service_account_json)
         _client = gspread.service_account_from_dict(sa_info)
         return _client
@@ -30,12 +44,34 @@ def _get_client() -> gspread.Client | None:
 
 
 def _get_worksheet():
+    """Open the history worksheet once and reuse the handle.
+
+    Opening by key plus the worksheet lookup costs two API round-trips, so the
+    handle is cached until `_invalidate_worksheet` is called after an error.
+    """
+    global _worksheet
+    if _worksheet is not None:
+        return _worksheet
+    with _worksheet_lock:
+        if _worksheet is None:
+            _worksheet = _open_worksheet()
+        return _worksheet
+
+
+def _invalidate_worksheet() -> None:
+    global _worksheet
+    _worksheet = None
+
+
+def _open_worksheet():
     client = _get_client()
     if client is None:
         return None
     if not settings.gspread_sheet_id:
         logger.info("gspread_sheet_id not configured; Sheets disabled.")
         return None
+    import gspread
+
     try:
         sh = client.open_by_key(settings.gspread_sheet_id)
         try:
@@ -50,25 +86,329 @@ def _get_worksheet():
         return None
 
 
+def _is_quota_error(e: Exception) -> bool:
+    code = getattr(getattr(e, "response", None), "status_code", None)
+    return code == 429 or "quota" in str(e).lower()
+
+
+class WriteBehindBuffer:
+    """Buffers history rows and flushes them to Sheets with `append_rows`.
+
+    Rows are appended to a local JSONL spool file (fsynced) before they are
+    acknowledged and are removed from it only after a successful flush, so a
+    crash loses nothing; leftover rows are replayed on the next start. A
+    daemon thread flushes when `batch_size` rows are pending or every
+    `flush_interval_s`, backing off exponentially on quota errors.
+
+    Each process spools to its own file and holds a lock beside it while
+    alive; `adopt_orphans` takes over spools whose owner has exited.
+    """
+
+    def __init__(
+        self, spool_path: str, batch_size: int = 50, flush_interval_s: float = 5.0
+    ) -> None:
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self._pending: List[List[Any]] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._backoff_s = 0.0
+        self.stats: Dict[str, Any] = {
+            "flushes": 0,
+            "rows_flushed": 0,
+            "last_batch_size": 0,
+            "last_flush_latency_ms": None,
+            "flush_errors": 0,
+            "quota_errors": 0,
+            "backoff_s": 0.0,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(spool_path)), exist_ok=True)
+        self._owner_lock = _try_lock(spool_path + ".lock")
+        self._load_spool()
+
+    def _load_spool(self) -> None:
+        self._pending.extend(_read_spool(self.spool_path))
+        if self._pending:
+            logger.info(f"Replaying {len(self._pending)} spooled Sheets rows")
+
+    def adopt_orphans(self) -> int:
+        """Move rows from spools of exited processes into this buffer.
+
+        Siblings are the `<stem>*.jsonl` files next to our spool; one whose
+        lock can be taken has no live owner. The lock is held while the spool
+        is read and removed, so racing workers adopt each spool once. Returns
+        the rows adopted.
+        """
+        if fcntl is None:
+            return 0
+        directory = os.path.dirname(os.path.abspath(self.spool_path))
+        own = os.path.basename(self.spool_path)
+        stem = own.split(".", 1)[0]
+        adopted = 0
+        for name in sorted(os.listdir(directory)):
+            if name == own or not (name.startswith(stem) and name.endswith(".jsonl")):
+                continue
+            path = os.path.join(directory, name)
+            lock_path = path + ".lock"
+            lock = _try_lock(lock_path)
+            if lock is None:
+                continue  # owner still running
+            try:
+                if not _holds(lock, lock_path):
+                    # Another worker adopted the spool and removed this lock
+                    # file after we opened it
+                    continue
+                rows = _read_spool(path)
+                with self._cond:
+                    if rows:
+                        with open(self.spool_path, "a", encoding="utf-8") as f:
+                            f.writelines(json.dumps(row) + "\n" for row in rows)
+                            f.flush()
+                            os.fsync(f.fileno())
+                        self._pending.extend(rows)
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass  # already adopted
+                adopted += len(rows)
+                # Still locked: nobody else can be using this lock file
+                os.remove(lock_path)
+            finally:
+                lock.close()
+        if adopted:
+            logger.info(f"Adopted {adopted} Sheets rows spooled by exited workers")
+            self._ensure_thread()
+        return adopted
+
+    def add(self, row: List[Any]) -> None:
+        with self._cond:
+            os.makedirs(
+                os.path.dirname(os.path.abspath(self.spool_path)), exist_ok=True
+            )
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending.append(row)
+            self._ensure_thread()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._loop, name="sheets-write-behind", daemon=True
+            )
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or len(self._pending) >= self.batch_size,
+                    timeout=self.flush_interval_s,
+                )
+            if self._stopping:
+                return  # close() drains the rest
+            if not self.flush():
+                # Don't spin on a full buffer while Sheets is failing
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: self._stopping,
+                        timeout=max(self._backoff_s, self.flush_interval_s),
+                    )
+
+    def flush(self) -> bool:
+        """Send up to `batch_size` pending rows; returns False on failure."""
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> bool:
+        with self._cond:
+            batch = self._pending[: self.batch_size]
+        if not batch:
+            return True
+        ws = _get_worksheet()
+        if ws is None:
+            return False
+        start = time.perf_counter()
+        try:
+            ws.append_rows(batch, value_input_option="RAW")
+        except Exception as e:
+            self.stats["flush_errors"] += 1
+            if _is_quota_error(e):
+                self.stats["quota_errors"] += 1
+                self._backoff_s = min(max(self._backoff_s * 2, 1.0), 300.0)
+            else:
+                _invalidate_worksheet()
+            self.stats["backoff_s"] = self._backoff_s
+            logger.error(
+                f"Sheets flush of {len(batch)} rows failed "
+                f"(backoff {self._backoff_s}s): {e}"
+            )
+            return False
+        latency_ms = int((time.perf_counter() - start) * 1000)
+        self._backoff_s = 0.0
+        with self._cond:
+            del self._pending[: len(batch)]
+            self._rewrite_spool()
+        self.stats.update(
+            flushes=self.stats["flushes"] + 1,
+            rows_flushed=self.stats["rows_flushed"] + len(batch),
+            last_batch_size=len(batch),
+            last_flush_latency_ms=latency_ms,
+            backoff_s=0.0,
+        )
+        logger.info(f"Flushed {len(batch)} rows to Sheets in {latency_ms}ms")
+        return True
+
+    def _rewrite_spool(self) -> None:
+        tmp = self.spool_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for row in self._pending:
+                f.write(json.dumps(row) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.spool_path)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending)
+        return {**self.stats, "pending": pending}
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush what we can before shutdown; the rest stays spooled."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            if not self.flush():
+                break
+        if self._thread is not None:
+            self._thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        if self._owner_lock is not None:
+            os.remove(self.spool_path + ".lock")
+            self._owner_lock.close()
+            self._owner_lock = None
+
+
+def _read_spool(path: str) -> List[List[Any]]:
+    rows: List[List[Any]] = []
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return rows
+    with f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # torn write from a crash mid-line
+    return rows
+
+
+def _try_lock(path: str) -> Optional[IO[str]]:
+    """Open `path` and hold an exclusive lock on it, or None if it is taken."""
+    if fcntl is None:
+        return None
+    f = open(path, "a", encoding="utf-8")
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def _holds(lock: IO[str], path: str) -> bool:
+    """True if the locked file is still the one at `path` (not unlinked)."""
+    try:
+        return os.path.samestat(os.fstat(lock.fileno()), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+
+_buffer: WriteBehindBuffer | None = None
+_buffer_lock = threading.Lock()
+
+
+def get_write_buffer() -> WriteBehindBuffer:
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            # One spool per process, so worker processes never rewrite
+            # each other's rows
+            _buffer = WriteBehindBuffer(
+                os.path.join(settings.data_dir, f"sheets_spool.{os.getpid()}.jsonl"),
+                batch_size=settings.sheets_batch_size,
+                flush_interval_s=settings.sheets_flush_interval_s,
+            )
+            _buffer.adopt_orphans()
+        return _buffer
+
+
+def current_write_buffer() -> WriteBehindBuffer | None:
+    return _buffer
+
+
+def close_write_buffer() -> None:
+    global _buffer
+    with _buffer_lock:
+        buffer, _buffer = _buffer, None
+    if buffer is not None:
+        buffer.close()
+
+
+def _sheets_configured() -> bool:
+    return bool(settings.google_service_account_json and settings.gspread_sheet_id)
+
+
 def append_research_result(data: Dict[str, Any]) -> None:
+    created_at = datetime.utcnow().isoformat()
+    sources = data.get("sources", [])
+    row = [
+        created_at,
+        data.get("query", ""),
+        data.get("final_summary", ""),
+        json.dumps(sources),
+    ]
+    if settings.sheets_write_behind:
+        if not _sheets_configured():
+            return
+        try:
+            get_write_buffer().add(row)
+        except Exception as e:
+            logger.error(f"Failed to buffer Google Sheets row: {e}")
+        return
     ws = _get_worksheet()
     if ws is None:
         return
     try:
-        created_at = datetime.utcnow().isoformat()
-        sources = data.get("sources", [])
-        ws.append_row(
-            [
-                created_at,
-                data.get("query", ""),
-                data.get("final_summary", ""),
-                json.dumps(sources),
-            ]
-        )
+        ws.append_row(row)
     except Exception as e:
+        _invalidate_worksheet()
         logger.error(f"Failed to append to Google Sheets: {e}")
 
 
+def _record(r: Dict[str, Any]) -> Dict[str, Any]:
+    sources_json = r.get("sources_json") or "[]"
+    try:
+        sources = json.loads(sources_json)
+    except Exception:
+        sources = []
+    return {
+        "query": r.get("query", ""),
+        "final_summary": r.get("final_summary", ""),
+        "sources": sources,
+        "created_at": r.get("created_at"),
+    }
+
+
 def read_research_history(limit: int = 20) -> List[Dict[str, Any]]:
     ws = _get_worksheet()
     if ws is None:
@@ -77,22 +417,19 @@ def read_research_history(limit: int = 20) -> List[Dict[str, Any]]:
         rows = ws.get_all_records()  # list of dicts keyed by header
         # most recent at bottom; return last N
         recent = rows[-max(1, min(limit, 100)) :]
-        items: List[Dict[str, Any]] = []
-        for r in reversed(recent):
-            sources_json = r.get("sources_json") or "[]"
-            try:
-                sources = json.loads(sources_json)
-            except Exception:
-                sources = []
-            items.append(
-                {
-                    "query": r.get("query", ""),
-                    "final_summary": r.get("final_summary", ""),
-                    "sources": sources,
-                    "created_at": r.get("created_at"),
-                }
-            )
-        return items
+        return [_record(r) for r in reversed(recent)]
     except Exception as e:
         logger.error(f"Failed to read from Google Sheets: {e}")
         return []
+
+
+def read_all_research_history() -> Optional[List[Dict[str, Any]]]:
+    """Every row, oldest first; None when the worksheet cannot be read."""
+    ws = _get_worksheet()
+    if ws is None:
+        return None
+    try:
+        return [_record(r) for r in ws.get_all_records()]
+    except Exception as e:
+        logger.error(f"Failed to read from Google Sheets: {e}")
+        return None
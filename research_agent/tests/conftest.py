@@ -0,0 +1,25 @@
+import pytest
+
+from research_agent.app.deps import settings
+from research_agent.core import cache, fetch, limits
+from research_agent.core.health import health
+from research_agent.services import history, rag
+
+
+@pytest.fixture(autouse=True)
+def _reset_shared_state(tmp_path, monkeypatch):
+    # Module-level caches and stores must not leak state between tests
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    cache.reset_caches()
+    history.reset_history_backend()
+    rag.close_rag_store()
+    limits.reset_rate_limiters()
+    health.reset()
+    fetch.reset_page_cache()
+    yield
+    cache.reset_caches()
+    history.reset_history_backend()
+    rag.close_rag_store()
+    limits.reset_rate_limiters()
+    health.reset()
+    fetch.reset_page_cache()
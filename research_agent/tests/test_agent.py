@@ -3,8 +3,8 @@ from research_agent.core.research import run_research
 from research_agent.app.deps import ALLOWED_FREE_MODELS
 
 
-@patch("research_agent.core.components.Summarizer.summarize")
-@patch("research_agent.core.components.SearchTool.search")
+@patch("research_agent.core.components.Summarizer.asummarize")
+@patch("research_agent.core.components.SearchTool.asearch")
 def test_run_research_success(mock_search, mock_summarize):
     # Mock search results
     mock_search.return_value = (
@@ -32,7 +32,7 @@ def test_run_research_success(mock_search, mock_summarize):
     assert result["sources"][0]["title"] == "Example"
 
 
-@patch("research_agent.core.components.SearchTool.search")
+@patch("research_agent.core.components.SearchTool.asearch")
 def test_run_research_search_failure(mock_search):
     mock_search.side_effect = Exception("Search down")
     result = run_research("test query")
@@ -49,7 +49,7 @@ def test_response_parser():
     assert len(parsed["sources"]) == 2
 
 
-@patch("research_agent.core.components.SearchTool.search")
+@patch("research_agent.core.components.SearchTool.asearch")
 def test_run_research_with_fallback(mock_search):
     # Minimal search result to build a prompt
     mock_search.return_value = (
@@ -72,7 +72,7 @@ def test_run_research_with_fallback(mock_search):
 
     calls = {"seen": []}
 
-    def summarize_side_effect(self, prompt_text: str):
+    async def summarize_side_effect(self, prompt_text: str):
         # Fail for the initial provider id to trigger fallback, succeed otherwise
         calls["seen"].append(getattr(self, "_model_name", "unknown"))
         if getattr(self, "_model_name", None) == initial_provider:
@@ -80,9 +80,86 @@ def test_run_research_with_fallback(mock_search):
         return "# Summary\nWorked\n\n# Sources\n- [X](http://x.com)"
 
     with patch(
-        "research_agent.core.components.Summarizer.summarize", new=summarize_side_effect
+        "research_agent.core.components.Summarizer.asummarize",
+        new=summarize_side_effect,
     ):
         result = run_research("test", model_name=initial_provider, temperature=0.5)
         assert result["final_summary"].startswith("Worked")
         # Ensure we attempted at least two models (initial + a fallback)
         assert len(calls["seen"]) >= 2
+
+
+def test_streaming_parser_emits_sources_incrementally():
+    from research_agent.core.components import ResponseParser, StreamingResponseParser
+
+    content = "# Summary\nHello\n\n# Sources\n- [A](http://a.com)\n* http://b.com"
+    parser = StreamingResponseParser()
+    emitted = []
+    for i in range(0, len(content), 7):
+        emitted.extend(parser.feed(content[i : i + 7]))
+    # The first source is available before the stream ends
+    assert emitted == [{"title": "A", "url": "http://a.com"}]
+    emitted.extend(parser.flush())
+    assert emitted == ResponseParser.parse_content(content)["sources"]
+    assert parser.finish() == ResponseParser.parse_content(content)
+
+
+@patch("research_agent.core.components.SearchTool.asearch")
+def test_stream_research_falls_back_before_first_token(mock_search):
+    import asyncio
+    from research_agent.core.research import stream_research
+
+    mock_search.return_value = ([], {})
+
+    async def astream(self, prompt_text: str):
+        if self._model_name == ALLOWED_FREE_MODELS["grok"]:
+            raise RuntimeError("Simulated provider 404")
+        for piece in ["# Summary\nOk\n", "# Sources\n", "- [X](http://x.com)\n"]:
+            yield piece
+
+    async def collect():
+        return [
+            e
+            async for e in stream_research("q", model_name=ALLOWED_FREE_MODELS["grok"])
+        ]
+
+    with patch("research_agent.core.components.Summarizer.astream", new=astream):
+        events = asyncio.run(collect())
+    names = [name for name, _ in events]
+    assert names[0] == "sources"
+    assert names[-1] == "final"
+    assert "source" in names
+    assert events[-1][1]["final_summary"] == "Ok"
+
+
+def test_research_batch_dedups_and_bounds_concurrency():
+    import asyncio
+    from research_agent.core import research
+    from research_agent.core.limits import provider_slot
+
+    state = {"calls": 0, "active": 0, "peak": 0}
+
+    async def fake_run(query, *, model_name=None, temperature=None):
+        state["calls"] += 1
+        async with provider_slot("openrouter"):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.01)
+            state["active"] -= 1
+        return {"query": query, "final_summary": query, "sources": []}
+
+    items = [(f"q{i % 10}", "m", 0.2) for i in range(30)]
+
+    async def collect():
+        return [
+            r
+            async for r in research.iter_research_batch(
+                items, concurrency=8, provider_limits={"openrouter": 3}
+            )
+        ]
+
+    with patch.object(research, "run_research_async", new=fake_run):
+        results = asyncio.run(collect())
+    assert state["calls"] == 10
+    assert state["peak"] == 3
+    assert sorted(i for indices, _ in results for i in indices) == list(range(30))
@@ -15,7 +15,7 @@ def test_health_check():
 
 
 def test_research_endpoint_success(monkeypatch):
-    def mock_run_research(query: str, *, model_name=None, temperature=None):
+    async def mock_run_research(query: str, *, model_name=None, temperature=None):
         return {
             "query": query,
             "final_summary": "Mocked summary",
@@ -31,7 +31,7 @@ def test_research_endpoint_success(monkeypatch):
     def fake_append(data):
         calls["count"] += 1
 
-    monkeypatch.setattr(routes, "run_research", mock_run_research)
+    monkeypatch.setattr(routes, "run_research_async", mock_run_research)
     monkeypatch.setattr(sheets, "append_research_result", fake_append)
     # enable persistence for this test only
     monkeypatch.setattr(settings, "persist_results", True, raising=False)
@@ -43,15 +43,16 @@ def test_research_endpoint_success(monkeypatch):
     assert "Mocked summary" in data["final_summary"]
     assert len(data["sources"]) == 1
     assert calls["count"] == 1
+    assert response.headers["x-cache"] == "bypass"
 
 
 def test_research_endpoint_failure(monkeypatch):
-    def mock_run_research(query: str, *, model_name=None, temperature=None):
+    async def mock_run_research(query: str, *, model_name=None, temperature=None):
         raise Exception("LLM error")
 
     from research_agent.app import routes
 
-    monkeypatch.setattr(routes, "run_research", mock_run_research)
+    monkeypatch.setattr(routes, "run_research_async", mock_run_research)
 
     response = client.post("/agents/research", json={"query": "AI in finance"})
     assert response.status_code == 500
@@ -62,7 +63,7 @@ def test_research_endpoint_model_restrictions(monkeypatch):
     # Capture what model was resolved to
     captured = {"model": None, "temp": None}
 
-    def mock_run_research(query: str, *, model_name=None, temperature=None):
+    async def mock_run_research(query: str, *, model_name=None, temperature=None):
         captured["model"] = model_name
         captured["temp"] = temperature
         return {
@@ -73,7 +74,7 @@ def test_research_endpoint_model_restrictions(monkeypatch):
 
     from research_agent.app import routes
 
-    monkeypatch.setattr(routes, "run_research", mock_run_research)
+    monkeypatch.setattr(routes, "run_research_async", mock_run_research)
 
     # Allowed models should pass and resolve to provider IDs
     for name in ["grok", "llama", "deepseek", "google"]:
@@ -90,3 +91,228 @@ def test_research_endpoint_model_restrictions(monkeypatch):
         "/agents/research", json={"query": "q", "model_name": "gpt-4o"}
     )
     assert response.status_code == 422
+
+
+def test_research_stream_endpoint(monkeypatch):
+    async def mock_stream_research(query: str, *, model_name=None, temperature=None):
+        yield "sources", {"sources": [{"title": "A", "url": "http://a.com"}]}
+        yield "token", {"text": "# Summary\nHi"}
+        yield "final", {"query": query, "final_summary": "Hi", "sources": []}
+
+    from research_agent.app import routes
+
+    monkeypatch.setattr(routes, "stream_research", mock_stream_research)
+
+    response = client.post("/agents/research/stream", json={"query": "q"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        line.split(": ", 1)[1]
+        for line in response.text.splitlines()
+        if line.startswith("event: ")
+    ]
+    assert events == ["sources", "token", "final"]
+
+
+def test_model_health_endpoint():
+    from research_agent.core.health import health
+
+    health.record_success("x-ai/grok-4-fast", 1.2)
+    response = client.get("/health/models")
+    assert response.status_code == 200
+    models = response.json()["models"]
+    assert models[0]["model"] == "x-ai/grok-4-fast"
+    assert models[0]["state"] == "closed"
+
+
+def test_research_batch_endpoint(monkeypatch):
+    import json
+    from research_agent.core import research
+    from research_agent.app.deps import settings
+
+    seen = []
+
+    async def mock_run_research(query: str, *, model_name=None, temperature=None):
+        seen.append(query)
+        return {"query": query, "final_summary": f"About {query}", "sources": []}
+
+    monkeypatch.setattr(research, "run_research_async", mock_run_research)
+    monkeypatch.setattr(settings, "persist_results", False)
+
+    body = {"items": [{"query": "a"}, {"query": "b"}, {"query": "A "}]}
+    response = client.post("/agents/research/batch", json=body)
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [i["final_summary"] for i in items] == ["About a", "About b", "About a"]
+    assert sorted(seen) == ["a", "b"]
+
+    response = client.post("/agents/research/batch?stream=true", json=body)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+
+    too_many = {"items": [{"query": "q"}] * (settings.batch_max_items + 1)}
+    assert client.post("/agents/research/batch", json=too_many).status_code == 400
+
+
+def test_research_jobs_endpoints(monkeypatch):
+    import time
+    from research_agent.core import research
+    from research_agent.app.deps import settings
+
+    async def mock_run_research(query: str, *, model_name=None, temperature=None):
+        return {"query": query, "final_summary": "Done", "sources": []}
+
+    monkeypatch.setattr(research, "run_research_async", mock_run_research)
+    monkeypatch.setattr(settings, "persist_results", False)
+
+    with TestClient(app) as c:
+        response = c.post("/agents/research/jobs", json={"query": "long one"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        for _ in range(100):
+            status = c.get(f"/agents/research/jobs/{job_id}").json()
+            if status["status"] == "succeeded":
+                break
+            time.sleep(0.01)
+        assert status["status"] == "succeeded"
+        assert status["result"]["final_summary"] == "Done"
+        assert c.get("/agents/research/jobs/missing").status_code == 404
+
+
+def test_research_history_pagination(monkeypatch):
+    from research_agent.services import history, sheets
+    from research_agent.app.deps import settings
+
+    monkeypatch.setattr(settings, "history_mirror_sheets", True)
+    mirrored = []
+    monkeypatch.setattr(sheets, "append_research_result", mirrored.append)
+    for i in range(3):
+        history.record_result(
+            {"query": f"q{i}", "final_summary": f"summary {i}", "sources": []}
+        )
+    assert len(mirrored) == 3
+
+    page = client.get("/agents/research/history", params={"limit": 2}).json()
+    assert [i["query"] for i in page["items"]] == ["q2", "q1"]
+    rest = client.get(
+        "/agents/research/history", params={"before": page["next_cursor"]}
+    ).json()
+    assert [i["query"] for i in rest["items"]] == ["q0"]
+    assert rest["next_cursor"] is None
+
+    found = client.get("/agents/research/history", params={"q": "summary 1"}).json()
+    assert [i["query"] for i in found["items"]] == ["q1"]
+    bad = client.get("/agents/research/history", params={"before": "!!"})
+    assert bad.status_code == 400
+
+    # Backend errors are server errors, even when they are ValueErrors
+    def broken(**kwargs):
+        raise ValueError("fts5: syntax error")
+
+    monkeypatch.setattr(history, "read_history", broken)
+    failed = client.get(
+        "/agents/research/history", params={"before": page["next_cursor"]}
+    )
+    assert failed.status_code == 500
+
+
+def test_research_history_etag_returns_304_until_a_new_result(monkeypatch):
+    from research_agent.services import history
+    from research_agent.app.deps import settings
+
+    monkeypatch.setattr(settings, "history_mirror_sheets", False)
+    history.record_result({"query": "q0", "final_summary": "s", "sources": []})
+
+    first = client.get("/agents/research/history")
+    etag = first.headers["etag"]
+    again = client.get("/agents/research/history", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    # Other pages or searches have their own tag
+    other = client.get(
+        "/agents/research/history",
+        params={"q": "q0"},
+        headers={"If-None-Match": etag},
+    )
+    assert other.status_code == 200
+
+    history.record_result({"query": "q1", "final_summary": "s", "sources": []})
+    changed = client.get("/agents/research/history", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_research_history_etag_on_sheets_backend(monkeypatch):
+    from research_agent.services import history, sheets
+    from research_agent.app.deps import settings
+
+    monkeypatch.setattr(settings, "history_backend", "sheets")
+    row = {"final_summary": "s", "sources": [], "created_at": "2025-01-01T00:00:00"}
+    rows = [{**row, "query": "q0"}]
+    monkeypatch.setattr(sheets, "read_research_history", lambda limit: list(rows))
+    history.reset_history_backend()
+
+    first = client.get("/agents/research/history")
+    etag = first.headers["etag"]
+    again = client.get("/agents/research/history", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+
+    rows.insert(0, {**row, "query": "q1"})
+    changed = client.get("/agents/research/history", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["items"][0]["query"] == "q1"
+
+
+def test_large_responses_are_compressed(monkeypatch):
+    from research_agent.app.compression import negotiate
+
+    async def fake_run_research_async(query, **_kw):
+        return {"query": query, "final_summary": "Long summary. " * 500, "sources": []}
+
+    monkeypatch.setattr(
+        "research_agent.app.routes.run_research_async", fake_run_research_async
+    )
+    response = client.post(
+        "/agents/research",
+        json={"query": "q"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < 1000
+    assert response.json()["final_summary"].startswith("Long summary.")
+
+    small = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    assert negotiate("gzip, br") == "br"
+    assert negotiate("gzip, br", brotli_available=False) == "gzip"
+    assert negotiate("br;q=0.5, gzip;q=0.8") == "gzip"
+    assert negotiate("identity") is None
+    assert negotiate("*") == "br"
+
+
+def test_research_request_timeout_header(monkeypatch):
+    import asyncio
+
+    from research_agent.app import routes
+    from research_agent.services import history
+
+    persisted = []
+
+    async def slow_run_research(query: str, **_kw):
+        await asyncio.sleep(5)
+        return {"query": query, "final_summary": "late", "sources": []}
+
+    monkeypatch.setattr(routes, "run_research_async", slow_run_research)
+    monkeypatch.setattr(history, "record_result", persisted.append)
+    response = client.post(
+        "/agents/research", json={"query": "q"}, headers={"x-request-timeout": "200ms"}
+    )
+    assert response.status_code == 504
+    assert "deadline" in response.json()["detail"]
+    assert persisted == []
+
+    response = client.post(
+        "/agents/research", json={"query": "q"}, headers={"x-request-timeout": "soon"}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from research_agent.app.deps import settings
+from research_agent.core.cache import (
+    MemoryCache,
+    ResearchCache,
+    SearchCache,
+    SQLiteCache,
+)
+from research_agent.core.research import run_research
+
+RESULT = {"final_summary": "Cached", "sources": [{"title": "A", "url": "http://a"}]}
+
+
+def test_memory_cache_ttl_and_lru_eviction():
+    c = MemoryCache(max_bytes=10)
+    c.set("a", b"12345", ttl=60)
+    c.set("b", b"12345", ttl=60)
+    assert c.get("a") == b"12345"  # touch a so b is least recently used
+    c.set("c", b"12345", ttl=60)
+    assert c.get("b") is None
+    assert c.get("a") is not None and c.get("c") is not None
+    c.set("d", b"1", ttl=0.01)
+    time.sleep(0.02)
+    assert c.get("d") is None
+
+
+def test_sqlite_cache_roundtrip_and_eviction(tmp_path):
+    c = SQLiteCache(str(tmp_path / "c.sqlite3"), max_bytes=10)
+    c.set("a", b"12345", ttl=60)
+    c.set("b", b"12345", ttl=60)
+    c.set("c", b"12345", ttl=60)
+    assert c.get("a") is None
+    assert c.get("c") == b"12345"
+    assert c.evictions == 1
+
+
+def test_sqlite_cache_keeps_a_running_size_total(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    c = SQLiteCache(path, max_bytes=100)
+    c.set("a", b"x" * 30, ttl=60)
+    c.set("b", b"x" * 30, ttl=60)
+    c.set("a", b"x" * 10, ttl=60)  # replaced: only the new size counts
+    c.delete("b")
+    c.set("c", b"x" * 20, ttl=60)
+    conn = c._conn()
+    assert c._stats(conn) == (30, 2)
+    # A second handle (another worker) sees the same total
+    assert SQLiteCache(path, max_bytes=100)._stats(conn) == (30, 2)
+    c.set("big", b"x" * 90, ttl=60)  # evicts a and c in one pass
+    assert c.get("big") is not None and c.get("a") is None and c.get("c") is None
+    assert c._stats(conn) == (90, 1) and c.evictions == 2
+
+
+def test_sqlite_cache_batches_access_times(tmp_path):
+    c = SQLiteCache(str(tmp_path / "c.sqlite3"), max_bytes=10, touch_batch=100)
+    c.touch_interval_s = 60
+    c.set("a", b"12345", ttl=60)
+    c.set("b", b"12345", ttl=60)
+    assert c.get("a") == b"12345"
+    # Not written yet, but flushed before eviction picks the oldest
+    row = c._conn().execute("SELECT accessed_at FROM cache WHERE key = 'a'")
+    assert row.fetchone()[0] < c._touched["a"]
+    c.set("c", b"12345", ttl=60)
+    assert c.get("b") is None and c.get("a") == b"12345"
+
+
+def test_exact_and_semantic_tiers():
+    cache = ResearchCache(MemoryCache(1 << 20), ttl=60, semantic=True, threshold=0.8)
+
+    async def run():
+        await cache.store("State of RAG in 2025?", "m", 0.2, RESULT)
+        exact = await cache.lookup("  state of rag in 2025 ", "m", 0.2)
+        near = await cache.lookup("state of the RAG in 2025", "m", 0.2)
+        other_model = await cache.lookup("state of rag in 2025", "other", 0.2)
+        return exact, near, other_model
+
+    exact, near, other_model = asyncio.run(run())
+    assert exact == (RESULT, "hit")
+    assert near == (RESULT, "semantic-hit")
+    assert other_model == (None, "miss")
+    assert cache.stats == {"hits": 1, "semantic_hits": 1, "misses": 1}
+
+
+@patch("research_agent.core.components.Summarizer.asummarize")
+@patch("research_agent.core.components.SearchTool.asearch")
+def test_run_research_uses_cache(mock_search, mock_summarize, monkeypatch):
+    monkeypatch.setattr(settings, "cache_enabled", True)
+    mock_search.return_value = ([], {})
+    mock_summarize.return_value = "# Summary\nFresh\n\n# Sources\n- [A](http://a)"
+
+    first = run_research("cached query")
+    second = run_research("Cached  Query")
+    assert first["cache"] == "miss"
+    assert second["cache"] == "hit"
+    assert second["final_summary"] == first["final_summary"]
+    assert mock_summarize.call_count == 1
+
+
+def test_search_cache_serves_stale_while_revalidating():
+    cache = SearchCache(MemoryCache(1 << 20), ttl=0.05, stale_ttl=60)
+    calls = {"n": 0}
+
+    async def fetch():
+        calls["n"] += 1
+        return {"results": [{"title": f"v{calls['n']}", "url": "http://a"}]}
+
+    async def run():
+        first = await cache.get_or_fetch("Q", 5, {}, fetch)
+        second = await cache.get_or_fetch("q ", 5, {}, fetch)
+        await asyncio.sleep(0.06)
+        stale = await cache.get_or_fetch("q", 5, {}, fetch)
+        await asyncio.sleep(0.01)  # let the background refresh finish
+        fresh = await cache.get_or_fetch("q", 5, {}, fetch)
+        return first, second, stale, fresh
+
+    first, second, stale, fresh = asyncio.run(run())
+    assert [first[1], second[1], stale[1], fresh[1]] == ["miss", "hit", "stale", "hit"]
+    assert stale[0]["results"][0]["title"] == "v1"
+    assert fresh[0]["results"][0]["title"] == "v2"
+    assert calls["n"] == 2
+
+
+def test_search_cache_refresh_outlives_the_request_deadline():
+    from research_agent.core import deadlines
+
+    cache = SearchCache(MemoryCache(1 << 20), ttl=0.01, stale_ttl=60)
+    version = {"n": 0}
+
+    async def fetch():
+        # Like the search tool: bounded by the deadline in the context
+        await deadlines.bounded(asyncio.sleep(0.1))
+        version["n"] += 1
+        return {"results": [{"title": f"v{version['n']}", "url": "http://a"}]}
+
+    async def run():
+        await cache.get_or_fetch("q", 5, {}, fetch)
+        await asyncio.sleep(0.02)
+        with deadlines.request_deadline(0.05):
+            stale = await cache.get_or_fetch("q", 5, {}, fetch)
+        await asyncio.sleep(0.2)  # the request's deadline has long passed
+        fresh = await cache.get_or_fetch("q", 5, {}, fetch)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(run())
+    assert stale[1] == "stale"
+    assert fresh[0]["results"][0]["title"] == "v2"
+
+
+def test_search_cache_skips_error_payloads():
+    cache = SearchCache(MemoryCache(1 << 20), ttl=60, stale_ttl=60)
+
+    async def fetch():
+        return {"error": "boom"}
+
+    async def run():
+        await cache.get_or_fetch("q", 5, {}, fetch)
+        return await cache.get_or_fetch("q", 5, {}, fetch)
+
+    assert asyncio.run(run())[1] == "miss"
@@ -0,0 +1,39 @@
+import asyncio
+
+from research_agent.app.deps import settings
+from research_agent.core.clients import ClientRegistry
+
+
+def _llm(reg: ClientRegistry, model: str = "x-ai/grok-4-fast", temp: float = 0.2):
+    return reg.get_llm(
+        provider="openrouter",
+        model=model,
+        temperature=temp,
+        base_url="http://localhost:1/api/v1",
+        api_key="test-key",
+    )
+
+
+def test_llm_clients_are_reused_per_key():
+    reg = ClientRegistry()
+
+    async def run():
+        a = _llm(reg)
+        b = _llm(reg)
+        c = _llm(reg, model="deepseek/deepseek-chat:free")
+        assert a is b
+        assert a is not c
+        # The fallback policy retries, not the SDK
+        assert a.max_retries == 0
+        # Fallback models share the same async connection pool
+        assert a.http_async_client is c.http_async_client
+        await reg.aclose()
+
+    asyncio.run(run())
+    assert reg.stats["llm_created"] == 2
+
+
+def test_pooling_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "pool_clients", False)
+    reg = ClientRegistry()
+    assert _llm(reg) is not _llm(reg)
@@ -0,0 +1,72 @@
+from research_agent.app.deps import context_budget, settings
+from research_agent.core.components import SearchResult
+from research_agent.core.context import build_context, count_tokens
+
+FILLER = "Subscribe to our newsletter for weekly updates on many topics. "
+
+
+def _results():
+    return [
+        SearchResult(
+            title="HNSW explained",
+            url="https://a.example/hnsw",
+            snippet=FILLER * 20 + "HNSW graphs give vector databases fast recall.",
+        ),
+        SearchResult(
+            title="Mirror",
+            url="https://b.example/mirror",
+            snippet=FILLER * 20 + "HNSW graphs give vector databases fast recall.",
+        ),
+        SearchResult(
+            title="IVF indexes",
+            url="https://c.example/ivf",
+            snippet="IVF partitions vectors into lists. " * 3
+            + "Vector databases use IVF for large collections. "
+            + FILLER * 10,
+        ),
+    ]
+
+
+def test_context_fits_budget_and_keeps_every_source():
+    results = _results()
+    verbatim = build_context("vector databases", results, 0)
+    budgeted = build_context("vector databases", results, 120)
+    assert count_tokens(budgeted) <= 120 < count_tokens(verbatim)
+    for r in results:
+        assert f"[{r.title}]({r.url})" in budgeted
+
+
+def test_relevant_sentences_win_and_duplicates_collapse():
+    budgeted = build_context("vector databases", _results(), 120)
+    assert "HNSW graphs give vector databases fast recall." in budgeted
+    assert "Vector databases use IVF for large collections." in budgeted
+    # The mirrored snippet contributes only its citation line
+    assert budgeted.count("fast recall") == 1
+    assert budgeted.count("Subscribe to our newsletter") <= 1
+
+
+def test_context_budget_per_model(monkeypatch):
+    assert context_budget("google/gemma-2-9b-it:free") == 1500
+    assert context_budget("grok") == 3000
+    monkeypatch.setattr(settings, "context_reserved_tokens", 7_000)
+    assert context_budget("google") == 1192  # capped by the 8k window
+    assert context_budget("unknown/model") == settings.context_token_budget
+    monkeypatch.setattr(settings, "context_budget_enabled", False)
+    assert context_budget("grok") == 0
+
+
+def test_prompt_keeps_instructions_in_a_stable_system_message():
+    from research_agent.core.components import Summarizer
+
+    first = Summarizer.build_prompt("vector databases", _results(), structured=False)
+    second = Summarizer.build_prompt("graph databases", _results()[:1])
+    assert first.system == second.system
+    assert "# Sources" in first.system and "vector databases" not in first.system
+    assert '"vector databases"' in first.user and "https://a.example/hnsw" in first.user
+    structured = Summarizer.build_prompt("q", _results(), structured=True)
+    assert "summary_md" in structured.system
+
+    system, user = first.to_messages()
+    assert (system.type, user.type) == ("system", "human")
+    # One shared message object for the fixed instructions
+    assert second.to_messages()[0] is system
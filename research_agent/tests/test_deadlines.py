@@ -0,0 +1,172 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.stubs import Behaviour, StubConfig, StubServer
+from research_agent.app.deps import settings
+from research_agent.core import deadlines
+from research_agent.core.clients import registry
+from research_agent.core.health import health
+from research_agent.core.research import run_research_async
+
+
+def _sample(name, labels):
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_parse_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "request_timeout_s", 0.0)
+    monkeypatch.setattr(settings, "request_timeout_max_s", 60.0)
+    assert deadlines.parse_timeout(None) is None
+    assert deadlines.parse_timeout("2.5") == 2.5
+    assert deadlines.parse_timeout("1500ms") == 1.5
+    assert deadlines.parse_timeout("3600") == 60.0
+    monkeypatch.setattr(settings, "request_timeout_s", 20.0)
+    assert deadlines.parse_timeout("") == 20.0
+    for bad in ("soon", "0", "-1", "nan"):
+        with pytest.raises(ValueError):
+            deadlines.parse_timeout(bad)
+
+
+def test_nested_deadline_keeps_the_earlier_one():
+    with deadlines.request_deadline(1.0):
+        with deadlines.request_deadline(10.0):
+            assert deadlines.remaining() <= 1.0
+        with deadlines.request_deadline(None):
+            assert deadlines.remaining() <= 1.0
+        assert deadlines.remaining(0.5) == 0.5
+    assert deadlines.remaining() is None
+
+
+def test_run_for_client_cancels_work_on_disconnect():
+    state = {"cancelled": False, "polls": 0}
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def is_disconnected():
+        state["polls"] += 1
+        return state["polls"] >= 2
+
+    before = _sample("research_cancelled_total", {"reason": "disconnect"})
+    start = time.perf_counter()
+    with pytest.raises(deadlines.ClientDisconnected):
+        asyncio.run(deadlines.run_for_client(work(), is_disconnected))
+    assert time.perf_counter() - start < 2 * settings.disconnect_poll_s + 0.5
+    assert state["cancelled"]
+    assert _sample("research_cancelled_total", {"reason": "disconnect"}) == before + 1
+
+
+def test_run_for_client_enforces_the_deadline():
+    async def main():
+        with deadlines.request_deadline(0.1):
+            return await deadlines.run_for_client(asyncio.sleep(5, "late"))
+
+    before = _sample("research_reclaimed_seconds_total", {"reason": "deadline"})
+    start = time.perf_counter()
+    with pytest.raises(deadlines.DeadlineExceeded):
+        asyncio.run(main())
+    assert time.perf_counter() - start < 1.0
+    reclaimed = _sample("research_reclaimed_seconds_total", {"reason": "deadline"})
+    assert reclaimed - before > settings.research_deadline_s - 1
+
+
+def test_deadline_reaches_the_llm_call(monkeypatch):
+    # The model takes 3s; a 0.5s deadline must stop the pipeline, without
+    # counting the cut-off as a model failure
+    fast = Behaviour(median_ms=0.0, sigma=0.0)
+    slow = Behaviour(median_ms=3000.0, sigma=0.0)
+    for name in (
+        "tavily_api_key",
+        "openrouter_api_key",
+        "tavily_base_url",
+        "openrouter_base_url",
+    ):
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    monkeypatch.setattr(settings, "coalesce_requests", False)
+    with StubServer(StubConfig(search=fast, chat=slow)) as stub:
+        stub.configure_settings()
+        model = "x-ai/grok-4-fast"
+
+        async def run():
+            try:
+                with deadlines.request_deadline(0.5):
+                    return await run_research_async("q", model_name=model)
+            finally:
+                await registry.aclose()
+
+        start = time.perf_counter()
+        with pytest.raises(deadlines.DeadlineExceeded):
+            asyncio.run(run())
+        elapsed = time.perf_counter() - start
+    assert elapsed < 1.5
+    assert health.get(model).failures == 0
+
+
+def test_client_disconnected_polls_the_server_receive():
+    from starlette.requests import Request
+
+    from research_agent.app.disconnect import DisconnectMiddleware, client_disconnected
+
+    gone = asyncio.Event()
+
+    async def server_receive():
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def wrapped_receive():
+        await asyncio.sleep(60)  # what BaseHTTPMiddleware hands the endpoint
+
+    async def endpoint(scope, receive, send):
+        request = Request(scope, wrapped_receive)
+        before = await client_disconnected(request)
+        gone.set()
+        return before, await client_disconnected(request)
+
+    async def main():
+        seen = {}
+
+        async def app(scope, receive, send):
+            seen["result"] = await endpoint(scope, receive, send)
+
+        await DisconnectMiddleware(app)({"type": "http"}, server_receive, None)
+        return seen["result"]
+
+    assert asyncio.run(main()) == (False, True)
+
+
+def test_coalesced_callers_keep_their_own_deadlines(monkeypatch):
+    from unittest.mock import patch
+
+    monkeypatch.setattr(settings, "coalesce_requests", True)
+    runs = []
+
+    async def slow_pipeline(query, model_name, temperature, deep):
+        runs.append(query)
+        # Provider calls are bounded by the deadline in their context
+        await deadlines.bounded(asyncio.sleep(0.3))
+        return {"query": query, "final_summary": "ok", "sources": []}
+
+    async def impatient():
+        with deadlines.request_deadline(0.1):
+            return await run_research_async("same query")
+
+    async def patient():
+        await asyncio.sleep(0.01)  # joins the run the impatient caller started
+        return await run_research_async("same query")
+
+    async def main():
+        return await asyncio.gather(impatient(), patient(), return_exceptions=True)
+
+    with patch("research_agent.core.research._run_research_async", new=slow_pipeline):
+        first, second = asyncio.run(main())
+    assert isinstance(first, deadlines.DeadlineExceeded)
+    assert second["final_summary"] == "ok"
+    assert runs == ["same query"]
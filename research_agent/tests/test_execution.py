@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from research_agent.app.deps import settings
+from research_agent.core import deadlines
+from research_agent.core.execution import AllModelsFailed, execute
+from research_agent.core.health import health
+
+DELAYS = {"slow": 0.5, "fast": 0.02, "broken": None}
+
+
+def make_call(log):
+    async def call(model: str) -> str:
+        log.append(model)
+        delay = DELAYS[model]
+        if delay is None:
+            raise RuntimeError("404")
+        await asyncio.sleep(delay)
+        return f"content from {model}"
+
+    return call
+
+
+def run(models, policy, **kw):
+    log = []
+    result = asyncio.run(execute(models, make_call(log), policy=policy, **kw))
+    return result, log
+
+
+def test_sequential_falls_back_in_order():
+    (model, content, attempts), log = run(["broken", "fast", "slow"], "sequential")
+    assert model == "fast" and content == "content from fast"
+    assert log == ["broken", "fast"]
+    assert [a.status for a in attempts] == ["error", "ok"]
+
+
+def test_hedged_starts_backup_after_delay(monkeypatch):
+    monkeypatch.setattr(settings, "hedge_delay_s", 0.05)
+    (model, _, attempts), log = run(["slow", "fast"], "hedged")
+    assert model == "fast"
+    assert [a.status for a in attempts] == ["cancelled", "ok"]
+    assert attempts[1].start_ms >= 40
+
+
+def test_race_takes_first_good_answer():
+    (model, _, attempts), _ = run(["slow", "broken", "fast"], "race")
+    assert model == "fast"
+    assert {a.model: a.status for a in attempts} == {
+        "slow": "cancelled",
+        "broken": "error",
+        "fast": "ok",
+    }
+
+
+def test_attempt_timeout_and_deadline():
+    with pytest.raises(AllModelsFailed) as err:
+        run(["slow", "slow"], "sequential", attempt_timeout=0.05, deadline=0.08)
+    statuses = [a.status for a in err.value.attempts]
+    assert statuses[0] == "timeout"
+    assert len(statuses) == 2
+
+
+def test_attempt_timeouts_open_the_circuit(monkeypatch):
+    monkeypatch.setattr(settings, "circuit_failure_threshold", 3)
+
+    async def hang(model: str) -> str:
+        await asyncio.sleep(5)
+        return "late"
+
+    for _ in range(3):
+        with pytest.raises(AllModelsFailed):
+            asyncio.run(execute(["hung"], hang, attempt_timeout=0.05))
+    assert health.get("hung").failures == 3
+    assert not health.available("hung")
+
+
+def test_request_deadline_is_not_a_model_failure():
+    async def hang(model: str) -> str:
+        return await deadlines.bounded(asyncio.sleep(5, "late"))
+
+    async def main():
+        with deadlines.request_deadline(0.05):
+            return await execute(["hung"], hang, attempt_timeout=1.0)
+
+    with pytest.raises(AllModelsFailed):
+        asyncio.run(main())
+    assert health.get("hung").failures == 0
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+from benchmarks.stubs import PAGE, StubServer
+from research_agent.app.deps import settings
+from research_agent.core import fetch
+from research_agent.core.clients import registry
+from research_agent.core.components import SearchResult
+
+
+def _fetch(urls, **kw):
+    async def run():
+        try:
+            return await fetch.fetch_pages(urls, **kw)
+        finally:
+            await registry.aclose()
+
+    start = time.perf_counter()
+    pages = asyncio.run(run())
+    return pages, time.perf_counter() - start
+
+
+def test_extract_text_drops_boilerplate():
+    text = fetch.extract_text(PAGE.format(name="7"))
+    assert "HNSW builds a layered proximity graph" in text
+    assert "IVF clusters the vectors" in text
+    for boilerplate in ("analytics", "font-family", "Home", "Copyright", "Privacy"):
+        assert boilerplate not in text
+    assert len(fetch.extract_text(PAGE.format(name="7"), max_chars=50)) == 50
+
+
+def test_extract_text_skips_link_lists_without_article():
+    page = (
+        "<div><a href='/a'>First related article title</a> "
+        "<a href='/b'>Second related article title</a></div>"
+        "<div>Plain prose paragraph that is long enough to count as content.</div>"
+    )
+    assert fetch.extract_text(page) == (
+        "Plain prose paragraph that is long enough to count as content."
+    )
+
+
+def test_fetch_wall_clock_is_bounded_by_slowest_host(monkeypatch):
+    monkeypatch.setattr(settings, "fetch_cache_enabled", False)
+    servers = [StubServer().start() for _ in range(3)]
+    try:
+        urls = [
+            f"{s.base_url}/pages/{i}?ms={ms}"
+            for i, (s, ms) in enumerate(zip(servers, (100, 200, 400)))
+        ]
+        pages, elapsed = _fetch(urls, deadline=5.0)
+    finally:
+        for s in servers:
+            s.stop()
+    assert sorted(pages) == sorted(urls)
+    assert all("nearest-neighbour" in p.text for p in pages.values())
+    # Sequential would take at least 700ms
+    assert elapsed < 0.65
+
+
+def test_per_host_limit_serializes_one_host(monkeypatch):
+    monkeypatch.setattr(settings, "fetch_cache_enabled", False)
+    monkeypatch.setattr(settings, "fetch_per_host", 1)
+    with StubServer() as stub:
+        urls = [f"{stub.base_url}/pages/{i}?ms=150" for i in range(3)]
+        pages, elapsed = _fetch(urls, deadline=5.0)
+    assert len(pages) == 3
+    assert elapsed >= 0.45
+
+
+def test_deadline_drops_slow_pages(monkeypatch):
+    monkeypatch.setattr(settings, "fetch_cache_enabled", False)
+    with StubServer() as stub, StubServer() as slow:
+        fast_url = f"{stub.base_url}/pages/fast?ms=0"
+        slow_url = f"{slow.base_url}/pages/slow?ms=2000"
+        pages, elapsed = _fetch([fast_url, slow_url], deadline=0.5)
+    assert list(pages) == [fast_url]
+    assert elapsed < 1.5
+
+
+def test_cache_hit_and_etag_revalidation(monkeypatch):
+    with StubServer() as stub:
+        url = f"{stub.base_url}/pages/1?ms=0"
+        first, _ = _fetch([url])
+        again, _ = _fetch([url])
+        assert stub.counts == {"page:1:200": 1}
+        monkeypatch.setattr(settings, "fetch_cache_ttl_s", 0.0)
+        stale, _ = _fetch([url])
+        assert stub.counts == {"page:1:200": 1, "page:1:304": 1}
+    assert first[url].status == "fetched"
+    assert again[url].status == "cached"
+    assert stale[url].status == "revalidated"
+    assert stale[url].text == first[url].text
+
+
+def test_enrich_results_replaces_top_snippets(monkeypatch):
+    monkeypatch.setattr(settings, "fetch_cache_enabled", False)
+    with StubServer() as stub:
+        results = [
+            SearchResult("A", f"{stub.base_url}/pages/a?ms=0", "short a"),
+            SearchResult("B", f"{stub.base_url}/pages/b?ms=0", "short b"),
+            SearchResult("L", "local://notes", "local snippet"),
+        ]
+
+        async def run():
+            try:
+                return await fetch.enrich_results(results, top_n=1)
+            finally:
+                await registry.aclose()
+
+        enriched = asyncio.run(run())
+    assert "Page a explains" in enriched[0].snippet
+    assert [r.snippet for r in enriched[1:]] == ["short b", "local snippet"]
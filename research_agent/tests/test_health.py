@@ -0,0 +1,102 @@
+from research_agent.app.deps import settings
+from research_agent.core.health import HealthRegistry
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def test_consecutive_failures_open_circuit(monkeypatch):
+    monkeypatch.setattr(settings, "circuit_failure_threshold", 2)
+    reg = HealthRegistry()
+    reg.record_failure("a", RuntimeError("boom"))
+    assert reg.available("a")
+    reg.record_failure("a", RuntimeError("boom"))
+    assert not reg.available("a")
+    assert reg.get("a").snapshot()["state"] == "open"
+
+
+def test_rate_limit_opens_immediately_and_half_open_probe(monkeypatch):
+    monkeypatch.setattr(settings, "circuit_cooldown_s", 0.0)
+    reg = HealthRegistry()
+    reg.record_failure("a", RateLimited("slow down"))
+    assert reg.get("a").rate_limited == 1
+    # Zero cooldown: circuit is immediately half-open and lets a probe through
+    assert reg.get("a").state == "half-open"
+    reg.record_success("a", 0.5)
+    assert reg.get("a").state == "closed"
+    assert reg.get("a").latency_ewma_ms == 500
+
+
+def test_order_prefers_healthy_fast_models():
+    reg = HealthRegistry()
+    reg.record_success("slow", 2.0)
+    reg.record_success("fast", 0.2)
+    reg.record_failure("broken", RateLimited("429"))
+    assert reg.order(["primary", "broken", "slow", "fast"]) == [
+        "primary",
+        "fast",
+        "slow",
+        "broken",
+    ]
+    # An open primary is demoted behind the healthy fallbacks
+    assert reg.order(["broken", "slow", "fast"]) == ["fast", "slow", "broken"]
+
+
+def test_unknown_models_rank_after_healthy_ones_and_before_failing_ones():
+    reg = HealthRegistry()
+    reg.record_success("fast", 0.2)
+    reg.record_success("slow", 2.0)
+    reg.record_failure("flaky", RuntimeError("timeout"))  # circuit still closed
+    assert reg.order(["primary", "flaky", "new", "slow", "fast"]) == [
+        "primary",
+        "fast",
+        "slow",
+        "new",
+        "flaky",
+    ]
+
+
+def test_one_429_opens_the_circuit_after_one_upstream_call(monkeypatch):
+    import asyncio
+    import time
+
+    from benchmarks.stubs import Behaviour, StubConfig, StubServer
+    from research_agent.core.clients import registry
+    from research_agent.core.health import health
+    from research_agent.core.research import run_research_async
+
+    fast = Behaviour(median_ms=0.0, sigma=0.0)
+    config = StubConfig(search=fast, chat=fast)
+    model = "x-ai/grok-4-fast"
+    config.models[model] = Behaviour(
+        median_ms=0.0, sigma=0.0, rate_limit_rate=1.0, retry_after_s=30.0
+    )
+    for name in (
+        "tavily_api_key",
+        "openrouter_api_key",
+        "tavily_base_url",
+        "openrouter_base_url",
+    ):
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    monkeypatch.setattr(settings, "cache_enabled", False)
+    monkeypatch.setattr(settings, "coalesce_requests", False)
+    with StubServer(config) as stub:
+        stub.configure_settings()
+
+        async def run():
+            try:
+                first = await run_research_async("q1", model_name=model)
+                await run_research_async("q2", model_name=model)
+                return first
+            finally:
+                await registry.aclose()
+
+        first = asyncio.run(run())
+    assert first["model"] != model
+    # One upstream call: the SDK did not retry (and sleep on Retry-After),
+    # and the open circuit kept the second request away from the model
+    assert stub.counts[f"{model}:429"] == 1
+    h = health.get(model)
+    assert h.state == "open" and h.rate_limited == 1
+    assert h.open_until - time.monotonic() > 25
@@ -0,0 +1,183 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from research_agent.app.deps import settings
+from research_agent.services.jobs import (
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    Job,
+    JobQueue,
+    MemoryJobStore,
+    SQLiteJobStore,
+    check_callback_url,
+)
+
+
+def test_memory_store_claims_by_priority_and_requeues_expired_leases():
+    store = MemoryJobStore()
+    low, high = Job(query="low"), Job(query="high", priority=5)
+    store.submit(low)
+    store.submit(high)
+    assert store.claim(lease_s=60).query == "high"
+    claimed = store.claim(lease_s=-1)  # lease already expired
+    assert claimed.query == "low" and claimed.status == RUNNING
+    again = store.claim(lease_s=60)
+    assert again.id == low.id and again.attempts == 2
+    assert store.claim(lease_s=60) is None
+
+
+def test_sqlite_store_roundtrip(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    job = Job(query="q", priority=1, callback_url="http://cb")
+    store.submit(job)
+    claimed = store.claim(lease_s=60)
+    assert claimed.id == job.id and claimed.status == RUNNING
+    assert store.claim(lease_s=60) is None
+    claimed.status, claimed.result = SUCCEEDED, {"final_summary": "ok"}
+    store.save(claimed)
+    assert store.get(job.id).result == {"final_summary": "ok"}
+    assert store.prune(time.time() + 1) == 1
+
+
+def test_queue_runs_many_jobs_concurrently_and_retries():
+    calls = {"n": 0, "flaky": 0}
+
+    async def fake_run(query, *, model_name=None, temperature=None):
+        calls["n"] += 1
+        if query == "flaky" and calls["flaky"] == 0:
+            calls["flaky"] += 1
+            return {"query": query, "final_summary": "Error: boom", "sources": []}
+        if query == "broken":
+            raise RuntimeError("always fails")
+        await asyncio.sleep(0.05)
+        return {"query": query, "final_summary": f"ok {query}", "sources": []}
+
+    async def run():
+        queue = JobQueue(MemoryJobStore())
+        jobs = [queue.submit(Job(query=f"q{i}")) for i in range(200)]
+        flaky = queue.submit(Job(query="flaky", max_attempts=2))
+        broken = queue.submit(Job(query="broken", max_attempts=1))
+        start = time.perf_counter()
+        while any(j.status in (QUEUED, RUNNING) for j in jobs):
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        flaky.available_at = 0  # skip the retry backoff
+        while flaky.status != SUCCEEDED:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return jobs, flaky, broken, elapsed
+
+    with patch("research_agent.core.research.run_research_async", new=fake_run):
+        jobs, flaky, broken, elapsed = asyncio.run(run())
+    assert all(j.status == SUCCEEDED for j in jobs)
+    # 200 jobs x 50ms ran concurrently, not back to back (10s)
+    assert elapsed < 2
+    assert flaky.attempts == 2
+    assert broken.status == FAILED and "always fails" in broken.error
+
+
+def test_stop_lets_running_jobs_finish_within_timeout():
+    async def fake_run(query, *, model_name=None, temperature=None):
+        await asyncio.sleep(0.1 if query == "quick" else 10)
+        return {"query": query, "final_summary": "ok", "sources": []}
+
+    async def run():
+        queue = JobQueue(MemoryJobStore())
+        quick = queue.submit(Job(query="quick"))
+        slow = queue.submit(Job(query="slow"))
+        while slow.status == QUEUED or quick.status == QUEUED:
+            await asyncio.sleep(0.01)
+        await queue.stop(timeout=1.0)
+        return quick, slow
+
+    with patch("research_agent.core.research.run_research_async", new=fake_run):
+        quick, slow = asyncio.run(run())
+    assert quick.status == SUCCEEDED
+    # Cancelled mid-run: still leased, so another worker retries it
+    assert slow.status == RUNNING
+
+
+def test_persisted_jobs_resume_without_a_new_submit(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first = SQLiteJobStore(path)
+    first.submit(Job(query="left over"))
+    leased = Job(query="cancelled at shutdown", status=RUNNING, lease_until=0.0)
+    first.submit(leased)
+
+    async def fake_run(query, *, model_name=None, temperature=None):
+        return {"query": query, "final_summary": "ok", "sources": []}
+
+    async def run():
+        # A fresh process: new store and queue over the same database
+        queue = JobQueue(SQLiteJobStore(path))
+        assert queue.resume()
+        for _ in range(200):
+            if not queue.store.has_unfinished():
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue
+
+    with patch("research_agent.core.research.run_research_async", new=fake_run):
+        queue = asyncio.run(run())
+    assert not queue.store.has_unfinished()
+    assert queue.get(leased.id).status == SUCCEEDED
+    assert not JobQueue(SQLiteJobStore(path)).resume()
+
+
+def test_long_jobs_keep_their_lease(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "jobs_visibility_timeout_s", 0.15)
+    monkeypatch.setattr(settings, "jobs_poll_interval_s", 0.02)
+    runs = []
+
+    async def fake_run(query, *, model_name=None, temperature=None):
+        runs.append(query)
+        await asyncio.sleep(0.5)  # over three visibility timeouts
+        return {"query": query, "final_summary": "ok", "sources": []}
+
+    async def run():
+        queue = JobQueue(SQLiteJobStore(str(tmp_path / "jobs.sqlite3")))
+        job = queue.submit(Job(query="long"))
+        for _ in range(100):
+            if queue.get(job.id).status == SUCCEEDED:
+                break
+            await asyncio.sleep(0.02)
+        await queue.stop()
+        return queue.get(job.id)
+
+    with patch("research_agent.core.research.run_research_async", new=fake_run):
+        job = asyncio.run(run())
+    assert job.status == SUCCEEDED and job.attempts == 1
+    assert runs == ["long"]
+
+
+def test_lease_renewal_fails_once_the_job_is_claimed_again(tmp_path):
+    for store in (MemoryJobStore(), SQLiteJobStore(str(tmp_path / "j.sqlite3"))):
+        store.submit(Job(query="q"))
+        first = store.claim(lease_s=-1)  # worker hung past its lease
+        attempt = first.attempts
+        second = store.claim(lease_s=60)
+        assert second.attempts == attempt + 1
+        assert not store.renew(first.id, attempt, 60)
+        assert store.renew(second.id, second.attempts, 60)
+
+
+def test_callback_urls_must_be_public_unless_allowed(monkeypatch):
+    for url in (
+        "http://127.0.0.1:8000/hook",
+        "http://localhost/hook",
+        "http://10.0.0.5/hook",
+        "http://169.254.169.254/latest/meta-data",
+        "http://[::1]/hook",
+        "ftp://example.com/hook",
+    ):
+        with pytest.raises(ValueError):
+            check_callback_url(url)
+    check_callback_url("https://93.184.215.14/hook")
+    monkeypatch.setattr(settings, "jobs_callback_allowed_hosts", "n8n, localhost")
+    check_callback_url("http://localhost:5678/webhook")
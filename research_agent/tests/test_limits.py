@@ -0,0 +1,159 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from research_agent.app.deps import settings
+from research_agent.core.components import SearchResult
+from research_agent.core.limits import (
+    RateLimitExceeded,
+    SingleFlight,
+    SQLiteTokenBucket,
+    TokenBucket,
+    throttle,
+)
+from research_agent.core.research import run_research_async
+
+
+def test_token_bucket_queues_then_rejects():
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    assert bucket.reserve(max_wait=1.0) == 0.0
+    assert bucket.reserve(max_wait=1.0) == 0.0
+    assert bucket.reserve(max_wait=1.0) == pytest.approx(0.1, abs=0.02)
+    # Two reservations queued: the next one would wait ~0.2s
+    assert bucket.reserve(max_wait=0.05) is None
+
+
+def test_sqlite_bucket_is_shared_between_instances(tmp_path):
+    # Two instances stand in for two worker processes on one host
+    path = str(tmp_path / "limits.sqlite3")
+    first = SQLiteTokenBucket(path, "openrouter", rate=10.0, capacity=2)
+    second = SQLiteTokenBucket(path, "openrouter", rate=10.0, capacity=2)
+    assert first.reserve(max_wait=1.0) == 0.0
+    assert second.reserve(max_wait=1.0) == 0.0
+    assert first.reserve(max_wait=1.0) == pytest.approx(0.1, abs=0.02)
+    assert second.reserve(max_wait=0.05) is None
+    second.refund()
+    assert first.wait_time() < 0.15
+
+
+def test_sqlite_reservations_do_not_block_the_event_loop(tmp_path, monkeypatch):
+    import sqlite3
+
+    monkeypatch.setattr(settings, "rate_limits_rpm", {"tavily": 600.0})
+    monkeypatch.setattr(settings, "rate_limit_backend", "sqlite")
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    SQLiteTokenBucket(str(tmp_path / "limits.sqlite3"), "tavily", 10.0, 1)
+    # Another worker holds the write lock for 0.3s
+    other = sqlite3.connect(str(tmp_path / "limits.sqlite3"), isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.ensure_future(ticker())
+        asyncio.get_running_loop().call_later(0.3, other.execute, "COMMIT")
+        await throttle("tavily")
+        ticking.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 10
+
+
+def test_throttle_waits_for_tokens_and_fails_over_when_too_slow(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limits_rpm", {"tavily": 600.0})
+    monkeypatch.setattr(settings, "rate_limit_burst", 1)
+    monkeypatch.setattr(settings, "rate_limit_max_wait_s", 0.15)
+
+    async def sequential(n):
+        for _ in range(n):
+            await throttle("tavily", "unlimited-model")
+
+    async def burst(n):
+        await asyncio.gather(*(throttle("tavily") for _ in range(n)))
+
+    start = time.perf_counter()
+    asyncio.run(sequential(2))
+    assert time.perf_counter() - start >= 0.09  # 600 rpm = one token per 0.1s
+    # Concurrent callers queue behind each other; the third would wait ~0.2s
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(burst(3))
+
+
+def test_single_flight_shares_one_execution():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    async def main():
+        return await asyncio.gather(*(flight.run("k", work) for _ in range(5)))
+
+    outcomes = asyncio.run(main())
+    assert len(runs) == 1
+    assert [shared for _, shared in outcomes].count(False) == 1
+    assert all(result == {"value": 42} for result, _ in outcomes)
+    assert flight.in_flight() == 0
+
+
+def test_single_flight_cancels_work_when_the_last_caller_leaves():
+    flight = SingleFlight()
+    outcome = {}
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            outcome["cancelled"] = True
+            raise
+
+    async def main():
+        first = asyncio.ensure_future(flight.run("k", work))
+        second = asyncio.ensure_future(flight.run("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        outcome["after_first"] = outcome.get("cancelled", False)
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert outcome == {"after_first": False, "cancelled": True}
+    assert flight.in_flight() == 0
+
+
+@patch("research_agent.core.components.Summarizer.asummarize")
+@patch("research_agent.core.components.SearchTool.asearch")
+def test_identical_requests_are_coalesced(mock_search, mock_summarize):
+    async def slow_search(query, limit=5):
+        await asyncio.sleep(0.05)
+        return [SearchResult("A", "https://a.com", "s")], {}
+
+    mock_search.side_effect = slow_search
+    mock_summarize.return_value = "# Summary\nok\n\n# Sources\n- [A](https://a.com)"
+
+    async def main():
+        queries = ["Vector DBs", "vector dbs", "  vector   DBs "]
+        same = [run_research_async(q) for q in queries]
+        other = run_research_async("vector dbs", model_name="openai/gpt-4o-mini")
+        return await asyncio.gather(*same, other)
+
+    results = asyncio.run(main())
+    assert mock_search.call_count == 2  # one shared run plus the other model
+    assert [r["query"] for r in results[:3]] == [
+        "Vector DBs",
+        "vector dbs",
+        "  vector   DBs ",
+    ]
+    assert all(r["final_summary"] == "ok" for r in results)
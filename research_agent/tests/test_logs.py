@@ -0,0 +1,78 @@
+import json
+import logging
+import os
+
+from research_agent.app import logs
+from research_agent.app.deps import configure_logging, logger, settings
+from research_agent.core import telemetry
+
+
+def _record(msg, *args, level=logging.INFO, **extra):
+    record = logger.makeRecord(
+        logger.name, level, __file__, 0, msg, args, None, extra=extra
+    )
+    logs.ContextFilter().filter(record)
+    return record
+
+
+def test_json_lines_carry_request_id_stage_and_extras():
+    with telemetry.request_scope("req-7"):
+        with telemetry.span("search"):
+            record = _record("took %sms", 12, latency_ms=12, status=200)
+    entry = json.loads(logs.JsonFormatter().format(record))
+    assert entry["msg"] == "took 12ms"
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "req-7"
+    assert entry["stage"] == "search"
+    assert entry["latency_ms"] == 12 and entry["status"] == 200
+    # Outside a request neither field is written
+    entry = json.loads(logs.JsonFormatter().format(_record("idle")))
+    assert "request_id" not in entry and "stage" not in entry
+
+
+def test_full_queue_drops_records_then_reports_the_count():
+    handler = logs.BoundedQueueHandler(maxsize=2)
+    for i in range(5):
+        handler.handle(_record("line %s", i))
+    assert handler.dropped == 3
+    assert [handler.queue.get_nowait().msg for _ in range(2)] == ["line 0", "line 1"]
+    handler.handle(_record("line 5"))
+    queued = [handler.queue.get_nowait() for _ in range(2)]
+    assert queued[0].msg == "line 5"
+    assert queued[1].levelname == "WARNING"
+    assert queued[1].msg == "Dropped 3 log records: log queue full"
+
+
+def test_disabled_levels_do_not_format_arguments():
+    calls = []
+
+    class Expensive:
+        def __str__(self):
+            calls.append(1)
+            return "expensive"
+
+    logger.debug("payload=%s", Expensive())
+    assert calls == []
+
+
+def test_queue_mode_writes_json_lines_from_the_listener(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "log_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "log_format", "json")
+    monkeypatch.setattr(settings, "log_async", True)
+    try:
+        configure_logging()
+        assert isinstance(logger.handlers[0], logs.BoundedQueueHandler)
+        listener = logs._active[1]
+        assert listener._thread is None  # started by the first record
+        with telemetry.request_scope("req-9"):
+            logger.info("hello %s", "world", extra={"latency_ms": 5})
+        assert listener._thread is not None
+        logs.stop_queue_logging()  # drains the queue
+        with open(os.path.join(tmp_path, "app.log")) as f:
+            entry = json.loads(f.read().splitlines()[-1])
+        assert entry["msg"] == "hello world"
+        assert entry["request_id"] == "req-9"
+        assert entry["latency_ms"] == 5
+    finally:
+        monkeypatch.undo()
+        configure_logging()
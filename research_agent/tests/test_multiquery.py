@@ -0,0 +1,77 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from research_agent.core.components import SearchResult
+from research_agent.core.multiquery import (
+    canonicalize_url,
+    deep_search,
+    expand_query_rules,
+    fuse_results,
+)
+from research_agent.core.research import run_research
+
+
+def _r(url, snippet="s"):
+    return SearchResult(title=url, url=url, snippet=snippet)
+
+
+def test_canonicalize_url_merges_equivalent_links():
+    a = canonicalize_url("https://www.Example.com/a/?utm_source=x&b=2&a=1#frag")
+    b = canonicalize_url("http://example.com:80/a?a=1&b=2")
+    assert a == b
+    assert canonicalize_url("https://example.com/a") != canonicalize_url(
+        "https://example.com/b"
+    )
+
+
+def test_fuse_results_dedups_and_promotes_consensus():
+    lists = [
+        [_r("https://a.com/1"), _r("https://b.com/x", "short")],
+        [_r("https://b.com/x/", "a much longer snippet"), _r("https://c.com")],
+        [_r("https://www.b.com/x?utm_medium=e"), _r("https://a.com/1")],
+    ]
+    fused = fuse_results(lists, limit=10)
+    assert [r.url for r in fused][:2] == ["https://b.com/x", "https://a.com/1"]
+    assert fused[0].snippet == "a much longer snippet"
+    assert len(fused) == 3
+    assert len(fuse_results(lists, limit=2)) == 2
+
+
+def test_expand_query_rules_splits_comparisons():
+    subs = expand_query_rules("HNSW vs IVF", 4)
+    assert subs[:3] == ["HNSW vs IVF", "HNSW", "IVF"]
+    assert len(expand_query_rules("vector databases", 2)) == 2
+
+
+def test_deep_search_runs_sub_queries_concurrently():
+    class SlowTool:
+        calls = []
+
+        async def asearch(self, query, limit=5):
+            self.calls.append(query)
+            await asyncio.sleep(0.2)
+            if "challenges" in query:
+                raise RuntimeError("quota")
+            slug = query.replace(" ", "-")
+            return [_r(f"https://{slug}.com/{i}") for i in range(limit)], {}
+
+    tool = SlowTool()
+    start = time.perf_counter()
+    results, info = asyncio.run(
+        deep_search(tool, "vector databases", max_queries=4, per_query=3, limit=5)
+    )
+    assert time.perf_counter() - start < 0.35
+    assert len(tool.calls) == 4 and len(info["queries"]) == 4
+    assert len(results) == 5
+
+
+@patch("research_agent.core.components.Summarizer.asummarize")
+@patch("research_agent.core.components.SearchTool.asearch")
+def test_run_research_deep_mode(mock_search, mock_summarize):
+    mock_search.return_value = ([_r("https://a.com")], {})
+    mock_summarize.return_value = "# Summary\nok\n\n# Sources\n- [A](https://a.com)"
+    result = run_research("vector databases", deep=True)
+    assert mock_search.call_count > 1
+    assert result["search_queries"][0] == "vector databases"
+    assert "search_queries" not in run_research("vector databases")
@@ -0,0 +1,151 @@
+import asyncio
+from unittest.mock import patch
+
+from benchmarks.stubs import Behaviour, StubConfig, StubServer
+from research_agent.app.deps import settings
+from research_agent.core.clients import registry
+from research_agent.core.components import (
+    ResponseParser,
+    SearchResult,
+    StreamingResponseParser,
+)
+from research_agent.core.parsing import StructuredSummary, parse_content
+from research_agent.core.research import run_research, run_research_async
+
+MIXED = """Here is what I found.
+
+## Summary
+HNSW builds a **layered graph** [1].
+
+### Details
+- IVF clusters vectors.
+
+## References
+1. [Faiss [v1.8] docs](https://en.wikipedia.org/wiki/Faiss_(library))
+2) [pgvector README][pg]
+- **[Bold link](https://bold.example)**
+[3] Plain title - https://plain.example/page.
+- https://bare.example
+- [Duplicate](https://bold.example)
+
+[pg]: https://github.com/pgvector/pgvector "pgvector"
+[9]: <https://nine.example>
+"""
+
+
+def test_parse_content_handles_common_layouts():
+    parsed = parse_content(MIXED)
+    assert parsed["summary_md"].startswith("HNSW builds")
+    assert parsed["summary_md"].endswith("- IVF clusters vectors.")
+    assert parsed["sources"] == [
+        {
+            "title": "Faiss [v1.8] docs",
+            "url": "https://en.wikipedia.org/wiki/Faiss_(library)",
+        },
+        {"title": "Bold link", "url": "https://bold.example"},
+        {"title": "Plain title", "url": "https://plain.example/page"},
+        {"title": "https://bare.example", "url": "https://bare.example"},
+        {"title": "pgvector README", "url": "https://github.com/pgvector/pgvector"},
+        {"title": "9", "url": "https://nine.example"},
+    ]
+
+
+def test_parse_content_without_summary_heading():
+    parsed = parse_content("Just text.\n\n**Sources:**\n- [A](https://a.com)")
+    assert parsed == {
+        "summary_md": "Just text.",
+        "sources": [{"title": "A", "url": "https://a.com"}],
+    }
+    assert parse_content("No sources at all.")["sources"] == []
+
+
+def test_sources_end_at_the_next_heading_of_the_same_level():
+    content = (
+        "# Summary\nText.\n\n# Sources\n- [A](https://a.com)\n"
+        "## Primary\n- [B](https://b.com)\n\n"
+        "# Notes\n- [Not a source](https://notes.example)\n"
+    )
+    parsed = parse_content(content)
+    assert [s["url"] for s in parsed["sources"]] == ["https://a.com", "https://b.com"]
+    parser = StreamingResponseParser()
+    emitted = parser.feed(content) + parser.flush()
+    assert emitted == parsed["sources"]
+
+
+def test_standard_layout_fast_path_matches_general_parser():
+    from research_agent.core import parsing
+
+    standard = (
+        "# Summary\nHNSW [1] is a graph index.\n\n### Details\nMore.\n\n"
+        "# Sources\n- [Faiss [v1.8] docs](https://en.wikipedia.org/wiki/F_(x))\n"
+        "- [pgvector](https://github.com/pgvector/pgvector).\n"
+        "- [Again](https://github.com/pgvector/pgvector)\n\n"
+    )
+    nested = standard.replace("### Details", "## References\n- [R](https://r.example)")
+    assert parsing._parse_standard(standard) is not None
+    assert parsing._parse_standard(nested) is None
+    with patch.object(parsing, "_parse_standard", lambda content: None):
+        general = parse_content(standard)
+    assert parse_content(standard) == general
+    assert len(general["sources"]) == 2
+
+
+def test_streaming_parser_matches_batch_parser():
+    parser = StreamingResponseParser()
+    emitted = []
+    for i in range(0, len(MIXED), 5):
+        emitted.extend(parser.feed(MIXED[i : i + 5]))
+    emitted.extend(parser.flush())
+    assert emitted == parser.finish()["sources"] == parse_content(MIXED)["sources"]
+
+
+def test_parse_source_line():
+    line = "  3. [A (b)](https://x.com/a_(b)) - notes"
+    assert ResponseParser.parse_source_line(line) == {
+        "title": "A (b)",
+        "url": "https://x.com/a_(b)",
+    }
+    assert ResponseParser.parse_source_line("no link here") is None
+
+
+@patch("research_agent.core.components.Summarizer.asummarize_structured")
+@patch("research_agent.core.components.SearchTool.asearch")
+def test_structured_output_mode(mock_search, mock_structured, monkeypatch):
+    monkeypatch.setattr(settings, "structured_output", True)
+    mock_search.return_value = ([SearchResult("A", "https://a.com", "s")], {})
+    mock_structured.return_value = StructuredSummary(
+        summary_md="## Overview\nok",
+        sources=[
+            {"title": "A", "url": "https://a.com"},
+            {"title": "A", "url": "https://a.com"},
+        ],
+    )
+    result = run_research("vector databases")
+    assert result["final_summary"] == "## Overview\nok"
+    assert result["sources"] == [{"title": "A", "url": "https://a.com"}]
+    assert "summary_md" in mock_structured.call_args[0][0].system
+
+
+def test_structured_output_falls_back_to_markdown(monkeypatch):
+    # The stub answers with plain Markdown and no tool call
+    fast = Behaviour(median_ms=0.0, sigma=0.0)
+    for name in (
+        "tavily_api_key",
+        "openrouter_api_key",
+        "tavily_base_url",
+        "openrouter_base_url",
+    ):
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    monkeypatch.setattr(settings, "structured_output", True)
+    with StubServer(StubConfig(search=fast, chat=fast)) as stub:
+        stub.configure_settings()
+
+        async def run():
+            try:
+                return await run_research_async("vector databases")
+            finally:
+                await registry.aclose()
+
+        result = asyncio.run(run())
+    assert result["sources"] and result["final_summary"]
+    assert not result["final_summary"].startswith("Error")
@@ -0,0 +1,124 @@
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+from research_agent.app.deps import settings
+from research_agent.core.components import SearchResult
+from research_agent.core.research import run_research
+from research_agent.services import rag
+
+SUMMARY_MD = (
+    "# Summary\nHNSW builds a layered graph.\n\n# Sources\n- [A](https://a.com)"
+)
+
+
+def _enable(monkeypatch, **overrides):
+    monkeypatch.setattr(settings, "rag_enabled", True)
+    monkeypatch.setattr(settings, "rag_backend", "numpy")
+    monkeypatch.setattr(settings, "rag_ingest_interval_s", 60.0)
+    for name, value in overrides.items():
+        monkeypatch.setattr(settings, name, value)
+    return rag.get_rag_store()
+
+
+def test_numpy_index_ranks_by_cosine_and_skips_duplicates():
+    index = rag.NumpyFlatIndex()
+    docs = [rag.Document(kind=rag.SNIPPET, content=f"doc {i}") for i in range(100)]
+    vectors = np.eye(100, 8, dtype=np.float32)
+    vectors[8:] = np.float32(1 / np.sqrt(8))
+    assert index.add(docs, vectors) == 100
+    assert index.add(docs[:3], vectors[:3]) == 0
+    hits = index.search(vectors[2], k=3)
+    assert hits[0][0].content == "doc 2"
+    assert hits[0][1] == 1.0
+    assert len(hits) == 3 and index.count() == 100
+
+
+def test_numpy_index_drops_expired_then_oldest_documents():
+    now = time.time()
+    index = rag.NumpyFlatIndex(max_entries=100, max_age_s=3600)
+    docs = [
+        rag.Document(kind=rag.SNIPPET, content=f"doc {i}", created_at=now - i)
+        for i in range(100)
+    ]
+    docs[5].created_at = now - 7200  # expired
+    vectors = np.eye(100, 100, dtype=np.float32)
+    assert index.add(docs, vectors) == 100
+    newer = [rag.Document(kind=rag.SNIPPET, content=f"new {i}") for i in range(3)]
+    assert index.add(newer, np.eye(3, 100, 50, dtype=np.float32)) == 3
+    assert index.count() == 100 and index.evicted == 3
+    contents = {hit[0].content for hit in index.search(np.ones(100), k=100)}
+    # The expired one, then the two oldest (doc 99, doc 98)
+    assert {"doc 5", "doc 98", "doc 99"}.isdisjoint(contents)
+    assert {"doc 97", "new 0", "new 2"} <= contents
+    # Rows moved with their documents
+    assert index.search(vectors[6], k=1)[0][0].content == "doc 6"
+
+
+def test_store_ingests_in_batches_and_retrieves(monkeypatch):
+    store = _enable(monkeypatch)
+    result = {"query": "hnsw index", "final_summary": "HNSW graph", "sources": []}
+    snippets = [
+        SearchResult("HNSW", "https://a.com", "HNSW is a proximity graph index"),
+        SearchResult("Empty", "https://b.com", ""),
+    ]
+    store.ingest(result, snippets)
+    assert store.index.count() == 0  # waits for a full batch or the interval
+    store.flush()
+    assert store.snapshot() == {
+        "batches": 1,
+        "documents": 2,
+        "errors": 0,
+        "indexed": 2,
+    }
+    hits = rag.asyncio.run(store.retrieve("HNSW proximity graph index", k=1))
+    assert hits[0][0].url == "https://a.com"
+
+
+@patch("research_agent.core.components.Summarizer.asummarize")
+@patch("research_agent.core.components.SearchTool.asearch")
+def test_similar_query_is_answered_locally(mock_search, mock_summarize, monkeypatch):
+    store = _enable(monkeypatch)
+    mock_search.return_value = ([SearchResult("A", "https://a.com", "graph")], {})
+    mock_summarize.return_value = SUMMARY_MD
+    first = run_research("how does hnsw indexing work")
+    assert first["rag"] == "miss"
+    store.flush()
+
+    again = run_research("How does HNSW indexing work?")
+    assert again["rag"] == "answer"
+    assert again["final_summary"] == first["final_summary"]
+    assert mock_search.call_count == 1 and mock_summarize.call_count == 1
+
+    # Other models and temperatures get their own answer
+    other = run_research("How does HNSW indexing work?", temperature=0.9)
+    assert other["rag"] != "answer"
+    # Local answers are already in the history
+    from research_agent.app.routes import _should_persist
+
+    assert not _should_persist(again) and _should_persist(first)
+
+    monkeypatch.setattr(settings, "rag_max_age_s", -1.0)
+    assert run_research("how does hnsw indexing work")["rag"] != "answer"
+
+
+@patch("research_agent.core.components.Summarizer.asummarize")
+@patch("research_agent.core.components.SearchTool.asearch")
+def test_related_snippets_augment_the_prompt(mock_search, mock_summarize, monkeypatch):
+    store = _enable(monkeypatch, rag_augment_threshold=0.3)
+    store.ingest(
+        {"query": "old", "final_summary": "unrelated", "sources": []},
+        [SearchResult("Old", "https://old.com", "pgvector supports hnsw indexes")],
+    )
+    store.flush()
+    mock_search.return_value = ([SearchResult("A", "https://a.com", "x")], {})
+    mock_summarize.return_value = SUMMARY_MD
+    result = run_research("pgvector hnsw indexes")
+    assert result["rag"] == "augment"
+    prompt = mock_summarize.call_args[0][0].user
+    assert "https://old.com" in prompt and "https://a.com" in prompt
+
+
+def test_disabled_by_default():
+    assert rag.get_rag_store() is None
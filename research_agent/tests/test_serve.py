@@ -0,0 +1,26 @@
+import os
+
+from research_agent import serve
+from research_agent.app.deps import settings
+
+
+def test_worker_count_defaults_to_available_cpus(monkeypatch):
+    monkeypatch.setattr(serve, "available_cpus", lambda: 16)
+    monkeypatch.setattr(settings, "serve_workers", 0)
+    monkeypatch.setattr(settings, "serve_max_workers", 8)
+    assert serve.worker_count() == 8
+    assert serve.worker_count(3) == 3
+    monkeypatch.setattr(settings, "serve_workers", 2)
+    assert serve.worker_count() == 2
+
+
+def test_multiple_workers_default_to_shared_backends(tmp_path, monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    fields = {"cache_backend"}  # set explicitly, e.g. CACHE_BACKEND=memory
+    monkeypatch.setattr(type(settings), "model_fields_set", property(lambda s: fields))
+    assert serve.shared_state_env(1) == {}
+    env = serve.shared_state_env(4)
+    assert "CACHE_BACKEND" not in env
+    assert env["JOBS_BACKEND"] == env["RATE_LIMIT_BACKEND"] == "sqlite"
+    assert env["SEARCH_CACHE_BACKEND"] == "sqlite"
+    assert os.path.isdir(env["PROMETHEUS_MULTIPROC_DIR"])
@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+
+from research_agent.services import sheets
+from research_agent.services.sheets import WriteBehindBuffer
+
+
+class FakeWorksheet:
+    def __init__(self, fail_with=None):
+        self.calls = []
+        self.fail_with = fail_with
+
+    def append_rows(self, rows, value_input_option=None):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.calls.append(list(rows))
+
+
+def _rows(n):
+    return [["2025-01-01", f"q{i}", "summary", "[]"] for i in range(n)]
+
+
+def test_rows_are_flushed_in_batches(tmp_path, monkeypatch):
+    ws = FakeWorksheet()
+    monkeypatch.setattr(sheets, "_get_worksheet", lambda: ws)
+    buf = WriteBehindBuffer(str(tmp_path / "spool.jsonl"), batch_size=3)
+    for row in _rows(5):
+        buf.add(row)
+    buf.close()
+    assert [len(c) for c in ws.calls][-1] == 2
+    assert sum(len(c) for c in ws.calls) == 5
+    assert buf.snapshot()["pending"] == 0
+    assert (tmp_path / "spool.jsonl").read_text() == ""
+
+
+def test_spooled_rows_survive_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(sheets, "_get_worksheet", lambda: None)
+    path = str(tmp_path / "spool.jsonl")
+    buf = WriteBehindBuffer(path, batch_size=100, flush_interval_s=60)
+    for row in _rows(3):
+        buf.add(row)
+    buf.close(timeout=0.1)
+
+    ws = FakeWorksheet()
+    monkeypatch.setattr(sheets, "_get_worksheet", lambda: ws)
+    replayed = WriteBehindBuffer(path, batch_size=100)
+    assert replayed.snapshot()["pending"] == 3
+    assert replayed.flush()
+    assert ws.calls == [_rows(3)]
+
+
+def test_quota_errors_back_off_and_keep_rows(tmp_path, monkeypatch):
+    err = Exception("Quota exceeded")
+    err.response = SimpleNamespace(status_code=429)
+    monkeypatch.setattr(sheets, "_get_worksheet", lambda: FakeWorksheet(err))
+    buf = WriteBehindBuffer(str(tmp_path / "spool.jsonl"), flush_interval_s=60)
+    buf.add(_rows(1)[0])
+    assert not buf.flush()
+    assert not buf.flush()
+    stats = buf.snapshot()
+    assert stats["quota_errors"] == 2 and stats["backoff_s"] == 2.0
+    assert stats["pending"] == 1
+
+
+def test_spools_of_exited_workers_are_adopted(tmp_path, monkeypatch):
+    monkeypatch.setattr(sheets, "_get_worksheet", lambda: None)
+    live = WriteBehindBuffer(
+        str(tmp_path / "sheets_spool.1.jsonl"), flush_interval_s=60
+    )
+    exited = WriteBehindBuffer(
+        str(tmp_path / "sheets_spool.2.jsonl"), flush_interval_s=60
+    )
+    live.add(_rows(1)[0])
+    for row in _rows(2):
+        exited.add(row)
+    exited.close(timeout=0.1)
+
+    ws = FakeWorksheet()
+    monkeypatch.setattr(sheets, "_get_worksheet", lambda: ws)
+    new = WriteBehindBuffer(str(tmp_path / "sheets_spool.3.jsonl"), flush_interval_s=60)
+    # The live worker still holds its lock, so only the exited one's rows move
+    assert new.adopt_orphans() == 2
+    assert not (tmp_path / "sheets_spool.2.jsonl").exists()
+    assert (tmp_path / "sheets_spool.1.jsonl").exists()
+    new.close()
+    assert ws.calls == [_rows(2)]
+
+
+def test_racing_workers_adopt_each_spool_once(tmp_path, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(sheets, "_get_worksheet", lambda: None)
+    orphans = 30
+    for i in range(orphans):
+        exited = WriteBehindBuffer(
+            str(tmp_path / f"sheets_spool.{100 + i}.jsonl"), flush_interval_s=60
+        )
+        for row in _rows(2):
+            exited.add(row)
+        exited.close(timeout=0.1)
+
+    adopters = [
+        WriteBehindBuffer(
+            str(tmp_path / f"sheets_spool.{i}.jsonl"), flush_interval_s=60
+        )
+        for i in range(4)
+    ]
+    counts, errors = [], []
+    start = threading.Barrier(len(adopters))
+
+    def adopt(buffer):
+        start.wait()
+        try:
+            counts.append(buffer.adopt_orphans())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=adopt, args=(b,)) for b in adopters]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert sum(counts) == 2 * orphans
+    for buffer in adopters:
+        buffer.close(timeout=0.1)
@@ -0,0 +1,44 @@
+import asyncio
+
+from benchmarks.harness import percentiles
+from benchmarks.stubs import Behaviour, StubConfig, StubServer
+from research_agent.app.deps import settings
+from research_agent.core.clients import registry
+from research_agent.core.research import run_research_async
+
+
+def test_stub_serves_search_chat_and_rate_limits(monkeypatch):
+    fast = Behaviour(median_ms=0.0, sigma=0.0)
+    config = StubConfig(search=fast, chat=fast)
+    config.models["x-ai/grok-4-fast"] = Behaviour(
+        median_ms=0.0, sigma=0.0, rate_limit_rate=1.0
+    )
+    for name in (
+        "tavily_api_key",
+        "openrouter_api_key",
+        "tavily_base_url",
+        "openrouter_base_url",
+    ):
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    with StubServer(config) as stub:
+        stub.configure_settings()
+
+        async def run():
+            try:
+                return await run_research_async(
+                    "vector databases", model_name="x-ai/grok-4-fast"
+                )
+            finally:
+                await registry.aclose()
+
+        result = asyncio.run(run())
+    assert result["model"] != "x-ai/grok-4-fast"
+    assert result["sources"][0]["url"] == "https://example.com/0"
+    assert stub.counts["x-ai/grok-4-fast:429"] >= 1
+    assert stub.counts["search:200"] == 1
+
+
+def test_percentiles():
+    stats = percentiles([float(i) for i in range(1, 101)])
+    assert stats["p50_ms"] == 51.0 and stats["p99_ms"] == 100.0
+    assert percentiles([]) == {"n": 0}
@@ -0,0 +1,122 @@
+import logging
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from research_agent.app.main import app
+from research_agent.core import telemetry
+from research_agent.core.research import run_research
+
+
+def _sample(name, labels):
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_span_records_stage_into_request_scope():
+    before = _sample("research_stage_duration_seconds_count", {"stage": "unit"})
+    with telemetry.request_scope("req-1") as stages:
+        assert telemetry.request_id_var.get() == "req-1"
+        with telemetry.span("unit"):
+            pass
+        with telemetry.span("unit"):
+            pass
+    assert [name for name, _ in stages] == ["unit", "unit"]
+    assert telemetry.format_stages(stages) == "unit:0"
+    assert telemetry.request_id_var.get() is None
+    after = _sample("research_stage_duration_seconds_count", {"stage": "unit"})
+    assert after - before == 2
+
+
+@patch("research_agent.core.components.Summarizer.asummarize")
+@patch("research_agent.core.components.SearchTool.asearch")
+def test_pipeline_stages_and_attempts_exported(mock_search, mock_summarize):
+    mock_search.return_value = ([], {})
+    mock_summarize.return_value = "# Summary\nok\n\n# Sources\n- [A](http://a)"
+    labels = {"model": "x-ai/grok-4-fast", "status": "ok"}
+    before = _sample("llm_attempt_duration_seconds_count", labels)
+    with telemetry.request_scope("req-2") as stages:
+        run_research("q", model_name="x-ai/grok-4-fast")
+    assert {"search", "prompt", "llm", "parse"} <= {name for name, _ in stages}
+    assert _sample("llm_attempt_duration_seconds_count", labels) - before == 1
+
+
+def test_metrics_endpoint_and_stage_log(caplog):
+    client = TestClient(app)
+    with caplog.at_level(logging.INFO, logger="ai-agents"):
+        client.get("/health", headers={"x-request-id": "abc"})
+    assert any("request_id=abc" in r.getMessage() for r in caplog.records)
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health"' in body
+    assert "http_requests_in_flight" in body
+
+
+def test_usage_scope_totals_and_cost(monkeypatch):
+    from research_agent.app.deps import settings
+
+    monkeypatch.setattr(
+        settings,
+        "model_prices",
+        {"priced": {"input": 1.0, "cached_input": 0.5, "output": 2.0}},
+    )
+    before = _sample("llm_tokens_total", {"model": "priced", "kind": "cached"})
+    usage = {
+        "input_tokens": 1000,
+        "output_tokens": 100,
+        "input_token_details": {"cache_read": 400},
+    }
+    with telemetry.usage_scope() as totals:
+        telemetry.record_usage("priced", usage)
+        telemetry.record_usage("priced", usage)
+        telemetry.record_usage("unpriced/model", {"input_tokens": 10})
+    telemetry.record_usage("priced", usage)  # outside the scope: metrics only
+    summary = telemetry.summarize_usage(totals)
+    assert summary["input_tokens"] == 2010
+    assert summary["cached_tokens"] == 800
+    assert summary["cache_hit_rate"] == round(800 / 2010, 4)
+    priced, unpriced = summary["models"]
+    assert priced["calls"] == 2
+    # (600 * 1.0 + 400 * 0.5 + 100 * 2.0) per million, twice
+    assert priced["cost_usd"] == 0.002
+    assert unpriced["cost_usd"] is None
+    assert summary["cost_usd"] == 0.002
+    after = _sample("llm_tokens_total", {"model": "priced", "kind": "cached"})
+    assert after - before == 1200
+    assert telemetry.summarize_usage({}) is None
+
+
+def test_research_usage_reports_prompt_cache_hits(monkeypatch):
+    import asyncio
+
+    from benchmarks.stubs import Behaviour, StubConfig, StubServer
+    from research_agent.app.deps import settings
+    from research_agent.core.clients import registry
+    from research_agent.core.research import run_research_async, stream_research
+
+    for name in (
+        "tavily_api_key",
+        "openrouter_api_key",
+        "tavily_base_url",
+        "openrouter_base_url",
+    ):
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    fast = Behaviour(median_ms=0.0, sigma=0.0)
+    with StubServer(StubConfig(search=fast, chat=fast)) as stub:
+        stub.configure_settings()
+
+        async def run():
+            try:
+                first = await run_research_async("vector databases")
+                second = await run_research_async("graph databases")
+                events = [e async for e in stream_research("key-value stores")]
+                return first, second, events[-1]
+            finally:
+                await registry.aclose()
+
+        first, second, (event, streamed) = asyncio.run(run())
+    assert first["usage"]["cached_tokens"] == 0
+    # A different query still starts with the same system message
+    assert 0 < second["usage"]["cached_tokens"] < second["usage"]["input_tokens"]
+    assert second["usage"]["models"][0]["model"] == settings.model_name
+    assert event == "final" and streamed["usage"]["cached_tokens"] > 0
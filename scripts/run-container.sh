@@ -5,6 +5,11 @@ IMAGE_NAME=${IMAGE_NAME:-ai-agents-backend}
 IMAGE_TAG=${IMAGE_TAG:-latest}
 ENV_FILE=${ENV_FILE:-.env}
 PORT=${PORT:-8000}
+# Named volume for DATA_DIR (history, jobs, Sheets spool)
+DATA_VOLUME=${DATA_VOLUME:-ai-agents-data}
+# Seconds `docker stop` waits before SIGKILL: 2 x SERVE_GRACEFUL_TIMEOUT_S
+# (request drain, then run/job drain) plus 15s for the Sheets and RAG flush
+STOP_TIMEOUT=${STOP_TIMEOUT:-75}
 
 if [ ! -f "$ENV_FILE" ]; then
   echo "Env file $ENV_FILE not found. Generate one with scripts/write-env-file.sh or provide --env-file manually."
@@ -12,5 +17,5 @@ if [ ! -f "$ENV_FILE" ]; then
 fi
 
 echo "Running ${IMAGE_NAME}:${IMAGE_TAG} on port ${PORT} using env file ${ENV_FILE}"
-docker run --rm -p ${PORT}:8000 --env-file "$ENV_FILE" "${IMAGE_NAME}:${IMAGE_TAG}"
+docker run --rm --stop-timeout "${STOP_TIMEOUT}" -p ${PORT}:8000 -v "${DATA_VOLUME}:/app/data" --env-file "$ENV_FILE" "${IMAGE_NAME}:${IMAGE_TAG}"
 